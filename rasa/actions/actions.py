@@ -4,21 +4,45 @@ from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet, FormValidation, EventType, ActiveLoop
 from rasa_sdk.types import DomainDict
 
-from .constants import MOVIES_GENRE_MAP, api_key, TV_GENRE_MAP
-from .tmdb_utils import (
-    search_movie_by_title,
-    get_movie_details,
+from .constants import api_key, RESULTS_PAGE_SIZE
+from .tmdb_async import (
+    get_movie_full,
+    get_tv_full,
     get_now_playing_movies,
-    get_movies_by_genre,
-    get_movie_reviews,
-    get_movie_watch_providers,
-    get_TV_details,
-    get_series_reviews,
-    search_TV_by_title,
+    discover_movies,
+    discover_tv,
     get_favourite,
-    search_TV_latest, get_favourite_tv, get_tv_by_genre
+    search_TV_latest, get_favourite_tv
 )
+from .title_resolver import resolve_movie, resolve_tv, movie_candidates, tv_candidates
+from .disambiguation import extract_year, pick_best
+from .discover import compile_query, discover_params, describe
+from .deadline import with_turn_budget
+from .metrics import instrumented, start_metrics_exporter
+from .streaming import ReplyStream
+from .posters import start_poster_server
+from .pagination import CURSOR_SLOT, new_cursor, next_results
+from .templates import (
+    LIST_VIEWS,
+    MOVIE_DETAILS,
+    TV_DETAILS,
+    compose_list,
+    render_details,
+    render_entries,
+    render_film_form,
+    render_list,
+    render_providers,
+)
+from .catalog_ingest import start_catalog_refresh
+from .warmup import start_warm_up
+from .workers import start_shared_snapshot
 
+start_metrics_exporter()
+start_poster_server()
+# Con più worker solo lo scrittore dello snapshot condiviso scarica liste e catalogo
+if start_shared_snapshot():
+    start_warm_up()
+    start_catalog_refresh()
 
 
 class ActionMovieDetails(Action):
@@ -29,9 +53,11 @@ class ActionMovieDetails(Action):
     def name(self) -> Text:
         return "action_movie_details"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         title = tracker.get_slot("titolo_film")
 
@@ -43,35 +69,19 @@ class ActionMovieDetails(Action):
             dispatcher.utter_message(text="_Manca la chiave API. Non posso recuperare i dettagli del film._")
             return []
 
-        search_data = search_movie_by_title(title)
-
-        results = search_data.get("results", [])
-        if not results:
+        year = extract_year(tracker.latest_message.get("text"))
+        candidates = await movie_candidates(title, year)
+        if not candidates:
             dispatcher.utter_message(text=f"Non ho trovato nessun film con questo titolo: {title}.")
             return []
 
-        movie = results[0]
-        movie_id = movie.get("id")
-
-        if not movie_id:
-            dispatcher.utter_message(text="Non sono riuscito a recuperare l'ID del film.")
+        # Si scaricano in parallelo i dettagli dei candidati e si sceglie il più pertinente
+        movie, details_data = await pick_best(title, candidates, get_movie_full, year)
+        if movie is None:
+            dispatcher.utter_message(text="_Non sono riuscito a recuperare i dettagli del film, riprova più tardi._")
             return []
 
-        details_data = get_movie_details(movie_id)
-        movie_title = details_data.get("title", "Titolo non disponibile")
-        overview = details_data.get("overview", "Nessuna trama disponibile")
-        release_date = details_data.get("release_date", "Data di uscita non disponibile")
-
-        # Formattiamo la trama con una lunghezza ragionevole (se è troppo lunga)
-        truncated_overview = overview[:500] + "..." if len(overview) > 500 else overview
-
-        message = (
-            f"🎬 {movie_title}\n\n"
-            f"📅 Data di uscita: {release_date}\n\n"
-            f"📝 Trama:\n{truncated_overview}"
-        )
-
-        dispatcher.utter_message(text=message)
+        dispatcher.utter_message(text=render_details(MOVIE_DETAILS, details_data))
         return []
 
 
@@ -83,35 +93,22 @@ class ActionRecentReleases(Action):
     def name(self) -> Text:
         return "action_recent_releases"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
-        data = get_now_playing_movies()
+        data = await get_now_playing_movies()
         results = data.get("results", [])
 
         if not results:
             dispatcher.utter_message(text="Non ho trovato film recentemente usciti.")
             return []
 
-        # Titolo del messaggio
-        messaggio = "🎬 Film recentemente in sala:\n"
-        for movie in results[:5]:
-            title = movie.get("title", "Titolo non disponibile")
-            release_date = movie.get("release_date", "Data non disponibile")
-            overview = movie.get("overview", "Trama non disponibile")
-
-            # Truncare l'overview se troppo lunga
-            truncated_overview = overview[:300] + "..." if len(overview) > 300 else overview
-
-            messaggio += (
-                f"\n• {title}"
-                f"\n📅 Uscita: {release_date}"
-                f"\n📝 {truncated_overview}\n"
-            )
-
-        dispatcher.utter_message(text=messaggio)
-        return []
+        # Messaggio uguale per tutti gli utenti: composto una volta per versione dei dati
+        dispatcher.utter_message(text=render_list("recent_movies", data, "🎬 Film recentemente in sala:\n"))
+        return [SlotSet(CURSOR_SLOT, new_cursor("recent_movies", data, RESULTS_PAGE_SIZE))]
 
 
 class ActionMoviesByGenre(Action):
@@ -122,41 +119,43 @@ class ActionMoviesByGenre(Action):
     def name(self) -> Text:
         return "movies_by_genre"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         genere = tracker.get_slot("genere")
         if not genere:
             dispatcher.utter_message(text="Non ho capito il genere che cerchi. Puoi ripetere?")
             return []
 
-        genre_id = MOVIES_GENRE_MAP.get(genere.lower())
-        if not genre_id:
+        # Generi (anche più di uno), anni e piattaforma diventano una sola richiesta a /discover
+        query = compile_query("movie", tracker.latest_message.get("text"), genere, tracker.get_slot("anno"))
+        if not query.genres:
             dispatcher.utter_message(text=f"Non conosco il genere {genere}, prova con un altro.")
             return []
 
-        data = get_movies_by_genre(genre_id)
+        params = discover_params(query)
+        data = await discover_movies(params)
         results = data.get("results", [])
+        descrizione = describe(query, genere)
 
         if not results:
-            dispatcher.utter_message(text=f"Non ho trovato film del genere {genere}.")
+            dispatcher.utter_message(text=f"Non ho trovato film del genere {descrizione}.")
             return []
 
-        messaggio = f"🎬 Ecco alcuni film del genere {genere}:\n"
-        for movie in results[:5]:
-            title = movie.get("title", "Titolo non disponibile")
-            overview = movie.get("overview", "Trama non disponibile")
-
-            truncated_overview = overview[:300] + "..." if len(overview) > 300 else overview
+        messaggio = render_list("movies_by_genre", data, f"🎬 Ecco alcuni film del genere {descrizione}:\n")
+        dispatcher.utter_message(text=messaggio)
+        return [SlotSet(CURSOR_SLOT, new_cursor("movies_by_genre", data, RESULTS_PAGE_SIZE, params))]
 
-            messaggio += (
-                f"\n• {title}\n"
-                f"📝 {truncated_overview}\n"
-            )
 
-        dispatcher.utter_message(text=messaggio)
-        return []
+def _italian_providers(details: dict) -> dict:
+    # Provider italiani del film, vuoto se non è disponibile in nessuna forma
+    providers = details.get("watch/providers", {}).get("results", {}).get("IT", dict())
+    if any(providers.get(kind) for kind in ("flatrate", "rent", "buy")):
+        return providers
+    return {}
 
 
 class ActionWhereToWatch(Action):
@@ -167,9 +166,11 @@ class ActionWhereToWatch(Action):
     def name(self) -> Text:
         return "action_where_to_watch"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         title = tracker.get_slot("titolo_film")
 
@@ -181,56 +182,20 @@ class ActionWhereToWatch(Action):
             dispatcher.utter_message(text="Manca la chiave API. Non posso recuperare i dettagli del film.")
             return []
 
-        search_data = search_movie_by_title(title)
-
-        results = search_data.get("results", [])
-        if not results:
+        year = extract_year(tracker.latest_message.get("text"))
+        candidates = await movie_candidates(title, year)
+        if not candidates:
             dispatcher.utter_message(text=f"Non ho trovato nessun film con questo titolo: {title}.")
             return []
 
-        movie = results[0]
-        movie_id = movie.get("id")
-
-        if not movie_id:
-            dispatcher.utter_message(text="Non sono riuscito a recuperare l'ID del film.")
-            return []
-
-        providers_data = get_movie_watch_providers(movie_id)
-        providers = providers_data.get("results", {}).get("IT", dict())
-
-        if not providers:
+        # Se il candidato migliore non ha provider italiani si ripiega sui successivi
+        movie, details_data = await pick_best(title, candidates, get_movie_full, year, _italian_providers)
+        if movie is None:
             dispatcher.utter_message(text="Non ho trovato informazioni sui provider per questo film.")
             return []
+        providers = _italian_providers(details_data)
 
-        flatrate_providers = providers.get("flatrate", [])
-        rent_providers = providers.get("rent", [])
-        buy_providers = providers.get("buy", [])
-
-        if not flatrate_providers and not rent_providers and not buy_providers:
-            dispatcher.utter_message(text="Non ho trovato informazioni sui provider per questo film.")
-            return []
-
-        messaggio = f"🎬 🇮🇹 Dove guardare {movie.get('title', 'il film')}:\n"
-
-        if flatrate_providers:
-            messaggio += "\n📺 Incluso in abbonamento:"
-            for provider in flatrate_providers:
-                provider_name = provider.get("provider_name", "Provider sconosciuto")
-                messaggio += f"\n• {provider_name}"
-
-        if rent_providers:
-            messaggio += "\n\n📺 In noleggio:"
-            for provider in rent_providers:
-                provider_name = provider.get("provider_name", "Provider sconosciuto")
-                messaggio += f"\n• {provider_name}"
-
-        if buy_providers:
-            messaggio += "\n\n📺 In vendita:"
-            for provider in buy_providers:
-                provider_name = provider.get("provider_name", "Provider sconosciuto")
-                messaggio += f"\n• {provider_name}"
-
-        dispatcher.utter_message(text=messaggio)
+        dispatcher.utter_message(text=render_providers(providers, movie.get("title", "il film")))
 
 
 class MovieReviews(Action):
@@ -241,9 +206,11 @@ class MovieReviews(Action):
     def name(self) -> Text:
         return "movie_reviews"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         titolo = tracker.get_slot("titolo_film")
 
@@ -255,45 +222,31 @@ class MovieReviews(Action):
             dispatcher.utter_message(text="Manca la chiave API. Non posso recuperare le recensioni.")
             return []
 
-        search_data = search_movie_by_title(titolo)
-        results = search_data.get("results", [])
-        if not results:
+        movie = await resolve_movie(titolo, extract_year(tracker.latest_message.get("text")))
+        if movie is None:
             dispatcher.utter_message(text=f"Non ho trovato alcun film con il titolo {titolo}.")
             return []
 
-        movie = results[0]
         movie_id = movie.get("id")
 
         if not movie_id:
             dispatcher.utter_message(text="Non sono riuscito a recuperare l'ID del film.")
             return []
 
-        reviews_data = get_movie_reviews(movie_id)
-        reviews = reviews_data.get("results", [])
-
-        if reviews:
-            # Titolo del messaggio
-            dispatcher.utter_message(text=f"🎬 Recensioni per {movie.get('title', 'il film')}:")
+        async with ReplyStream(dispatcher, tracker) as stream:
+            # Il titolo parte subito, mentre si scaricano le recensioni
+            stream.send(f"🎬 Recensioni per {movie.get('title', 'il film')}:")
+            reviews_data = (await get_movie_full(movie_id)).get("reviews", {})
+            reviews = reviews_data.get("results", [])
 
             # Mostriamo fino a 5 recensioni
-            for review in reviews[:5]:
-                author = review.get("author", "Autore sconosciuto")
-                content = review.get("content", "Recensione non disponibile")
-                truncated_content = content[:600].strip()
-
-                # Aggiungere i puntini di sospensione se la recensione è stata troncata
-                if len(content) > 600:
-                    truncated_content += "..."
-
-                message = (
-                    f"\n👤 Autore: {author}\n"
-                    f"📝 Recensione:\n{truncated_content}\n"
-                )
-                dispatcher.utter_message(text=message)
-        else:
-            dispatcher.utter_message(text="Non sono disponibili recensioni per questo film.")
+            for entry in render_entries("movie_reviews", reviews_data):
+                stream.send(entry)
 
-        return []
+            if not reviews:
+                stream.send("Non sono disponibili recensioni per questo film.")
+
+        return [SlotSet(CURSOR_SLOT, new_cursor("movie_reviews", reviews_data, RESULTS_PAGE_SIZE, movie_id))]
 
 
 class PopularMovies(Action):
@@ -304,28 +257,23 @@ class PopularMovies(Action):
     def name(self) -> Text:
         return "popular_movies"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
 
-        popular_data = get_favourite()
+        popular_data = await get_favourite()
         movies = popular_data.get("results", [])
-        print(movies)
 
         if not movies:
             dispatcher.utter_message(text="Non ho trovato film popolari al momento.")
             return []
 
-        response = "🎬 Ecco i film più popolari:\n"
-        for idx, movie in enumerate(movies[:5], start=1):
-            title = movie.get("title", "Titolo non disponibile")
-            release_date = movie.get("release_date", "Data di uscita non disponibile")
-            response += f"\n{idx}. {title}\n📅 Uscita: {release_date}\n"
-
-        dispatcher.utter_message(text=response)
+        dispatcher.utter_message(text=render_list("popular_movies", popular_data, "🎬 Ecco i film più popolari:\n"))
 
-        return []
+        return [SlotSet(CURSOR_SLOT, new_cursor("popular_movies", popular_data, RESULTS_PAGE_SIZE))]
 
 
 """
@@ -340,9 +288,11 @@ class ActionTvDetails(Action):
     def name(self) -> Text:
         return "action_TV_details"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         title = tracker.get_slot("titolo_serieTV")
 
@@ -354,34 +304,18 @@ class ActionTvDetails(Action):
             dispatcher.utter_message(text="Manca la chiave API. Non posso recuperare i dettagli del film.")
             return []
 
-        search_data = search_TV_by_title(title)
-
-        results = search_data.get("results", [])
-        if not results:
+        year = extract_year(tracker.latest_message.get("text"))
+        candidates = await tv_candidates(title, year)
+        if not candidates:
             dispatcher.utter_message(text=f"Non ho trovato nessuna serie TV con questo titolo: {title}.")
             return []
 
-        serie_tv = results[0]
-        series_id = serie_tv.get("id")
-
-        if not series_id:
-            dispatcher.utter_message(text="Non sono riuscito a recuperare l'ID della SerieTV.")
+        serie_tv, details_data = await pick_best(title, candidates, get_tv_full, year)
+        if serie_tv is None:
+            dispatcher.utter_message(text="Non sono riuscito a recuperare i dettagli della serie tv, riprova più tardi.")
             return []
 
-        details_data = get_TV_details(series_id)
-        serie_tv_title = details_data.get("name", "Titolo non disponibile")
-        overview = details_data.get("overview", "Nessuna trama disponibile")
-        release_date = details_data.get("first_air_date", "Data di uscita non disponibile")
-        # Formattiamo la trama con una lunghezza ragionevole (se è troppo lunga)
-        truncated_overview = overview[:500] + "..." if len(overview) > 500 else overview
-
-        message = (
-            f"🎬 {serie_tv_title}\n\n"
-            f"📅 Data di uscita: {release_date}\n\n"
-            f"📝 Trama:\n{truncated_overview}"
-        )
-
-        dispatcher.utter_message(text=message)
+        dispatcher.utter_message(text=render_details(TV_DETAILS, details_data))
         return []
 
 
@@ -392,35 +326,21 @@ class ActionTVRecentReleases(Action):
     def name(self) -> Text:
         return "action_recent_releases_TV"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
-        data = search_TV_latest()
+        data = await search_TV_latest()
         results = data.get("results", [])
 
         if not results:
             dispatcher.utter_message(text="Non ho nessuna serie tv uscita di  recentemente")
             return []
 
-        # Titolo del messaggio
-        messaggio = "🎬 Serie tv recenten"
-        for serie in results[:5]:
-            title = serie.get("name", "Titolo non disponibile")
-            release_date = serie.get("first_air_date", "Data non disponibile")
-            overview = serie.get("overview", "Trama non disponibile")
-
-            # Truncare l'overview se troppo lunga
-            truncated_overview = overview[:300] + "..." if len(overview) > 300 else overview
-
-            messaggio += (
-                f"\n• {title}"
-                f"\n📅 Uscita: {release_date}"
-                f"\n📝 {truncated_overview}\n"
-            )
-
-        dispatcher.utter_message(text=messaggio)
-        return []
+        dispatcher.utter_message(text=render_list("recent_tv", data, "🎬 Serie tv recenten"))
+        return [SlotSet(CURSOR_SLOT, new_cursor("recent_tv", data, RESULTS_PAGE_SIZE))]
 
 
 class ActionPopularTv(Action):
@@ -431,27 +351,23 @@ class ActionPopularTv(Action):
     def name(self) -> Text:
         return "popular_TV"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
 
-        popular_data = get_favourite_tv()
+        popular_data = await get_favourite_tv()
         series = popular_data.get("results", [])
 
         if not series:
             dispatcher.utter_message(text="Non ho trovato serie tv popolari al momento.")
             return []
 
-        response = "🎬 Ecco le serie tv più popolari:\n"
-        for idx, movie in enumerate(series[:5], start=1):
-            title = movie.get("name", "Titolo non disponibile")
-            release_date = movie.get("first_air_date", "Data di uscita non disponibile")
-            response += f"\n{idx}. {title}\n📅 Uscita: {release_date}\n"
+        dispatcher.utter_message(text=render_list("popular_tv", popular_data, "🎬 Ecco le serie tv più popolari:\n"))
 
-        dispatcher.utter_message(text=response)
-
-        return []
+        return [SlotSet(CURSOR_SLOT, new_cursor("popular_tv", popular_data, RESULTS_PAGE_SIZE))]
 
 class ActionTvByGenre(Action):
     """
@@ -461,47 +377,74 @@ class ActionTvByGenre(Action):
     def name(self) -> Text:
         return "TV_by_genre"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         genere = tracker.get_slot("genere")
         if not genere:
             dispatcher.utter_message(text="Non ho capito il genere che cerchi. Puoi ripetere?")
             return []
 
-        genre_id = TV_GENRE_MAP.get(genere.lower())
-        if not genre_id:
+        query = compile_query("tv", tracker.latest_message.get("text"), genere, tracker.get_slot("anno"))
+        if not query.genres:
             dispatcher.utter_message(text=f"Non conosco il genere{genere}, prova con un altro.")
             return []
 
-        data = get_tv_by_genre(genre_id)
+        params = discover_params(query)
+        data = await discover_tv(params)
         results = data.get("results", [])
+        descrizione = describe(query, genere)
 
         if not results:
-            dispatcher.utter_message(text=f"Non ho trovato serie del genere {genere}.")
+            dispatcher.utter_message(text=f"Non ho trovato serie del genere {descrizione}.")
             return []
 
-        messaggio = f"🎬 Ecco alcune serie  del genere {genere}:\n"
-        for movie in results[:5]:
-            title = movie.get("name", "Titolo non disponibile")
-            overview = movie.get("first_air_date", "Trama non disponibile")
+        messaggio = render_list("tv_by_genre", data, f"🎬 Ecco alcune serie  del genere {descrizione}:\n")
+        dispatcher.utter_message(text=messaggio)
+        return [SlotSet(CURSOR_SLOT, new_cursor("tv_by_genre", data, RESULTS_PAGE_SIZE, params))]
 
-            truncated_overview = overview[:300] + "..." if len(overview) > 300 else overview
+class ActionShowMore(Action):
+    """
+    Azione per mostrare i risultati successivi dell'ultima lista ("mostrami altri").
+    """
 
-            messaggio += (
-                f"\n• {title}\n"
-                f"📝 {truncated_overview}\n"
-            )
+    def name(self) -> Text:
+        return "action_show_more"
+
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+
+        cursor = tracker.get_slot(CURSOR_SLOT)
+        if not cursor or cursor.get("list") not in LIST_VIEWS:
+            dispatcher.utter_message(text="Non ho altri risultati da mostrarti, prova con una nuova ricerca.")
+            return []
+
+        template, separate = LIST_VIEWS[cursor["list"]]
+        items, next_cursor, position = await next_results(cursor)
+        if not items:
+            dispatcher.utter_message(text="Non ci sono altri risultati.")
+            return [SlotSet(CURSOR_SLOT, None)]
+
+        if separate:
+            for idx, item in enumerate(items, start=position + 1):
+                dispatcher.utter_message(text=template.render(item, idx=idx))
+        else:
+            dispatcher.utter_message(text=compose_list(cursor["list"], items, "🎬 Ecco altri risultati:\n", position))
+        return [SlotSet(CURSOR_SLOT, next_cursor)]
 
-        dispatcher.utter_message(text=messaggio)
-        return []
 
 # actions.py
 class ActionSetContextTitle(Action):
     def name(self) -> Text:
         return "action_set_context_title"
 
+    @instrumented
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -512,6 +455,7 @@ class ActionAskMovieOrSeries(Action):
     def name(self) -> Text:
         return "action_ask_movie_or_series"
 
+    @instrumented
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -522,9 +466,11 @@ class ActionAskRewiewsSeries(Action):
     def name(self) -> Text:
         return "TV_reviews"
     
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @instrumented
+    @with_turn_budget()
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         titolo = tracker.get_slot("titolo_serieTV")
 
@@ -536,45 +482,31 @@ class ActionAskRewiewsSeries(Action):
             dispatcher.utter_message(text="Manca la chiave API. Non posso recuperare le recensioni.")
             return []
         
-        search_data = search_TV_by_title(titolo)
-        results = search_data.get("results", [])
-        if not results:
+        serie_tv = await resolve_tv(titolo, extract_year(tracker.latest_message.get("text")))
+        if serie_tv is None:
             dispatcher.utter_message(text=f"Non ho trovato alcuna serie tv con il titolo {titolo}.")
             return []
         
-        serie_tv = results[0]
         series_id = serie_tv.get("id")
 
         if not series_id:
             dispatcher.utter_message(text="Non sono riuscito a recuperare l'ID della serie tv.")
             return []
         
-        reviews_data = get_series_reviews(series_id)
-        reviews = reviews_data.get("results", [])
-
-        if reviews:
-            # Titolo del messaggio
-            dispatcher.utter_message(text=f"🎬 Recensioni per {serie_tv.get('name', 'la serie tv')}:")
+        async with ReplyStream(dispatcher, tracker) as stream:
+            # Il titolo parte subito, mentre si scaricano le recensioni
+            stream.send(f"🎬 Recensioni per {serie_tv.get('name', 'la serie tv')}:")
+            reviews_data = (await get_tv_full(series_id)).get("reviews", {})
+            reviews = reviews_data.get("results", [])
 
             # Mostriamo fino a 5 recensioni
-            for review in reviews[:5]:
-                author = review.get("author", "Autore sconosciuto")
-                content = review.get("content", "Recensione non disponibile")
-                truncated_content = content[:600].strip()
-
-                # Aggiungere i puntini di sospensione se la recensione è stata troncata
-                if len(content) > 600:
-                    truncated_content += "..."
-
-                message = (
-                    f"\n👤 Autore: {author}\n"
-                    f"📝 Recensione:\n{truncated_content}\n"
-                )
-                dispatcher.utter_message(text=message)
-        else:   
-            dispatcher.utter_message(text="Non sono disponibili recensioni per questa serie tv.")
+            for entry in render_entries("tv_reviews", reviews_data):
+                stream.send(entry)
 
-        return []
+            if not reviews:
+                stream.send("Non sono disponibili recensioni per questa serie tv.")
+
+        return [SlotSet(CURSOR_SLOT, new_cursor("tv_reviews", reviews_data, RESULTS_PAGE_SIZE, series_id))]
 
 
 class ValidateFormFilm(FormValidationAction):
@@ -666,6 +598,8 @@ class ActionProvideFilmDetails(Action):
     def name(self) -> Text:
         return "action_provide_film_details"
 
+    @instrumented
+    @with_turn_budget()
     async def run(
             self,
             dispatcher: CollectingDispatcher,
@@ -678,58 +612,23 @@ class ActionProvideFilmDetails(Action):
         genere_coiche = tracker.get_slot("genere_form")
 
         # Per esempio:
-        search_data = search_movie_by_title(titolo)
-
-        results = search_data.get("results", [])
-        if not results:
+        movie = await resolve_movie(titolo, extract_year(tracker.latest_message.get("text")))
+        if movie is None:
             dispatcher.utter_message(text=f"_Non ho trovato nessun film con questo titolo: {titolo}.")
             return []
 
-        movie = results[0]
         movie_id = movie.get("id")
 
         if not movie_id:
             dispatcher.utter_message(text="Non sono riuscito a recuperare l'ID del film.")
             return []
 
-        details_data = get_movie_details(movie_id)
+        details_data = await get_movie_full(movie_id)
 
-        trama = details_data.get("overview", "Nessuna trama trovata.")
-        anno_uscita = details_data.get("release_date", "sconosciuto")
-        genere = details_data.get("genres", "sconosciuto")
-
-        # genere è una lista di dizionari, quindi per ottenere il nome del genere, possiamo usare una list comprehension
-        genere = ", ".join([g["name"] for g in genere])
-
-        # Creazione del messaggio con formattazione professionale
-        if anno_choice == "Sì" and genere_coiche == "Sì":
-            # L'utente vuole l'anno e il genere
-            dispatcher.utter_message(
-                text=f"🎬 Dettagli del film: {titolo}\n\n"
-                     f"📝 Trama: {trama}\n"
-                     f"📅 Anno di uscita: {anno_uscita}\n"
-                     f"🎭 Genere: {genere}"
-            )
-        elif anno_choice == "Sì" and genere_coiche == "NO":
-            # L'utente vuole solo l'anno
-            dispatcher.utter_message(
-                text=f"🎬 Dettagli del film: {titolo}\n\n"
-                     f"📝 Trama: {trama}\n"
-                     f"📅 Anno di uscita: {anno_uscita}"
-            )
-        elif anno_choice == "NO" and genere_coiche == "Sì":
-            # L'utente vuole solo il genere
-            dispatcher.utter_message(
-                text=f"🎬 Dettagli del film: {titolo}\n\n"
-                     f"📝 Trama: {trama}\n"
-                     f"🎭 Genere: {genere}"
-            )
-        else:
-            # L'utente non vuole né l'anno né il genere
-            dispatcher.utter_message(
-                text=f"🎬 Dettagli del film: {titolo}\n\n"
-                     f"📝 Trama: {trama}"
-            )
+        # Una sola composizione per le quattro combinazioni di anno e genere richiesti
+        dispatcher.utter_message(
+            text=render_film_form(details_data, titolo, anno_choice == "Sì", genere_coiche == "Sì")
+        )
 
         return []
 
@@ -738,6 +637,7 @@ class ActionResetSlots(Action):
     def name(self) -> str:
         return "action_reset_slots"
 
+    @instrumented
     def run(self, dispatcher, tracker, domain):
         # Slot da resettare
         slots_to_reset = [
@@ -762,6 +662,8 @@ class ActionGetImageFilm(Action):
     def name(self) -> Text:
         return "action_provide_film_image"
     
+    @instrumented
+    @with_turn_budget()
     async def run(self,
             dispatcher: CollectingDispatcher,
             tracker: Tracker,
@@ -777,31 +679,25 @@ class ActionGetImageFilm(Action):
             return []
         
         # Effettua la ricerca del film
-        search_data = search_movie_by_title(titolo)
-        results = search_data.get("results", [])
-        
-        if not results:
+        movie = await resolve_movie(titolo, extract_year(tracker.latest_message.get("text")))
+        if movie is None:
             dispatcher.utter_message(text=f"_Non ho trovato nessun film con il titolo *{titolo}*._")
             return []
         
-        # Ottieni il primo risultato
-        movie = results[0]
         poster_path = movie.get("poster_path")
-        
-        # Se l'anno è stato richiesto, invialo insieme all'immagine
-        if anno:
-            release_year = movie.get("release_date", "").split("-")[0]  # Estrai l'anno
-            dispatcher.utter_message(text=f"Il film *{titolo}* è uscito nel {release_year}.")
-        
-        if poster_path:
-            # Costruisci l'URL completo per l'immagine
-            image_url = f"https://image.tmdb.org/t/p/w500{poster_path}"
-            # Invia l'immagine tramite Telegram
-            dispatcher.utter_message(image=image_url)
-            return []
-        else:
-            dispatcher.utter_message(text="Non ho trovato l'immagine del film.")
-            return []
+
+        async with ReplyStream(dispatcher, tracker) as stream:
+            # Se l'anno è stato richiesto, invialo insieme all'immagine
+            if anno:
+                release_year = movie.get("release_date", "").split("-")[0]  # Estrai l'anno
+                stream.send(f"Il film *{titolo}* è uscito nel {release_year}.")
+
+            if poster_path:
+                # Locandina dalla cache su disco; su Telegram si riusa il file_id dei precedenti invii
+                await stream.send_photo(poster_path)
+            else:
+                stream.send("Non ho trovato l'immagine del film.")
+        return []
 class ValidateFormLocandina(FormValidationAction):
     def name(self) -> str:
         return "validate_form_locandina"
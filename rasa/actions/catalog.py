@@ -0,0 +1,305 @@
+import json
+import re
+import struct
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from . import json_codec
+from .constants import CATALOG_MATCH_THRESHOLD
+from .records import MovieRecord, TvRecord, Record, to_jsonable
+from .snapshot import Items, Snapshot, pack_ids, unpack_ids
+
+# Articoli iniziali ignorati nel confronto dei titoli
+_ARTICLES = ("il", "lo", "la", "i", "gli", "le", "l", "un", "uno", "una", "the", "a", "an")
+_ARTICLE_RE = re.compile(r"^(?:%s)\s+" % "|".join(_ARTICLES))
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+
+_TITLE_FIELDS = {"movie": ("title", "original_title"), "tv": ("name", "original_name")}
+
+# Chiave dei record nello snapshot: ID big endian, così l'ordine dei byte è quello numerico
+_RECORD_KEY = struct.Struct(">Q")
+# Voci dell'indice nello snapshot: (ID del record, numero di trigrammi)
+_INDEX_ENTRY = struct.Struct("=II")
+
+
+def normalize_title(title: str) -> str:
+    """
+    Funzione per normalizzare un titolo: minuscole, senza accenti,
+    punteggiatura e articolo iniziale.
+
+    :param title: Il titolo da normalizzare
+    :return: Il titolo normalizzato
+    """
+    text = unicodedata.normalize("NFKD", title.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _NON_WORD_RE.sub(" ", text)
+    text = " ".join(text.split())
+    return _ARTICLE_RE.sub("", text) or text
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _year_of(record: Any) -> Optional[int]:
+    date = record.get("release_date") or record.get("first_air_date") or ""
+    return int(date[:4]) if date[:4].isdigit() else None
+
+
+def project_record(kind: str, data: Dict[str, Any]) -> Record:
+    """
+    Funzione per ridurre un risultato TMDB ai campi conservati nel catalogo.
+
+    :param kind: "movie" oppure "tv"
+    :param data: Il risultato di ricerca, di lista o di dettaglio
+    :return: Il record con i soli campi del catalogo
+    """
+    return (MovieRecord if kind == "movie" else TvRecord).from_json(data)
+
+
+class TitleIndex:
+    """
+    Indice invertito immutabile dei titoli normalizzati, con ricerca esatta
+    e approssimata tramite trigrammi.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, int]]) -> None:
+        self._exact: Dict[str, Set[int]] = {}
+        self._postings: Dict[str, List[int]] = {}
+        # Per ogni titolo indicizzato: (ID del record, numero di trigrammi)
+        self._entries: List[Tuple[int, int]] = []
+        for title, record_id in entries:
+            key = normalize_title(title)
+            if not key or record_id in self._exact.get(key, ()):
+                continue
+            self._exact.setdefault(key, set()).add(record_id)
+            grams = _trigrams(key)
+            position = len(self._entries)
+            self._entries.append((record_id, len(grams)))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(position)
+
+    def _exact_ids(self, key: str) -> Iterable[int]:
+        return self._exact.get(key, ())
+
+    def _postings_of(self, gram: str) -> Iterable[int]:
+        return self._postings.get(gram, ())
+
+    def _entry(self, position: int) -> Tuple[int, int]:
+        return self._entries[position]
+
+    def lookup(self, title: str, threshold: float) -> List[int]:
+        """
+        Funzione per cercare gli ID dei titoli corrispondenti.
+
+        :param title: Il titolo cercato
+        :param threshold: La similarità minima (Jaccard sui trigrammi) per i match approssimati
+        :return: Gli ID trovati, vuota se nessun titolo è abbastanza simile
+        """
+        key = normalize_title(title)
+        exact = self._exact_ids(key)
+        if exact:
+            return list(exact)
+
+        grams = _trigrams(key)
+        overlaps = Counter()
+        for gram in grams:
+            overlaps.update(self._postings_of(gram))
+
+        best_score, best_ids = 0.0, set()
+        for position, overlap in overlaps.items():
+            record_id, size = self._entry(position)
+            score = overlap / (len(grams) + size - overlap)
+            if score > best_score:
+                best_score, best_ids = score, {record_id}
+            elif score == best_score:
+                best_ids.add(record_id)
+        return list(best_ids) if best_score >= threshold else []
+
+    def tables(self) -> Dict[str, Items]:
+        """
+        Funzione per serializzare l'indice nelle tabelle dello snapshot condiviso.
+
+        :return: Le tabelle "titles", "grams" e "entries"
+        """
+        return {
+            "titles": [(key.encode("utf-8"), pack_ids(sorted(ids))) for key, ids in self._exact.items()],
+            "grams": [(gram.encode("utf-8"), pack_ids(positions)) for gram, positions in self._postings.items()],
+            "entries": [(b"", b"".join(_INDEX_ENTRY.pack(*entry) for entry in self._entries))],
+        }
+
+
+class MappedTitleIndex(TitleIndex):
+    """
+    Indice dei titoli letto da uno snapshot mappato in memoria: stessa
+    ricerca di TitleIndex, senza copie dell'indice nel processo.
+    """
+
+    def __init__(self, snapshot: Snapshot, kind: str) -> None:
+        self._titles = snapshot.table(f"{kind}:titles")
+        self._grams = snapshot.table(f"{kind}:grams")
+        entries = snapshot.table(f"{kind}:entries").get(b"")
+        self._entry_view = entries if entries is not None else memoryview(b"")
+        # Coppie (ID, trigrammi) come interi a 32 bit, lette senza struct.unpack per voce
+        self._entry_ids = unpack_ids(self._entry_view)
+
+    def _exact_ids(self, key: str) -> Iterable[int]:
+        view = self._titles.get(key.encode("utf-8"))
+        return unpack_ids(view) if view is not None else ()
+
+    def _postings_of(self, gram: str) -> Iterable[int]:
+        view = self._grams.get(gram.encode("utf-8"))
+        return unpack_ids(view) if view is not None else ()
+
+    def _entry(self, position: int) -> Tuple[int, int]:
+        ids = self._entry_ids
+        return ids[2 * position], ids[2 * position + 1]
+
+    def tables(self) -> Dict[str, Items]:
+        return {
+            "titles": [(key, bytes(value)) for key, value in self._titles.items()],
+            "grams": [(key, bytes(value)) for key, value in self._grams.items()],
+            "entries": [(b"", bytes(self._entry_view))],
+        }
+
+
+class MappedRecords:
+    """
+    Record del catalogo letti da uno snapshot mappato in memoria e
+    decodificati solo quando vengono restituiti da una ricerca.
+    """
+
+    def __init__(self, snapshot: Snapshot, kind: str) -> None:
+        self._kind = kind
+        self._table = snapshot.table(f"{kind}:records")
+
+    def __getitem__(self, record_id: int) -> Record:
+        view = self._table.get(_RECORD_KEY.pack(record_id))
+        if view is None:
+            raise KeyError(record_id)
+        return project_record(self._kind, json_codec.loads(bytes(view)))
+
+    def __len__(self) -> int:
+        return self._table.count
+
+    def values(self) -> Iterator[Record]:
+        return (project_record(self._kind, json_codec.loads(bytes(value))) for _, value in self._table.items())
+
+    def items(self) -> Iterator[Tuple[bytes, bytes]]:
+        return ((key, bytes(value)) for key, value in self._table.items())
+
+
+class Catalog:
+    """
+    Catalogo locale di film e serie tv con indice dei titoli italiani e originali.
+
+    Ogni aggiornamento costruisce un nuovo indice e lo sostituisce in blocco,
+    così le letture non richiedono lock. Con lo snapshot condiviso i record
+    e l'indice vengono letti dalla memoria mappata (vedi attach).
+    """
+
+    def __init__(self) -> None:
+        # Per ogni tipo: (record per ID, indice dei titoli), sostituiti insieme
+        self._snapshots: Dict[str, Tuple[Dict[int, Dict[str, Any]], TitleIndex]] = {
+            "movie": ({}, TitleIndex([])),
+            "tv": ({}, TitleIndex([])),
+        }
+        # Incrementata a ogni sostituzione, per sapere quando ripubblicare lo snapshot
+        self.version = 0
+
+    def replace(self, kind: str, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Funzione per sostituire i record di un tipo e ricostruirne l'indice.
+
+        :param kind: "movie" oppure "tv"
+        :param records: I risultati TMDB da inserire nel catalogo
+        """
+        projected = {}
+        for data in records:
+            if data.get("id"):
+                projected[data["id"]] = project_record(kind, data)
+        entries = [
+            (record[field], record_id)
+            for record_id, record in projected.items()
+            for field in _TITLE_FIELDS[kind]
+            if record.get(field)
+        ]
+        self._snapshots[kind] = (projected, TitleIndex(entries))
+        self.version += 1
+
+    def tables(self) -> Dict[str, Items]:
+        """
+        Funzione per serializzare record e indici nelle tabelle dello snapshot condiviso.
+
+        :return: Le tabelle "<tipo>:records", "<tipo>:titles", "<tipo>:grams" e "<tipo>:entries"
+        """
+        tables: Dict[str, Items] = {}
+        for kind, (records, index) in self._snapshots.items():
+            if isinstance(records, MappedRecords):
+                tables[f"{kind}:records"] = list(records.items())
+            else:
+                tables[f"{kind}:records"] = [
+                    (_RECORD_KEY.pack(record_id), json.dumps(record, separators=(",", ":"), ensure_ascii=False,
+                                                             default=to_jsonable).encode("utf-8"))
+                    for record_id, record in records.items()
+                ]
+            for name, items in index.tables().items():
+                tables[f"{kind}:{name}"] = items
+        return tables
+
+    def attach(self, snapshot: Snapshot, version: Optional[int] = None) -> None:
+        """
+        Funzione per usare record e indici di uno snapshot mappato al posto di quelli in memoria.
+
+        :param snapshot: Lo snapshot, con le tabelle prodotte da tables
+        :param version: La versione del catalogo da cui è stato scritto lo snapshot;
+                        se nel frattempo il catalogo è cambiato, lo snapshot viene ignorato
+        """
+        if version is not None and version != self.version:
+            return
+        for kind in self._snapshots:
+            if snapshot.table(f"{kind}:records") is not None:
+                self._snapshots[kind] = (MappedRecords(snapshot, kind), MappedTitleIndex(snapshot, kind))
+
+    def search(self, kind: str, title: str, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Funzione per cercare un titolo nel catalogo locale. Il catalogo contiene
+        solo una parte dei titoli TMDB: se è indicato un anno e nessun titolo
+        trovato è di quell'anno, la ricerca va fatta su TMDB, che può avere
+        altri titoli omonimi (es. "Dune" del 1984 oltre a quello del 2021).
+
+        :param kind: "movie" oppure "tv"
+        :param title: Il titolo cercato
+        :param year: L'anno richiesto, se indicato
+        :return: Una risposta con la stessa forma di /search, oppure None se il titolo non è nel catalogo
+        """
+        records, index = self._snapshots[kind]
+        ids = index.lookup(title, CATALOG_MATCH_THRESHOLD)
+        if not ids:
+            return None
+        results = sorted((records[i] for i in ids), key=lambda r: r.get("popularity", 0), reverse=True)
+        if year and not any(_year_of(r) == year for r in results):
+            return None
+        return {"page": 1, "results": results, "total_pages": 1, "total_results": len(results)}
+
+    def records(self, kind: str) -> List[Dict[str, Any]]:
+        """
+        Funzione per ottenere i record di un tipo presenti nel catalogo.
+
+        :param kind: "movie" oppure "tv"
+        :return: La lista dei record
+        """
+        return list(self._snapshots[kind][0].values())
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Funzione per ottenere il numero di titoli nel catalogo.
+
+        :return: Il dizionario con il numero di film e di serie
+        """
+        return {"movies": len(self._snapshots["movie"][0]), "tv": len(self._snapshots["tv"][0])}
+
+
+catalog = Catalog()
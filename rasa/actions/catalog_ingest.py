@@ -0,0 +1,153 @@
+import gzip
+import heapq
+import json
+import logging
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from .catalog import catalog
+from .constants import (
+    CATALOG_ENABLED,
+    CATALOG_REFRESH_INTERVAL,
+    CATALOG_LIST_PAGES,
+    CATALOG_EXPORT_LIMIT,
+    CATALOG_INGEST_RATE,
+)
+from .http_session import session_get
+from .rate_limit import TokenBucket
+from .tmdb_utils import build_tmdb_params, make_tmdb_request, prefetch_requests, request_upstream, tmdb_guard
+
+logger = logging.getLogger(__name__)
+
+LIST_ENDPOINTS = {
+    "movie": ("/movie/popular", "/movie/now_playing"),
+    "tv": ("/tv/popular", "/tv/on_the_air"),
+}
+EXPORT_NAMES = {"movie": "movie_ids", "tv": "tv_series_ids"}
+EXPORT_URL = "https://files.tmdb.org/p/exports/{name}_{day:%m_%d_%Y}.json.gz"
+
+_refresh_thread: Optional[threading.Thread] = None
+# I dettagli passano anche dal rate limiter condiviso: questo limite ulteriore
+# lascia alle richieste degli utenti quasi tutta la quota verso TMDB
+_ingest_bucket = TokenBucket(CATALOG_INGEST_RATE, 1)
+
+
+def _list_page_params(page: int) -> Optional[Dict[str, Any]]:
+    # La prima pagina usa la stessa chiave di cache delle azioni
+    return {"page": page} if page > 1 else None
+
+
+def fetch_list_pages(kind: str) -> List[Dict[str, Any]]:
+    """
+    Funzione per scaricare le pagine delle liste di popolari e novità.
+
+    :param kind: "movie" oppure "tv"
+    :return: I risultati di tutte le pagine
+    """
+    results = []
+    # Le pagine già scaricate da altre repliche arrivano tutte insieme dalla cache remota
+    prefetch_requests([
+        (endpoint, _list_page_params(page))
+        for endpoint in LIST_ENDPOINTS[kind]
+        for page in range(1, CATALOG_LIST_PAGES + 1)
+    ])
+    for endpoint in LIST_ENDPOINTS[kind]:
+        for page in range(1, CATALOG_LIST_PAGES + 1):
+            data = make_tmdb_request(endpoint, _list_page_params(page))
+            results.extend(data.get("results", []))
+            if page >= data.get("total_pages", 0):
+                break
+    return results
+
+
+def fetch_export_ids(kind: str, limit: int) -> List[int]:
+    """
+    Funzione per leggere dall'export giornaliero di TMDB gli ID più popolari.
+
+    :param kind: "movie" oppure "tv"
+    :param limit: Il numero massimo di ID da restituire
+    :return: Gli ID ordinati per popolarità decrescente
+    """
+    day = date.today() - timedelta(days=1)
+    url = EXPORT_URL.format(name=EXPORT_NAMES[kind], day=day)
+    try:
+        with session_get(url, stream=True, timeout=60) as r:
+            if r.status_code != 200:
+                logger.warning(f"Export TMDB non disponibile: {url} ({r.status_code})")
+                return []
+            with gzip.GzipFile(fileobj=r.raw) as lines:
+                entries = (json.loads(line) for line in lines if line.strip())
+                top = heapq.nlargest(limit, (e for e in entries if not e.get("adult")),
+                                     key=lambda e: e.get("popularity", 0))
+    except (requests.RequestException, OSError, EOFError, zlib.error, ValueError) as e:
+        # Senza export il catalogo resta fatto delle sole liste
+        logger.warning(f"Export TMDB non leggibile: {url} ({e})")
+        return []
+    return [e["id"] for e in top]
+
+
+def fetch_details(kind: str, record_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Funzione per scaricare i dettagli di un titolo senza passare dalla cache,
+    con gli stessi limiti (rate limiter, retry, circuit breaker) delle azioni.
+
+    :param kind: "movie" oppure "tv"
+    :param record_id: L'ID del titolo
+    :return: I dettagli del titolo, oppure None
+    """
+    time.sleep(_ingest_bucket.reserve())
+    data = request_upstream(f"/{kind}/{record_id}", build_tmdb_params())
+    return data if isinstance(data, dict) and data.get("id") else None
+
+
+def refresh_catalog() -> None:
+    """
+    Funzione per ricostruire il catalogo locale da liste ed export giornalieri.
+    """
+    for kind in ("movie", "tv"):
+        started = time.monotonic()
+        records = {r["id"]: r for r in fetch_list_pages(kind) if r.get("id")}
+        if CATALOG_EXPORT_LIMIT > 0:
+            # I titoli già presenti non vengono scaricati di nuovo
+            previous = {r["id"]: r for r in catalog.records(kind)}
+            missing = 0
+            for record_id in fetch_export_ids(kind, CATALOG_EXPORT_LIMIT):
+                if record_id in records:
+                    continue
+                record = previous.get(record_id)
+                if record is None and tmdb_guard.breaker.state == "closed":
+                    # A circuito aperto i titoli mancanti restano fuori fino al prossimo aggiornamento
+                    record = fetch_details(kind, record_id)
+                if record:
+                    records[record_id] = record
+                else:
+                    missing += 1
+            if missing:
+                logger.warning(f"Catalogo {kind}: {missing} titoli dell'export non scaricati")
+        catalog.replace(kind, records.values())
+        logger.info(f"Catalogo {kind}: {len(records)} titoli in {time.monotonic() - started:.1f}s")
+
+
+def _refresh_loop() -> None:
+    while True:
+        try:
+            refresh_catalog()
+        except Exception:
+            logger.exception("Aggiornamento del catalogo locale non riuscito")
+        time.sleep(CATALOG_REFRESH_INTERVAL)
+
+
+def start_catalog_refresh() -> None:
+    """
+    Funzione per avviare l'aggiornamento periodico del catalogo, se abilitato.
+    """
+    global _refresh_thread
+    if not CATALOG_ENABLED or _refresh_thread is not None:
+        return
+    _refresh_thread = threading.Thread(target=_refresh_loop, name="tmdb-catalog", daemon=True)
+    _refresh_thread.start()
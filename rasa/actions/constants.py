@@ -4,7 +4,117 @@ from dotenv import load_dotenv
 load_dotenv()
 
 api_key = os.getenv("TMDB_API_KEY")
-base_url = "https://api.themoviedb.org/3"
+base_url = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+
+# Sotto-risorse incluse nella richiesta unica dei dettagli di film e serie: solo
+# quelle conservate dalla proiezione in records.py (credits e images non sono usate)
+FULL_RECORD_APPEND = "watch/providers,reviews"
+
+# Parametri del pool di connessioni HTTP verso TMDB
+TMDB_POOL_CONNECTIONS = int(os.getenv("TMDB_POOL_CONNECTIONS", "4"))
+TMDB_POOL_MAXSIZE = int(os.getenv("TMDB_POOL_MAXSIZE", "20"))
+TMDB_POOL_BLOCK = os.getenv("TMDB_POOL_BLOCK", "false").lower() == "true"
+TMDB_KEEPALIVE = os.getenv("TMDB_KEEPALIVE", "true").lower() == "true"
+TMDB_ASYNC_POOL_LIMIT = int(os.getenv("TMDB_ASYNC_POOL_LIMIT", "100"))
+TMDB_KEEPALIVE_TIMEOUT = float(os.getenv("TMDB_KEEPALIVE_TIMEOUT", "30"))
+
+# Parametri della cache in memoria delle risposte TMDB
+TMDB_CACHE_ENABLED = os.getenv("TMDB_CACHE_ENABLED", "true").lower() == "true"
+TMDB_CACHE_MAX_ENTRIES = int(os.getenv("TMDB_CACHE_MAX_ENTRIES", "2000"))
+TMDB_CACHE_MAX_BYTES = int(os.getenv("TMDB_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TMDB_CACHE_DEFAULT_TTL = float(os.getenv("TMDB_CACHE_DEFAULT_TTL", "3600"))
+
+# Timeout della singola richiesta e budget di tempo complessivo di un turno
+TMDB_REQUEST_TIMEOUT = float(os.getenv("TMDB_REQUEST_TIMEOUT", "5"))
+ACTION_TURN_BUDGET = float(os.getenv("ACTION_TURN_BUDGET", "8"))
+
+# Rate limiting, retry e circuit breaker verso TMDB
+TMDB_RATE_LIMIT = float(os.getenv("TMDB_RATE_LIMIT", "40"))
+TMDB_RATE_BURST = int(os.getenv("TMDB_RATE_BURST", "40"))
+TMDB_MAX_RETRIES = int(os.getenv("TMDB_MAX_RETRIES", "3"))
+TMDB_RETRY_BASE_DELAY = float(os.getenv("TMDB_RETRY_BASE_DELAY", "0.25"))
+TMDB_RETRY_MAX_DELAY = float(os.getenv("TMDB_RETRY_MAX_DELAY", "4"))
+TMDB_RETRY_BUDGET = float(os.getenv("TMDB_RETRY_BUDGET", "5"))
+TMDB_BREAKER_THRESHOLD = int(os.getenv("TMDB_BREAKER_THRESHOLD", "5"))
+TMDB_BREAKER_RESET = float(os.getenv("TMDB_BREAKER_RESET", "30"))
+
+# Stale-while-revalidate per le liste condivise (popolari, novità, discover)
+TMDB_STALE_TTL = float(os.getenv("TMDB_STALE_TTL", str(24 * 3600)))
+TMDB_REFRESH_AHEAD = float(os.getenv("TMDB_REFRESH_AHEAD", "300"))
+TMDB_REFRESH_INTERVAL = float(os.getenv("TMDB_REFRESH_INTERVAL", "30"))
+TMDB_REFRESH_IDLE_TTL = float(os.getenv("TMDB_REFRESH_IDLE_TTL", str(24 * 3600)))
+
+# Warm-up della cache all'avvio dell'action server
+TMDB_WARMUP = os.getenv("TMDB_WARMUP", "false").lower() == "true"
+TMDB_WARMUP_CONCURRENCY = int(os.getenv("TMDB_WARMUP_CONCURRENCY", "8"))
+
+# Cache persistente su SQLite (disattivata se il percorso non è impostato)
+TMDB_DISK_CACHE_PATH = os.getenv("TMDB_DISK_CACHE_PATH", "")
+TMDB_DISK_CACHE_VACUUM_INTERVAL = float(os.getenv("TMDB_DISK_CACHE_VACUUM_INTERVAL", "900"))
+
+# Cache remota condivisa tra le repliche (protocollo Redis, disattivata se l'URL non è impostato)
+REMOTE_CACHE_URL = os.getenv("REMOTE_CACHE_URL", "")
+REMOTE_CACHE_PREFIX = os.getenv("REMOTE_CACHE_PREFIX", "tmdb:")
+REMOTE_CACHE_TIMEOUT = float(os.getenv("REMOTE_CACHE_TIMEOUT", "0.1"))
+REMOTE_CACHE_POOL_SIZE = int(os.getenv("REMOTE_CACHE_POOL_SIZE", "8"))
+REMOTE_CACHE_RETRY_AFTER = float(os.getenv("REMOTE_CACHE_RETRY_AFTER", "10"))
+REMOTE_CACHE_LOCK_TTL = float(os.getenv("REMOTE_CACHE_LOCK_TTL", "5"))
+REMOTE_CACHE_LOCK_WAIT = float(os.getenv("REMOTE_CACHE_LOCK_WAIT", "2"))
+
+# Catalogo locale dei titoli più noti, per la ricerca senza chiamate di rete
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "false").lower() == "true"
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", str(6 * 3600)))
+CATALOG_LIST_PAGES = int(os.getenv("CATALOG_LIST_PAGES", "5"))
+CATALOG_EXPORT_LIMIT = int(os.getenv("CATALOG_EXPORT_LIMIT", "2000"))
+CATALOG_INGEST_RATE = float(os.getenv("CATALOG_INGEST_RATE", "5"))
+CATALOG_MATCH_THRESHOLD = float(os.getenv("CATALOG_MATCH_THRESHOLD", "0.9"))
+
+# Snapshot condiviso tra i worker dell'action server (ACTION_SERVER_SANIC_WORKERS > 1)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "")
+SNAPSHOT_PUBLISH_INTERVAL = float(os.getenv("SNAPSHOT_PUBLISH_INTERVAL", "60"))
+SNAPSHOT_CHECK_INTERVAL = float(os.getenv("SNAPSHOT_CHECK_INTERVAL", "5"))
+SNAPSHOT_DECODED_MAX_ENTRIES = int(os.getenv("SNAPSHOT_DECODED_MAX_ENTRIES", "256"))
+SNAPSHOT_DECODED_MAX_BYTES = int(os.getenv("SNAPSHOT_DECODED_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# Parametri della cache titolo -> risultato di ricerca
+TITLE_CACHE_MAX_ENTRIES = int(os.getenv("TITLE_CACHE_MAX_ENTRIES", "5000"))
+TITLE_CACHE_TTL = float(os.getenv("TITLE_CACHE_TTL", str(24 * 3600)))
+TITLE_NEGATIVE_TTL = float(os.getenv("TITLE_NEGATIVE_TTL", "600"))
+
+# Disambiguazione tra i primi risultati di ricerca di un titolo
+DISAMBIGUATION_CANDIDATES = int(os.getenv("DISAMBIGUATION_CANDIDATES", "3"))
+DISAMBIGUATION_CONCURRENCY = int(os.getenv("DISAMBIGUATION_CONCURRENCY", "3"))
+
+# Decoder JSON delle risposte TMDB: "auto" usa orjson o ujson se installati
+TMDB_JSON_DECODER = os.getenv("TMDB_JSON_DECODER", "auto")
+
+# Metriche in formato Prometheus (endpoint HTTP locale e/o file)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9105"))
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+METRICS_FILE_INTERVAL = float(os.getenv("METRICS_FILE_INTERVAL", "15"))
+
+# Invio diretto dei messaggi a Telegram mentre l'azione è ancora in corso
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "false").lower() == "true"
+TELEGRAM_ACCESS_TOKEN = os.getenv("TELEGRAM_ACCESS_TOKEN")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_SEND_TIMEOUT = float(os.getenv("TELEGRAM_SEND_TIMEOUT", "5"))
+
+# Cache delle locandine: file su disco per dimensione, endpoint statico e file_id di Telegram
+TMDB_IMAGE_BASE_URL = os.getenv("TMDB_IMAGE_BASE_URL", "https://image.tmdb.org/t/p")
+POSTER_CACHE_DIR = os.getenv("POSTER_CACHE_DIR", "")
+POSTER_SIZE = os.getenv("POSTER_SIZE", "w342")
+POSTER_SIZES = tuple(s.strip() for s in os.getenv("POSTER_SIZES", "w92,w185,w342,w500").split(",") if s.strip())
+POSTER_SERVER_HOST = os.getenv("POSTER_SERVER_HOST", "127.0.0.1")
+POSTER_SERVER_PORT = int(os.getenv("POSTER_SERVER_PORT", "0"))
+POSTER_PUBLIC_URL = os.getenv("POSTER_PUBLIC_URL", "").rstrip("/")
+POSTER_DOWNLOAD_TIMEOUT = float(os.getenv("POSTER_DOWNLOAD_TIMEOUT", "10"))
+POSTER_FILE_ID_TTL = int(os.getenv("POSTER_FILE_ID_TTL", str(30 * 24 * 3600)))
+
+# Risultati mostrati per ogni messaggio delle liste ("mostrami altri")
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", "5"))
+# Numero massimo di messaggi già composti tenuti in memoria (0 disattiva la cache)
+RENDER_CACHE_ENTRIES = int(os.getenv("RENDER_CACHE_ENTRIES", "512"))
 
 MOVIES_GENRE_MAP = {
     "azione": 28,
@@ -65,3 +175,23 @@ TV_GENRE_MAP = {
     "politica": 10768,
     "western": 37
 }
+
+# Piattaforme di streaming in Italia -> ID del provider su TMDB (filtri di /discover).
+# Solo nomi completi: "now", "disney" o "infinity" da soli compaiono anche in frasi e titoli comuni
+STREAMING_PROVIDERS_MAP = {
+    "netflix": 8,
+    "prime video": 119,
+    "amazon prime": 119,
+    "amazon prime video": 119,
+    "disney+": 337,
+    "disney plus": 337,
+    "apple tv+": 350,
+    "apple tv": 350,
+    "now tv": 39,
+    "paramount+": 531,
+    "paramount plus": 531,
+    "raiplay": 222,
+    "rai play": 222,
+    "mediaset infinity": 359,
+    "timvision": 109,
+}
@@ -0,0 +1,78 @@
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from .constants import ACTION_TURN_BUDGET, TMDB_REQUEST_TIMEOUT
+
+# Tempo minimo residuo perché abbia senso avviare una richiesta
+MIN_REQUEST_TIME = 0.05
+
+# Scadenza del turno corrente; il ContextVar segue sia i thread sia i task asyncio
+_deadline: ContextVar[Optional[float]] = ContextVar("tmdb_deadline", default=None)
+
+
+@contextmanager
+def turn_budget(seconds: float):
+    """
+    Context manager che imposta la scadenza del turno corrente.
+
+    :param seconds: Il budget totale in secondi
+    """
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def with_turn_budget(seconds: float = ACTION_TURN_BUDGET):
+    """
+    Decoratore per il metodo run asincrono di un'azione: tutte le chiamate a
+    TMDB del turno condividono lo stesso budget di tempo.
+
+    :param seconds: Il budget totale in secondi
+    """
+    def decorator(run):
+        @functools.wraps(run)
+        async def wrapper(*args, **kwargs):
+            with turn_budget(seconds):
+                return await run(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def remaining() -> Optional[float]:
+    """
+    Funzione per ottenere il tempo residuo del turno.
+
+    :return: I secondi residui, oppure None se non c'è una scadenza
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def request_timeout() -> Optional[float]:
+    """
+    Funzione per ottenere il timeout da usare per la prossima richiesta.
+
+    :return: Il timeout in secondi, oppure None se il budget del turno è esaurito
+    """
+    left = remaining()
+    if left is None:
+        return TMDB_REQUEST_TIMEOUT
+    if left <= MIN_REQUEST_TIME:
+        return None
+    return min(left, TMDB_REQUEST_TIMEOUT)
+
+
+def fits_budget(delay: float) -> bool:
+    """
+    Funzione per sapere se un'attesa termina prima della scadenza del turno.
+
+    :param delay: L'attesa in secondi
+    :return: True se dopo l'attesa resta tempo per una richiesta
+    """
+    left = remaining()
+    return left is None or delay + MIN_REQUEST_TIME < left
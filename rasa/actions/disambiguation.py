@@ -0,0 +1,93 @@
+import asyncio
+import math
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .catalog import normalize_title
+from .constants import DISAMBIGUATION_CONCURRENCY
+
+_YEAR_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
+_TITLE_FIELDS = ("title", "original_title", "name", "original_name")
+
+
+def extract_year(text: Optional[str]) -> Optional[int]:
+    """
+    Funzione per estrarre un anno (es. "Dune del 1984") da un testo.
+
+    :param text: Il testo del messaggio
+    :return: L'anno trovato, oppure None
+    """
+    match = _YEAR_RE.search(text or "")
+    return int(match.group(1)) if match else None
+
+
+def score_candidate(query: str, record: Dict[str, Any], year: Optional[int] = None) -> float:
+    """
+    Funzione per valutare quanto un risultato corrisponde alla richiesta.
+
+    :param query: Il titolo richiesto
+    :param record: Il risultato di ricerca
+    :param year: L'anno richiesto, se indicato
+    :return: Il punteggio (più alto è migliore)
+    """
+    wanted = normalize_title(_YEAR_RE.sub("", query))
+    titles = {normalize_title(record[f]) for f in _TITLE_FIELDS if record.get(f)}
+    score = 0.0
+    if wanted in titles:
+        score += 10
+    elif any(t.startswith(wanted) for t in titles):
+        score += 3
+    date = record.get("release_date") or record.get("first_air_date") or ""
+    if year and date[:4] == str(year):
+        score += 8
+    return score + math.log1p(record.get("popularity") or 0)
+
+
+def rank_candidates(query: str, candidates: List[Dict[str, Any]], year: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Funzione per ordinare i risultati di ricerca dal più al meno pertinente.
+    Titolo, data e popolarità sono già nei risultati di ricerca, quindi non
+    serve scaricare i dettagli per confrontarli.
+
+    :param query: Il titolo richiesto
+    :param candidates: I risultati di ricerca
+    :param year: L'anno richiesto, se indicato
+    :return: I risultati ordinati (a parità di punteggio resta l'ordine di TMDB)
+    """
+    return sorted(candidates, key=lambda c: score_candidate(query, c, year), reverse=True)
+
+
+async def pick_best(
+        query: str,
+        candidates: List[Dict[str, Any]],
+        fetch: Callable[[int], Awaitable[dict]],
+        year: Optional[int] = None,
+        usable: Callable[[dict], bool] = bool,
+) -> Tuple[Optional[Dict[str, Any]], dict]:
+    """
+    Funzione per scegliere il candidato migliore e scaricarne i dettagli. I
+    dettagli dei candidati vengono scaricati in parallelo (al massimo
+    DISAMBIGUATION_CONCURRENCY alla volta), così il ripiego sul candidato
+    successivo non costa altri round trip.
+
+    :param query: Il titolo richiesto
+    :param candidates: I risultati di ricerca candidati
+    :param fetch: La funzione asincrona che scarica i dettagli dato un ID
+    :param year: L'anno richiesto, se indicato
+    :param usable: La funzione che dice se i dettagli bastano all'azione
+                   (di default basta che non siano vuoti)
+    :return: La coppia (risultato di ricerca, dettagli) del primo candidato in
+             ordine di pertinenza con dettagli utilizzabili, oppure (None, {})
+    """
+    ranked = rank_candidates(query, candidates, year)
+    semaphore = asyncio.Semaphore(max(1, DISAMBIGUATION_CONCURRENCY))
+
+    async def fetch_one(candidate: Dict[str, Any]) -> dict:
+        async with semaphore:
+            return await fetch(candidate["id"])
+
+    details = await asyncio.gather(*(fetch_one(c) for c in ranked))
+    for candidate, candidate_details in zip(ranked, details):
+        if candidate_details and usable(candidate_details):
+            return candidate, candidate_details
+    return None, {}
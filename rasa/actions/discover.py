@@ -0,0 +1,198 @@
+import re
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from .constants import MOVIES_GENRE_MAP, TV_GENRE_MAP, STREAMING_PROVIDERS_MAP
+
+# Regione dei filtri sui provider (le azioni mostrano solo l'Italia)
+WATCH_REGION = "IT"
+
+# Parametri delle date su /discover: (anno esatto, dal giorno, fino al giorno)
+_DATE_PARAMS = {
+    "movie": ("primary_release_year", "primary_release_date.gte", "primary_release_date.lte"),
+    "tv": ("first_air_date_year", "first_air_date.gte", "first_air_date.lte"),
+}
+_GENRE_MAPS = {"movie": MOVIES_GENRE_MAP, "tv": TV_GENRE_MAP}
+
+_YEAR = r"(19\d{2}|20\d{2})"
+_RANGE_RE = re.compile(rf"\b(?:tra il|fra il|dal)\s+{_YEAR}\s+(?:e il|e|al)\s+{_YEAR}\b|\b{_YEAR}\s*-\s*{_YEAR}\b")
+_DECADE_RE = re.compile(r"\banni\s+'?(\d0)\b")
+_AFTER_RE = re.compile(rf"\b(?:dopo il|dal|a partire dal)\s+{_YEAR}\b")
+_BEFORE_RE = re.compile(rf"\b(?:prima del|fino al)\s+{_YEAR}\b")
+_SINGLE_RE = re.compile(rf"\b{_YEAR}\b")
+# Testo tra due generi della stessa lista: "horror e thriller", "azione, avventura o d'animazione"
+_LIST_SEPARATOR_RE = re.compile(r"\s*(?:,\s*(?:(e|ed|o|oppure)\s+)?|(e|ed|o|oppure)\s+)(?:(?:di|un|una)\s+|d')?")
+_OR_WORDS = {"o", "oppure"}
+
+
+def _keywords_re(names) -> re.Pattern:
+    # I nomi più lunghi prima, così "azione e avventura" vince su "azione"
+    alternatives = sorted(names, key=len, reverse=True)
+    return re.compile(r"(?<!\w)(" + "|".join(re.escape(n) for n in alternatives) + r")(?!\w)")
+
+
+_GENRE_RES = {kind: _keywords_re(genres) for kind, genres in _GENRE_MAPS.items()}
+_PROVIDER_RE = _keywords_re(STREAMING_PROVIDERS_MAP)
+
+
+class DiscoverQuery(NamedTuple):
+    """
+    Richiesta a /discover in forma canonica: ID ordinati e senza duplicati,
+    anni come intervallo chiuso. Formulazioni equivalenti ("horror e
+    thriller", "thriller e horror") producono la stessa query e quindi la
+    stessa chiave di cache.
+    """
+    kind: str
+    genres: Tuple[int, ...] = ()
+    any_genre: bool = False
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    providers: Tuple[int, ...] = ()
+
+
+def parse_years(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Funzione per estrarre un anno o un intervallo di anni da un testo
+    ("del 2010", "tra il 1990 e il 2000", "anni 80", "dopo il 2015").
+
+    :param text: Il testo del messaggio
+    :return: La coppia (primo anno, ultimo anno), con None dove non c'è limite
+    """
+    match = _RANGE_RE.search(text)
+    if match:
+        first, last = (int(y) for y in match.groups() if y)
+        return min(first, last), max(first, last)
+    match = _DECADE_RE.search(text)
+    if match:
+        decade = int(match.group(1))
+        start = (1900 if decade >= 30 else 2000) + decade
+        return start, start + 9
+    match = _AFTER_RE.search(text)
+    if match:
+        return int(match.group(1)), None
+    match = _BEFORE_RE.search(text)
+    if match:
+        return None, int(match.group(1))
+    match = _SINGLE_RE.search(text)
+    if match:
+        return int(match.group(1)), int(match.group(1))
+    return None, None
+
+
+def genre_list(kind: str, text: str, genre: Optional[str] = None) -> Tuple[Tuple[int, ...], bool]:
+    """
+    Funzione per trovare i generi richiesti: il genere riconosciuto dall'NLU
+    più quelli coordinati con lui nel testo ("horror e thriller", "azione o
+    avventura"). Gli altri nomi di genere nel messaggio ("con la storia di...",
+    "per la famiglia") non vengono considerati.
+
+    :param kind: "movie" oppure "tv"
+    :param text: Il testo del messaggio, in minuscolo
+    :param genre: Il genere riconosciuto dall'NLU; se manca si usa il primo nominato nel testo
+    :return: La coppia (ID dei generi, basta uno dei generi)
+    """
+    genre_map = _GENRE_MAPS[kind]
+    matches = list(_GENRE_RES[kind].finditer(text))
+    wanted = genre_map.get(genre.casefold()) if genre else None
+    # Il genere dell'NLU si cerca per ID, così vale anche un sinonimo ("sci-fi" per "fantascienza")
+    anchor = next((i for i, m in enumerate(matches) if wanted is None or genre_map[m.group(1)] == wanted), None)
+    if anchor is None:
+        return ((wanted,) if wanted is not None else ()), False
+
+    # La lista si estende finché tra due generi c'è solo una virgola o una congiunzione
+    first = last = anchor
+    conjunctions = {}
+    while first > 0:
+        separator = _LIST_SEPARATOR_RE.fullmatch(text, matches[first - 1].end(), matches[first].start())
+        if separator is None:
+            break
+        first -= 1
+        conjunctions[first] = separator.group(1) or separator.group(2)
+    while last + 1 < len(matches):
+        separator = _LIST_SEPARATOR_RE.fullmatch(text, matches[last].end(), matches[last + 1].start())
+        if separator is None:
+            break
+        conjunctions[last] = separator.group(1) or separator.group(2)
+        last += 1
+
+    genres = tuple(sorted({genre_map[m.group(1)] for m in matches[first:last + 1]}))
+    # La congiunzione della lista decide: "horror o thriller" basta uno, "horror e thriller" servono tutti
+    words = [conjunctions[i] for i in sorted(conjunctions) if conjunctions[i]]
+    return genres, len(genres) > 1 and bool(words) and words[-1] in _OR_WORDS
+
+
+def compile_query(kind: str, text: Optional[str], genre: Optional[str] = None,
+                  year_text: Optional[str] = None) -> DiscoverQuery:
+    """
+    Funzione per tradurre una richiesta in linguaggio naturale nella query /discover.
+
+    :param kind: "movie" oppure "tv"
+    :param text: Il testo del messaggio (da cui si leggono generi, anni e piattaforme)
+    :param genre: Il genere riconosciuto dall'NLU, se presente
+    :param year_text: Il valore dello slot anno, se presente (altrimenti l'anno si cerca in text)
+    :return: La query canonica
+    """
+    text = (text or "").casefold()
+    genres, any_genre = genre_list(kind, text, genre)
+    providers = tuple(sorted({STREAMING_PROVIDERS_MAP[name] for name in _PROVIDER_RE.findall(text)}))
+    year_from, year_to = parse_years(year_text.casefold()) if year_text else (None, None)
+    if year_from is None and year_to is None:
+        year_from, year_to = parse_years(text)
+    return DiscoverQuery(
+        kind=kind,
+        genres=genres,
+        any_genre=any_genre,
+        year_from=year_from,
+        year_to=year_to,
+        providers=providers,
+    )
+
+
+def discover_params(query: DiscoverQuery) -> Dict[str, Any]:
+    """
+    Funzione per ottenere i parametri di /discover di una query, filtrati lato server da TMDB.
+
+    :param query: La query canonica
+    :return: I parametri della richiesta (senza pagina)
+    """
+    params: Dict[str, Any] = {}
+    if query.genres:
+        params["with_genres"] = ("|" if query.any_genre else ",").join(str(g) for g in query.genres)
+    year_param, from_param, to_param = _DATE_PARAMS[query.kind]
+    if query.year_from is not None and query.year_from == query.year_to:
+        params[year_param] = query.year_from
+    else:
+        if query.year_from is not None:
+            params[from_param] = f"{query.year_from}-01-01"
+        if query.year_to is not None:
+            params[to_param] = f"{query.year_to}-12-31"
+    if query.providers:
+        params["with_watch_providers"] = "|".join(str(p) for p in query.providers)
+        params["watch_region"] = WATCH_REGION
+        params["with_watch_monetization_types"] = "flatrate"
+    return params
+
+
+def describe(query: DiscoverQuery, genre_label: str) -> str:
+    """
+    Funzione per descrivere i filtri di una query nell'intestazione del messaggio.
+
+    :param query: La query canonica
+    :param genre_label: Il genere come scritto dall'utente
+    :return: La descrizione, uguale a genre_label se non ci sono altri filtri
+    """
+    genre_names = {v: k for k, v in reversed(list(_GENRE_MAPS[query.kind].items()))}
+    label = genre_label
+    if len(query.genres) > 1:
+        label = (" o " if query.any_genre else " e ").join(genre_names[g] for g in query.genres)
+    if query.year_from is not None and query.year_from == query.year_to:
+        label += f", del {query.year_from}"
+    elif query.year_from is not None and query.year_to is not None:
+        label += f", dal {query.year_from} al {query.year_to}"
+    elif query.year_from is not None:
+        label += f", dal {query.year_from} in poi"
+    elif query.year_to is not None:
+        label += f", fino al {query.year_to}"
+    if query.providers:
+        provider_names = {v: k for k, v in reversed(list(STREAMING_PROVIDERS_MAP.items()))}
+        label += ", su " + " o ".join(provider_names[p].title() for p in query.providers)
+    return label
@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Optional, Tuple
+
+from . import json_codec
+from .records import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+
+def encode_payload(value: Any) -> bytes:
+    """
+    Funzione per codificare un valore in JSON compatto compresso con zlib.
+
+    :param value: Il valore da codificare
+    :return: I byte compressi
+    """
+    return zlib.compress(
+        json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=to_jsonable).encode("utf-8")
+    )
+
+
+def decode_payload(payload: bytes) -> Tuple[Any, int]:
+    """
+    Funzione per decodificare un valore prodotto da encode_payload.
+
+    :param payload: I byte compressi
+    :return: La coppia (valore, dimensione del JSON decompresso)
+    """
+    raw = zlib.decompress(payload)
+    return json_codec.loads(raw), len(raw)
+
+
+class DiskCache:
+    """
+    Cache persistente su file SQLite (modalità WAL) con scadenza per riga
+    e pulizia periodica delle righe scadute in un thread in background.
+    Ogni riga conserva anche la fine della finestra di stale, così le liste
+    ricaricate dopo un riavvio mantengono lo stale-while-revalidate.
+    """
+
+    def __init__(self, path: str, vacuum_interval: float) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.vacuum_interval = vacuum_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tmdb_cache ("
+            "key TEXT PRIMARY KEY, payload BLOB NOT NULL, expires_at REAL NOT NULL, "
+            "stale_until REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tmdb_cache_expires ON tmdb_cache (expires_at)")
+        self.hits = 0
+        self.misses = 0
+        self.purged = 0
+        self._vacuum_thread = threading.Thread(target=self._vacuum_loop, name="tmdb-disk-vacuum", daemon=True)
+        self._vacuum_thread.start()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float, int, float]]:
+        """
+        Funzione per leggere una voce non scaduta.
+
+        :param key: La chiave della voce
+        :return: La tupla (valore, secondi di validità residui, dimensione,
+                 secondi di stale oltre la scadenza), oppure None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at, stale_until FROM tmdb_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        value, size = decode_payload(row[0])
+        return value, row[1] - now, size, max(0.0, row[2] - row[1])
+
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0) -> None:
+        """
+        Funzione per salvare una voce.
+
+        :param key: La chiave della voce
+        :param value: Il valore da salvare
+        :param ttl: La durata di validità in secondi
+        :param stale_ttl: Per quanti secondi oltre la scadenza la voce può ancora essere servita
+        """
+        payload = encode_payload(value)
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tmdb_cache (key, payload, expires_at, stale_until) VALUES (?, ?, ?, ?)",
+                (key, payload, expires_at, expires_at + stale_ttl),
+            )
+
+    def purge_expired(self) -> int:
+        """
+        Funzione per eliminare le righe scadute e restituire lo spazio libero al file.
+
+        :return: Il numero di righe eliminate
+        """
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM tmdb_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.purged += deleted
+        return deleted
+
+    def _vacuum_loop(self) -> None:
+        while True:
+            time.sleep(self.vacuum_interval)
+            try:
+                deleted = self.purge_expired()
+                if deleted:
+                    logger.debug(f"Cache su disco: eliminate {deleted} righe scadute")
+            except sqlite3.Error as e:
+                logger.warning(f"Pulizia della cache su disco non riuscita: {e}")
+
+    def stats(self) -> dict:
+        """
+        Funzione per ottenere i contatori della cache su disco.
+
+        :return: Il dizionario con righe, hit, miss e righe eliminate
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM tmdb_cache").fetchone()[0]
+        return {"rows": rows, "hits": self.hits, "misses": self.misses, "purged": self.purged}
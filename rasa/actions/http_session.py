@@ -0,0 +1,127 @@
+import socket
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from .constants import (
+    TMDB_POOL_CONNECTIONS,
+    TMDB_POOL_MAXSIZE,
+    TMDB_POOL_BLOCK,
+    TMDB_KEEPALIVE,
+)
+
+_session: Optional[requests.Session] = None
+_adapter: Optional[HTTPAdapter] = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_request_count = 0
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """
+    Adapter HTTP che abilita il keep-alive TCP sulle connessioni del pool.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        if TMDB_KEEPALIVE:
+            kwargs.setdefault(
+                "socket_options",
+                HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+            )
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _create_session() -> requests.Session:
+    """
+    Funzione per creare una sessione HTTP con pool di connessioni.
+
+    :return: La sessione configurata
+    """
+    global _adapter
+    session = requests.Session()
+    _adapter = KeepAliveAdapter(
+        pool_connections=TMDB_POOL_CONNECTIONS,
+        pool_maxsize=TMDB_POOL_MAXSIZE,
+        pool_block=TMDB_POOL_BLOCK,
+    )
+    session.mount("https://", _adapter)
+    session.mount("http://", _adapter)
+    if TMDB_KEEPALIVE:
+        session.headers["Connection"] = "keep-alive"
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Funzione per ottenere la sessione HTTP condivisa tra tutti i thread.
+
+    :return: La sessione condivisa
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def session_get(url: str, **kwargs) -> requests.Response:
+    """
+    Funzione per effettuare una GET tramite la sessione condivisa.
+
+    :param url: L'URL da richiedere
+    :param kwargs: Gli argomenti passati a requests
+    :return: La risposta HTTP
+    """
+    global _request_count
+    with _stats_lock:
+        _request_count += 1
+    return get_session().get(url, **kwargs)
+
+
+def close_session() -> None:
+    """
+    Funzione per chiudere la sessione condivisa e le sue connessioni.
+    """
+    global _session, _adapter
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _adapter = None
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Funzione per ottenere le statistiche del pool di connessioni.
+
+    :return: Il dizionario con richieste, connessioni aperte e rapporto di riuso
+    """
+    hosts = {}
+    if _adapter is not None:
+        pools = _adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "requests": pool.num_requests,
+                "connections_opened": pool.num_connections,
+                "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None)
+                if pool.pool is not None else 0,
+            }
+
+    opened = sum(h["connections_opened"] for h in hosts.values())
+    pooled_requests = sum(h["requests"] for h in hosts.values())
+    reuse_ratio = 1 - opened / pooled_requests if pooled_requests else 0.0
+
+    return {
+        "requests": _request_count,
+        "connections_opened": opened,
+        "reuse_ratio": round(reuse_ratio, 4),
+        "pool_maxsize": TMDB_POOL_MAXSIZE,
+        "hosts": hosts,
+    }
@@ -0,0 +1,48 @@
+import json
+import logging
+from typing import Any, Callable, Dict, Union
+
+from .constants import TMDB_JSON_DECODER
+
+logger = logging.getLogger(__name__)
+
+Decoder = Callable[[Union[bytes, str]], Any]
+
+
+def _available_decoders() -> Dict[str, Decoder]:
+    decoders: Dict[str, Decoder] = {}
+    # Librerie opzionali, in ordine di preferenza per "auto"
+    try:
+        import orjson
+        decoders["orjson"] = orjson.loads
+    except ImportError:
+        pass
+    try:
+        import ujson
+        decoders["ujson"] = ujson.loads
+    except ImportError:
+        pass
+    decoders["json"] = json.loads
+    return decoders
+
+
+DECODERS = _available_decoders()
+
+
+def get_decoder(name: str = TMDB_JSON_DECODER) -> Decoder:
+    """
+    Funzione per scegliere il decoder JSON.
+
+    :param name: "auto" per il più veloce installato, oppure "orjson", "ujson" o "json"
+    :return: La funzione che decodifica bytes o stringhe
+    """
+    if name == "auto":
+        return next(iter(DECODERS.values()))
+    if name not in DECODERS:
+        logger.warning(f"Decoder JSON {name} non disponibile, uso {next(iter(DECODERS))}")
+        return next(iter(DECODERS.values()))
+    return DECODERS[name]
+
+
+# Decoder usato per le risposte di TMDB e per la cache su disco
+loads = get_decoder()
@@ -0,0 +1,292 @@
+import asyncio
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .constants import METRICS_ENABLED, METRICS_PORT, METRICS_FILE, METRICS_FILE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Gli ID nei percorsi diventano un segnaposto, così le serie restano poche
+_ID_RE = re.compile(r"/\d+")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Istogramma con bucket cumulativi nel formato di Prometheus.
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class MetricsRegistry:
+    """
+    Registro di contatori e istogrammi etichettati, esportabili nel formato
+    testuale di Prometheus.
+    """
+
+    def __init__(self) -> None:
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, text: str) -> None:
+        self._help[name] = text
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Labels = (),
+                buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(buckets)
+            histogram.observe(value)
+
+    def add_collector(self, collector: Callable[[], List[str]]) -> None:
+        """
+        Funzione per aggiungere righe calcolate al momento dell'esportazione.
+
+        :param collector: La funzione che restituisce le righe in formato Prometheus
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Funzione per esportare tutte le metriche nel formato testuale di Prometheus.
+
+        :return: Il testo da servire su /metrics
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                self._header(lines, name, "counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                self._header(lines, name, "histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        le = labels + (("le", f"{bound:g}"),)
+                        lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+                    cumulative += histogram.counts[-1]
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning(f"Raccolta delle metriche non riuscita: {e}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, kind: str) -> None:
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def gauge_lines(name: str, values: Dict[str, object], help_text: str = "") -> List[str]:
+    """
+    Funzione per convertire un dizionario di statistiche in un gauge etichettato.
+
+    :param name: Il nome della metrica
+    :param values: Il dizionario delle statistiche (i valori non numerici sono ignorati)
+    :param help_text: La descrizione della metrica
+    :return: Le righe in formato Prometheus
+    """
+    lines = [f"# HELP {name} {help_text}"] if help_text else []
+    lines.append(f"# TYPE {name} gauge")
+    for stat, value in sorted(values.items()):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f'{name}{{stat="{stat}"}} {value:g}')
+    return lines
+
+
+registry = MetricsRegistry()
+registry.describe("tmdb_action_duration_seconds", "Durata del metodo run di ogni azione")
+registry.describe("tmdb_action_errors_total", "Eccezioni sollevate dal metodo run di ogni azione")
+registry.describe("tmdb_cache_lookups_total", "Esito delle ricerche in cache per endpoint TMDB")
+registry.describe("tmdb_request_duration_seconds", "Durata di ogni tentativo HTTP verso TMDB")
+registry.describe("tmdb_response_bytes", "Dimensione delle risposte TMDB")
+registry.describe("tmdb_upstream_responses_total", "Risposte di TMDB per endpoint e stato HTTP")
+
+
+def endpoint_label(endpoint: str) -> str:
+    """
+    Funzione per ottenere l'etichetta di un endpoint (es. /movie/{id}/reviews).
+
+    :param endpoint: L'endpoint dell'API
+    :return: L'endpoint con gli ID sostituiti da un segnaposto
+    """
+    return _ID_RE.sub("/{id}", endpoint)
+
+
+def record_cache_lookup(endpoint: str, result: str) -> None:
+    """
+    Funzione per registrare l'esito di una ricerca in cache.
+
+    :param endpoint: L'endpoint dell'API
+    :param result: "hit", "stale", "miss" oppure "skipped" se il budget è esaurito
+    """
+    if METRICS_ENABLED:
+        registry.inc("tmdb_cache_lookups_total", (("endpoint", endpoint_label(endpoint)), ("result", result)))
+
+
+def record_upstream(endpoint: str, status: Optional[int], duration: float, size: Optional[int] = None) -> None:
+    """
+    Funzione per registrare un tentativo HTTP verso TMDB.
+
+    :param endpoint: L'endpoint dell'API
+    :param status: Lo stato HTTP, oppure None per errori di rete e timeout
+    :param duration: La durata del tentativo in secondi
+    :param size: La dimensione della risposta in byte, se ricevuta
+    """
+    if not METRICS_ENABLED:
+        return
+    label = (("endpoint", endpoint_label(endpoint)),)
+    registry.observe("tmdb_request_duration_seconds", duration, label)
+    registry.inc("tmdb_upstream_responses_total", label + (("status", str(status or "error")),))
+    if size is not None:
+        registry.observe("tmdb_response_bytes", size, label, SIZE_BUCKETS)
+
+
+def instrumented(run):
+    """
+    Decoratore per il metodo run di un'azione: registra durata ed errori
+    con il nome dell'azione come etichetta. Se le metriche sono disattivate
+    restituisce il metodo invariato.
+    """
+    if not METRICS_ENABLED:
+        return run
+
+    def record(action, started: float, failed: bool) -> None:
+        label = (("action", action.name()),)
+        registry.observe("tmdb_action_duration_seconds", time.perf_counter() - started, label)
+        if failed:
+            registry.inc("tmdb_action_errors_total", label)
+
+    if asyncio.iscoroutinefunction(run):
+        @functools.wraps(run)
+        async def async_wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = await run(self, *args, **kwargs)
+                failed = False
+                return result
+            finally:
+                record(self, started, failed)
+        return async_wrapper
+
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = run(self, *args, **kwargs)
+            failed = False
+            return result
+        finally:
+            record(self, started, failed)
+    return wrapper
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def write_metrics_file(path: str) -> None:
+    """
+    Funzione per scrivere le metriche su file in modo atomico (es. per il textfile collector).
+
+    :param path: Il percorso del file
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+def _file_loop(path: str, interval: float) -> None:
+    while True:
+        try:
+            write_metrics_file(path)
+        except OSError as e:
+            logger.warning(f"Scrittura delle metriche su {path} non riuscita: {e}")
+        time.sleep(interval)
+
+
+_exporter_started = False
+
+
+def start_metrics_exporter() -> None:
+    """
+    Funzione per avviare l'esportazione delle metriche su HTTP (/metrics) e/o su file, se abilitata.
+    """
+    global _exporter_started
+    if not METRICS_ENABLED or _exporter_started:
+        return
+    _exporter_started = True
+    if METRICS_PORT:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", METRICS_PORT), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Avvio dell'endpoint delle metriche sulla porta {METRICS_PORT} non riuscito: {e}")
+        else:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info(f"Metriche disponibili su http://127.0.0.1:{METRICS_PORT}/metrics")
+    if METRICS_FILE:
+        threading.Thread(
+            target=_file_loop, args=(METRICS_FILE, METRICS_FILE_INTERVAL), name="metrics-file", daemon=True
+        ).start()
@@ -0,0 +1,122 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .constants import ACTION_TURN_BUDGET, RESULTS_PAGE_SIZE
+from .deadline import turn_budget
+from .tmdb_async import (
+    get_now_playing_movies,
+    discover_movies,
+    discover_tv,
+    get_favourite,
+    get_favourite_tv,
+    search_TV_latest,
+    get_movie_reviews,
+    get_series_reviews,
+    get_movie_full,
+    get_tv_full,
+)
+
+# Slot con il cursore della lista mostrata per ultima nella conversazione
+CURSOR_SLOT = "cursore_risultati"
+
+
+async def _reviews_page(full: Callable[[int], Awaitable[dict]], reviews: Callable[..., Awaitable[dict]],
+                        record_id: int, page: int) -> dict:
+    # La prima pagina arriva già con il record completo usato dall'azione
+    if page == 1:
+        return (await full(record_id)).get("reviews", {})
+    return await reviews(record_id, page)
+
+
+# Nome della lista -> funzione (argomento, pagina) che restituisce la pagina TMDB
+PAGERS: Dict[str, Callable[[Any, int], Awaitable[dict]]] = {
+    "recent_movies": lambda arg, page: get_now_playing_movies(page),
+    "movies_by_genre": lambda arg, page: discover_movies(arg, page),
+    "popular_movies": lambda arg, page: get_favourite(page),
+    "recent_tv": lambda arg, page: search_TV_latest(page),
+    "popular_tv": lambda arg, page: get_favourite_tv(page),
+    "tv_by_genre": lambda arg, page: discover_tv(arg, page),
+    "movie_reviews": lambda arg, page: _reviews_page(get_movie_full, get_movie_reviews, arg, page),
+    "tv_reviews": lambda arg, page: _reviews_page(get_tv_full, get_series_reviews, arg, page),
+}
+
+# Riferimenti ai prefetch in corso, altrimenti i task potrebbero essere raccolti dal GC
+_prefetches: Set[asyncio.Task] = set()
+
+
+def new_cursor(kind: str, data: dict, shown: int, arg: Any = None) -> Optional[Dict[str, Any]]:
+    """
+    Funzione per creare il cursore dopo aver mostrato i primi risultati di una lista.
+
+    :param kind: Il nome della lista (chiave di PAGERS)
+    :param data: La prima pagina restituita da TMDB
+    :param shown: Quanti risultati sono già stati mostrati
+    :param arg: L'argomento della lista (parametri di /discover, ID del film o della serie)
+    :return: Il cursore da salvare nello slot, oppure None se non ci sono altri risultati
+    """
+    results = data.get("results", [])
+    total_pages = data.get("total_pages") or 1
+    if shown >= len(results) and total_pages <= 1:
+        return None
+    if len(results) - shown <= RESULTS_PAGE_SIZE:
+        prefetch(kind, arg, 2, total_pages)
+    return {"list": kind, "arg": arg, "page": 1, "offset": shown, "pages": total_pages, "seen": shown}
+
+
+async def next_results(cursor: Dict[str, Any]) -> Tuple[List[dict], Optional[Dict[str, Any]], int]:
+    """
+    Funzione per ottenere i risultati successivi di una lista. La pagina
+    corrente viene letta dalla cache; la successiva viene scaricata solo
+    quando quella corrente è esaurita, e in anticipo in background quando
+    sta per esaurirsi.
+
+    :param cursor: Il cursore salvato nello slot
+    :return: I risultati, il nuovo cursore (None se la lista è finita) e la
+             posizione del primo risultato nella lista completa
+    """
+    kind, arg = cursor["list"], cursor.get("arg")
+    page, offset, pages = cursor["page"], cursor["offset"], cursor.get("pages") or 1
+    pager = PAGERS[kind]
+
+    data = await pager(arg, page)
+    results = data.get("results", [])
+    if offset >= len(results) and page < pages:
+        page, offset = page + 1, 0
+        data = await pager(arg, page)
+        results = data.get("results", [])
+    pages = data.get("total_pages") or pages
+
+    # Risultati già mostrati, per continuare la numerazione
+    position = cursor.get("seen", 0)
+    items = results[offset:offset + RESULTS_PAGE_SIZE]
+    offset += len(items)
+    if not items:
+        return [], None, position
+
+    if len(results) - offset <= RESULTS_PAGE_SIZE and page < pages:
+        prefetch(kind, arg, page + 1, pages)
+    if offset >= len(results) and page >= pages:
+        return items, None, position
+    return items, {**cursor, "page": page, "offset": offset, "pages": pages, "seen": position + len(items)}, position
+
+
+def prefetch(kind: str, arg: Any, page: int, pages: int) -> None:
+    """
+    Funzione per scaricare in background una pagina, così è già in cache alla richiesta successiva.
+
+    :param kind: Il nome della lista
+    :param arg: L'argomento della lista
+    :param page: La pagina da scaricare
+    :param pages: Il numero totale di pagine
+    """
+    if page > pages:
+        return
+    task = asyncio.ensure_future(_prefetch(kind, arg, page))
+    _prefetches.add(task)
+    task.add_done_callback(_prefetches.discard)
+
+
+async def _prefetch(kind: str, arg: Any, page: int) -> None:
+    # Il task eredita la scadenza del turno: gli si assegna un budget proprio
+    with turn_budget(ACTION_TURN_BUDGET):
+        await PAGERS[kind](arg, page)
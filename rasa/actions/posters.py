@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+
+import aiohttp
+
+from .constants import (
+    METRICS_ENABLED,
+    POSTER_CACHE_DIR,
+    POSTER_DOWNLOAD_TIMEOUT,
+    POSTER_FILE_ID_TTL,
+    POSTER_PUBLIC_URL,
+    POSTER_SERVER_HOST,
+    POSTER_SERVER_PORT,
+    POSTER_SIZE,
+    POSTER_SIZES,
+    TELEGRAM_ACCESS_TOKEN,
+    TELEGRAM_API_URL,
+    TELEGRAM_SEND_TIMEOUT,
+    TMDB_DISK_CACHE_VACUUM_INTERVAL,
+    TMDB_IMAGE_BASE_URL,
+)
+from .deadline import request_timeout
+from .disk_cache import DiskCache
+from .metrics import registry
+from .singleflight import AsyncSingleFlight
+from .tmdb_async import get_async_session
+
+logger = logging.getLogger(__name__)
+
+# poster_path di TMDB, es. "/qNBAXBIQlnOThrVvA6mA2B5ggV6.jpg": niente separatori, niente "..".
+_POSTER_PATH_RE = re.compile(r"^/([A-Za-z0-9_-]+\.(?:jpg|jpeg|png))$")
+_CONTENT_TYPES = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png"}
+
+registry.describe("poster_cache_requests_total", "Locandine richieste: lette dal disco, scaricate o non disponibili")
+registry.describe("telegram_poster_sends_total", "Locandine inviate direttamente a Telegram: con il file_id già noto o caricando il file")
+
+
+class PosterCache:
+    """
+    Locandine salvate su disco in una cartella per dimensione (es. w342/abc.jpg).
+    Le dimensioni ridotte sono le versioni già ridimensionate dal CDN di TMDB,
+    scaricate alla prima richiesta; i download concorrenti della stessa
+    locandina sono raggruppati. Accanto ai file sono salvati i file_id che
+    Telegram restituisce al primo caricamento, così gli invii successivi
+    della stessa locandina non ricaricano l'immagine (solo con STREAM_REPLIES
+    sul canale telegram, l'unico caso in cui l'action server invia le foto da sé).
+
+    Gli accessi al disco (file e file_id) avvengono in un thread, fuori
+    dall'event loop.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.file_ids = DiskCache(os.path.join(directory, "file_ids.sqlite"), TMDB_DISK_CACHE_VACUUM_INTERVAL)
+        self._downloads = AsyncSingleFlight()
+
+    def file_path(self, poster_path: str, size: str) -> Optional[str]:
+        """
+        Funzione per ottenere il percorso su disco di una locandina.
+
+        :param poster_path: Il poster_path di TMDB
+        :param size: La dimensione (es. "w342")
+        :return: Il percorso, oppure None se poster_path o size non sono validi
+        """
+        match = _POSTER_PATH_RE.match(poster_path or "")
+        if match is None or size not in POSTER_SIZES:
+            return None
+        return os.path.join(self.directory, size, match.group(1))
+
+    async def get(self, poster_path: str, size: str = POSTER_SIZE) -> Optional[str]:
+        """
+        Funzione per ottenere il file di una locandina, scaricandolo se non è già su disco.
+
+        :param poster_path: Il poster_path di TMDB
+        :param size: La dimensione
+        :return: Il percorso del file, oppure None se non disponibile
+        """
+        path = self.file_path(poster_path, size)
+        if path is None:
+            return None
+        if await _in_thread(os.path.exists, path):
+            _record("poster_cache_requests_total", "hit")
+            return path
+        return await self._downloads.do(path, self._download, poster_path, size, path)
+
+    async def _download(self, poster_path: str, size: str, path: str) -> Optional[str]:
+        url = f"{TMDB_IMAGE_BASE_URL}/{size}{poster_path}"
+        timeout = request_timeout()
+        if timeout is None:
+            # Turno senza tempo residuo: il canale riceverà l'URL di TMDB
+            _record("poster_cache_requests_total", "error")
+            return None
+        try:
+            async with get_async_session().get(
+                    url, timeout=aiohttp.ClientTimeout(total=min(timeout, POSTER_DOWNLOAD_TIMEOUT))
+            ) as r:
+                if r.status != 200:
+                    logger.warning(f"Download della locandina {url} non riuscito: HTTP {r.status}")
+                    _record("poster_cache_requests_total", "error")
+                    return None
+                body = await r.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Download della locandina {url} non riuscito: {e}")
+            _record("poster_cache_requests_total", "error")
+            return None
+        await _in_thread(_write_atomic, path, body)
+        _record("poster_cache_requests_total", "download")
+        return path
+
+    async def get_file_id(self, poster_path: str, size: str) -> Optional[str]:
+        entry = await _in_thread(self.file_ids.get, f"telegram:{size}{poster_path}")
+        return entry[0] if entry is not None else None
+
+    async def set_file_id(self, poster_path: str, size: str, file_id: Optional[str]) -> None:
+        # Un file_id None (rifiutato da Telegram) scade subito
+        await _in_thread(self.file_ids.set, f"telegram:{size}{poster_path}", file_id,
+                         POSTER_FILE_ID_TTL if file_id else 0)
+
+
+async def _in_thread(fn: Callable[..., Any], *args: Any) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_atomic(path: str, body: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+def _record(name: str, result: str) -> None:
+    if METRICS_ENABLED:
+        registry.inc(name, (("result", result),))
+
+
+poster_cache = PosterCache(POSTER_CACHE_DIR) if POSTER_CACHE_DIR else None
+
+
+def tmdb_poster_url(poster_path: str, size: str = POSTER_SIZE) -> str:
+    """
+    Funzione per costruire l'URL della locandina sul CDN di TMDB.
+    """
+    return f"{TMDB_IMAGE_BASE_URL}/{size}{poster_path}"
+
+
+async def poster_url(poster_path: str, size: str = POSTER_SIZE) -> str:
+    """
+    Funzione per ottenere l'URL da dare al canale: quello dell'endpoint locale
+    se configurato e la locandina è su disco, altrimenti quello di TMDB.
+
+    :param poster_path: Il poster_path di TMDB
+    :param size: La dimensione
+    :return: L'URL dell'immagine
+    """
+    if poster_cache is not None and POSTER_PUBLIC_URL and await poster_cache.get(poster_path, size):
+        return f"{POSTER_PUBLIC_URL}/{size}{poster_path}"
+    return tmdb_poster_url(poster_path, size)
+
+
+async def send_telegram_poster(chat_id: str, poster_path: str, size: str = POSTER_SIZE) -> bool:
+    """
+    Funzione per inviare una locandina con sendPhoto: con il file_id già noto
+    se la locandina è stata inviata in passato, altrimenti caricando il file
+    dal disco e salvando il file_id restituito da Telegram. È usata solo da
+    ReplyStream, cioè con STREAM_REPLIES sul canale telegram.
+
+    :param chat_id: La chat di destinazione
+    :param poster_path: Il poster_path di TMDB
+    :param size: La dimensione
+    :return: True se l'invio è riuscito
+    """
+    if poster_cache is None:
+        return False
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_ACCESS_TOKEN}/sendPhoto"
+    timeout = aiohttp.ClientTimeout(total=TELEGRAM_SEND_TIMEOUT)
+    session = get_async_session()
+    try:
+        file_id = await poster_cache.get_file_id(poster_path, size)
+        if file_id:
+            async with session.post(url, json={"chat_id": chat_id, "photo": file_id}, timeout=timeout) as r:
+                if r.status == 200:
+                    _record("telegram_poster_sends_total", "file_id")
+                    return True
+                if r.status != 400:
+                    logger.warning(f"Invio della locandina a Telegram non riuscito: HTTP {r.status}")
+                    return False
+            # file_id rifiutato (es. bot diverso): si ricarica il file
+            await poster_cache.set_file_id(poster_path, size, None)
+
+        path = await poster_cache.get(poster_path, size)
+        if path is None:
+            return False
+        body = await _in_thread(_read_file, path)
+        form = aiohttp.FormData()
+        form.add_field("chat_id", str(chat_id))
+        form.add_field("photo", body, filename=os.path.basename(path),
+                       content_type=_CONTENT_TYPES[path.rsplit(".", 1)[-1]])
+        async with session.post(url, data=form, timeout=timeout) as r:
+            if r.status != 200:
+                logger.warning(f"Invio della locandina a Telegram non riuscito: HTTP {r.status}")
+                return False
+            try:
+                # L'ultima foto è la versione più grande conservata da Telegram
+                file_id = (await r.json())["result"]["photo"][-1]["file_id"]
+            except (aiohttp.ContentTypeError, KeyError, IndexError, TypeError, ValueError) as e:
+                # La foto è stata inviata, ma senza file_id la prossima volta si ricarica il file
+                logger.warning(f"file_id della locandina non presente nella risposta di Telegram: {e!r}")
+                file_id = None
+        _record("telegram_poster_sends_total", "upload")
+        if file_id:
+            await poster_cache.set_file_id(poster_path, size, file_id)
+        return True
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+        logger.warning(f"Invio della locandina a Telegram non riuscito: {e}")
+        return False
+
+
+class _PosterHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        size, _, rest = self.path.split("?")[0].lstrip("/").partition("/")
+        path = poster_cache.file_path("/" + rest, size) if poster_cache is not None else None
+        if path is None or not os.path.isfile(path):
+            self.send_error(404)
+            return
+        body = _read_file(path)
+        self.send_response(200)
+        self.send_header("Content-Type", _CONTENT_TYPES[path.rsplit(".", 1)[-1]])
+        self.send_header("Content-Length", str(len(body)))
+        # Il contenuto di un poster_path non cambia mai
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+_server_started = False
+
+
+def start_poster_server() -> None:
+    """
+    Funzione per avviare l'endpoint statico delle locandine (/<dimensione>/<file>), se configurato.
+    """
+    global _server_started
+    if poster_cache is None or not POSTER_SERVER_PORT or _server_started:
+        return
+    _server_started = True
+    try:
+        server = ThreadingHTTPServer((POSTER_SERVER_HOST, POSTER_SERVER_PORT), _PosterHandler)
+    except OSError as e:
+        logger.warning(f"Avvio dell'endpoint delle locandine sulla porta {POSTER_SERVER_PORT} non riuscito: {e}")
+        return
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="poster-http", daemon=True).start()
+    logger.info(f"Locandine disponibili su http://{POSTER_SERVER_HOST}:{POSTER_SERVER_PORT}/<dimensione>/<file>")
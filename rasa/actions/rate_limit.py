@@ -0,0 +1,219 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+# Stati HTTP per cui ha senso ripetere la richiesta
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token bucket condiviso tra thread e task asyncio: ogni richiesta prenota
+    un token e ottiene il tempo da attendere prima di poter partire.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Funzione per prenotare un token.
+
+        :return: I secondi da attendere prima di usare il token (0 se disponibile subito)
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker: dopo un certo numero di errori consecutivi blocca le
+    richieste per un intervallo, poi lascia passare una richiesta di prova.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """
+        Funzione per sapere se una richiesta può partire.
+
+        :return: True se il circuito è chiuso o se è il turno della richiesta di prova
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release_trial(self) -> None:
+        """
+        Funzione per liberare la richiesta di prova quando il tentativo viene
+        abbandonato senza un esito (budget esaurito, cancellazione), così la
+        prossima richiesta può fare da prova.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_running:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Funzione per interpretare l'header Retry-After (secondi o data HTTP).
+
+    :param value: Il valore dell'header
+    :return: I secondi da attendere, oppure None se assente o non valido
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamGuard:
+    """
+    Applica alle chiamate verso TMDB rate limiting, retry con backoff
+    esponenziale e jitter entro un budget di latenza, e circuit breaker.
+    """
+
+    def __init__(
+            self,
+            bucket: TokenBucket,
+            breaker: CircuitBreaker,
+            max_retries: int,
+            base_delay: float,
+            max_delay: float,
+            retry_budget: float,
+    ) -> None:
+        self.bucket = bucket
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.counters: Dict[str, int] = {
+            "requests": 0,
+            "throttled_locally": 0,
+            "upstream_429": 0,
+            "upstream_errors": 0,
+            "retries": 0,
+            "gave_up": 0,
+            "rejected_open_circuit": 0,
+        }
+
+    def admit(self) -> Optional[float]:
+        """
+        Funzione da chiamare prima di ogni tentativo. Ogni tentativo ammesso va
+        chiuso con on_success, on_failure oppure on_abandon.
+
+        :return: I secondi da attendere per il rate limiter, oppure None se il circuito è aperto
+        """
+        if not self.breaker.allow():
+            self.counters["rejected_open_circuit"] += 1
+            return None
+        self.counters["requests"] += 1
+        wait = self.bucket.reserve()
+        if wait > 0:
+            self.counters["throttled_locally"] += 1
+        return wait
+
+    def on_success(self) -> None:
+        self.breaker.record_success()
+
+    def on_abandon(self) -> None:
+        """
+        Funzione da chiamare quando un tentativo ammesso da admit non arriva
+        né a on_success né a on_failure.
+        """
+        self.breaker.release_trial()
+
+    def on_failure(
+            self,
+            status: Optional[int],
+            retry_after: Optional[str],
+            attempt: int,
+            elapsed: float,
+    ) -> Optional[float]:
+        """
+        Funzione da chiamare dopo un tentativo fallito.
+
+        :param status: Lo stato HTTP, oppure None per errori di rete
+        :param retry_after: Il valore dell'header Retry-After, se presente
+        :param attempt: Il numero del tentativo appena fallito (da 0)
+        :param elapsed: I secondi trascorsi dal primo tentativo
+        :return: I secondi da attendere prima di riprovare, oppure None se non si deve riprovare
+        """
+        if status is not None and status not in RETRYABLE_STATUSES:
+            # Errore della richiesta (es. 404): TMDB funziona, non si riprova
+            self.breaker.record_success()
+            return None
+
+        self.counters["upstream_429" if status == 429 else "upstream_errors"] += 1
+        self.breaker.record_failure()
+
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            # Full jitter: attesa casuale fino al backoff esponenziale
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if attempt >= self.max_retries or elapsed + delay > self.retry_budget:
+            self.counters["gave_up"] += 1
+            return None
+        self.counters["retries"] += 1
+        return delay
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Funzione per ottenere i contatori e lo stato del circuito.
+
+        :return: Il dizionario con i contatori
+        """
+        return {**self.counters, "circuit": self.breaker.state, "circuit_trips": self.breaker.trips}
@@ -0,0 +1,263 @@
+import json
+import re
+from typing import Any, Dict, Iterator, Optional, Tuple, Type
+
+# Lunghezze massime conservate: le azioni non mostrano mai testi più lunghi
+OVERVIEW_MAX_CHARS = 500
+REVIEW_MAX_CHARS = 600
+
+# Regioni dei provider conservate (le azioni mostrano solo l'Italia)
+WATCH_REGIONS = ("IT",)
+
+# Campi conservati per ogni titolo, gli stessi usati dai risultati di ricerca
+MOVIE_FIELDS = ("id", "title", "original_title", "release_date", "overview", "poster_path", "popularity", "genre_ids")
+TV_FIELDS = ("id", "name", "original_name", "first_air_date", "overview", "poster_path", "popularity", "genre_ids")
+
+# Chiavi TMDB che non sono nomi di attributo validi
+_ATTRIBUTE_KEYS = {"watch_providers": "watch/providers"}
+_KEY_ATTRIBUTES = {key: attribute for attribute, key in _ATTRIBUTE_KEYS.items()}
+
+
+def truncate(text: Optional[str], limit: int) -> Optional[str]:
+    """
+    Funzione per troncare un testo una volta sola, all'acquisizione.
+
+    :param text: Il testo da troncare
+    :param limit: Il numero massimo di caratteri conservati
+    :return: Il testo troncato con i puntini di sospensione, oppure invariato
+    """
+    # Un testo già troncato resta invariato, così la proiezione si può ripetere
+    if text is None or len(text) <= limit or (len(text) <= limit + 3 and text.endswith("...")):
+        return text
+    return text[:limit].rstrip() + "..."
+
+
+class Record:
+    """
+    Record compatto con __slots__ al posto del dizionario JSON di TMDB.
+    Espone get, [] e keys come un dizionario, così il codice delle azioni
+    non cambia; i campi assenti valgono None.
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    # Coppie (attributo, chiave TMDB), calcolate una volta per classe
+    _KEYS: Tuple[Tuple[str, str], ...] = ()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._KEYS = tuple((field, _ATTRIBUTE_KEYS.get(field, field)) for field in cls.FIELDS)
+
+    def __init__(self, **values: Any) -> None:
+        for field in self.FIELDS:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "Record":
+        """
+        Funzione per proiettare un dizionario TMDB sui soli campi del record.
+
+        :param data: Il dizionario decodificato (o un record già proiettato)
+        :return: Il record
+        """
+        # Percorso caldo: niente kwargs intermedi, un setattr per campo
+        record = object.__new__(cls)
+        get = data.get
+        for field, key in cls._KEYS:
+            setattr(record, field, get(key))
+        return record
+
+    def get(self, key: str, default: Any = None) -> Any:
+        attribute = _KEY_ATTRIBUTES.get(key, key)
+        value = getattr(self, attribute) if attribute in self.FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key) is not None
+
+    def keys(self) -> Iterator[str]:
+        return (_ATTRIBUTE_KEYS.get(f, f) for f in self.FIELDS if getattr(self, f) is not None)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.keys()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Funzione per riconvertire il record in un dizionario con le chiavi TMDB.
+
+        :return: Il dizionario (i record annidati restano record)
+        """
+        return {key: self.get(key) for key in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def _records(cls: Type[Record], items: Any) -> Tuple[Record, ...]:
+    return tuple(cls.from_json(item) for item in items or ())
+
+
+class GenreRecord(Record):
+    __slots__ = FIELDS = ("id", "name")
+
+
+class _TitleRecord(Record):
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "_TitleRecord":
+        record = super().from_json(data)
+        record.overview = truncate(record.overview, OVERVIEW_MAX_CHARS)
+        if record.genre_ids is None and data.get("genres"):
+            record.genre_ids = tuple(g["id"] for g in data["genres"])
+        elif record.genre_ids is not None:
+            record.genre_ids = tuple(record.genre_ids)
+        return record
+
+
+class MovieRecord(_TitleRecord):
+    __slots__ = FIELDS = MOVIE_FIELDS
+
+
+class TvRecord(_TitleRecord):
+    __slots__ = FIELDS = TV_FIELDS
+
+
+class ReviewRecord(Record):
+    __slots__ = FIELDS = ("author", "content")
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "ReviewRecord":
+        record = super().from_json(data)
+        record.content = truncate(record.content, REVIEW_MAX_CHARS)
+        return record
+
+
+class ProviderRecord(Record):
+    __slots__ = FIELDS = ("provider_id", "provider_name")
+
+
+class RegionProviders(Record):
+    __slots__ = FIELDS = ("flatrate", "rent", "buy")
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "RegionProviders":
+        return cls(**{field: _records(ProviderRecord, data.get(field)) or None for field in cls.FIELDS})
+
+
+class WatchProviders(Record):
+    __slots__ = FIELDS = ("results",)
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "WatchProviders":
+        regions = data.get("results") or {}
+        return cls(results={
+            region: RegionProviders.from_json(regions[region]) for region in WATCH_REGIONS if region in regions
+        })
+
+
+class ResultPage(Record):
+    __slots__ = FIELDS = ("page", "results", "total_pages", "total_results")
+    ITEM: Type[Record] = Record
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "ResultPage":
+        page = super().from_json(data)
+        page.results = _records(cls.ITEM, data.get("results"))
+        return page
+
+
+class MoviePage(ResultPage):
+    __slots__ = ()
+    ITEM = MovieRecord
+
+
+class TvPage(ResultPage):
+    __slots__ = ()
+    ITEM = TvRecord
+
+
+class ReviewPage(ResultPage):
+    __slots__ = ()
+    ITEM = ReviewRecord
+
+
+class _Details:
+    # Campi aggiuntivi dei dettagli completi (append_to_response)
+    __slots__ = ()
+    EXTRA_FIELDS = ("genres", "watch_providers", "reviews")
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]):
+        record = super().from_json(data)
+        record.genres = _records(GenreRecord, data.get("genres"))
+        providers = data.get("watch/providers")
+        record.watch_providers = WatchProviders.from_json(providers) if providers is not None else None
+        reviews = data.get("reviews")
+        record.reviews = ReviewPage.from_json(reviews) if reviews is not None else None
+        return record
+
+
+class MovieDetails(_Details, MovieRecord):
+    __slots__ = _Details.EXTRA_FIELDS
+    FIELDS = MOVIE_FIELDS + _Details.EXTRA_FIELDS
+
+
+class TvDetails(_Details, TvRecord):
+    __slots__ = _Details.EXTRA_FIELDS
+    FIELDS = TV_FIELDS + _Details.EXTRA_FIELDS
+
+
+# Endpoint -> tipo della risposta proiettata
+_PROJECTIONS: Tuple[Tuple[re.Pattern, Type[Record]], ...] = (
+    (re.compile(r"^/(search|discover)/movie$|^/movie/(popular|now_playing)$"), MoviePage),
+    (re.compile(r"^/(search|discover)/tv$|^/tv/(popular|on_the_air)$"), TvPage),
+    (re.compile(r"^/movie/\d+$"), MovieDetails),
+    (re.compile(r"^/tv/\d+$"), TvDetails),
+    (re.compile(r"^/(movie|tv)/\d+/reviews$"), ReviewPage),
+    (re.compile(r"^/movie/\d+/watch/providers$"), WatchProviders),
+)
+
+
+def project_response(endpoint: str, data: Any) -> Any:
+    """
+    Funzione per ridurre una risposta TMDB ai soli campi usati dalle azioni.
+
+    :param endpoint: L'endpoint dell'API
+    :param data: La risposta decodificata
+    :return: Il record proiettato, oppure la risposta invariata se l'endpoint non è noto
+    """
+    if not isinstance(data, dict) or not data:
+        return data
+    for pattern, cls in _PROJECTIONS:
+        if pattern.match(endpoint):
+            return cls.from_json(data)
+    return data
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Funzione da passare come default a json.dumps per serializzare i record.
+
+    :param value: Il valore non serializzabile
+    :return: Il dizionario equivalente
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def payload_size(value: Any) -> int:
+    """
+    Funzione per stimare la memoria occupata da una risposta, come lunghezza del suo JSON compatto.
+
+    :param value: La risposta (eventualmente proiettata)
+    :return: La dimensione in byte
+    """
+    return len(json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=to_jsonable).encode("utf-8"))
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from .tmdb_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    """
+    Thread in background che aggiorna le voci registrate poco prima della
+    scadenza, così le richieste non attendono mai TMDB per le liste già in cache.
+    """
+
+    def __init__(
+            self,
+            refresh: Callable[[str, str, Dict], Any],
+            cache: ResponseCache,
+            refresh_ahead: float,
+            interval: float,
+            idle_ttl: float,
+    ) -> None:
+        self._refresh = refresh
+        self._cache = cache
+        self.refresh_ahead = refresh_ahead
+        self.interval = interval
+        self.idle_ttl = idle_ttl
+        # chiave -> (endpoint, parametri, ultimo utilizzo)
+        self._keys: Dict[str, Tuple[str, Dict, float]] = {}
+        self._urgent: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refreshed = 0
+        self.failed = 0
+
+    def register(self, key: str, endpoint: str, params: Dict) -> None:
+        """
+        Funzione per registrare una voce da mantenere aggiornata.
+
+        :param key: La chiave di cache
+        :param endpoint: L'endpoint dell'API
+        :param params: I parametri completi della richiesta
+        """
+        with self._lock:
+            previous = self._keys.get(key)
+            last_used = previous[2] if previous else time.monotonic()
+            self._keys[key] = (endpoint, dict(params), last_used)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="tmdb-refresher", daemon=True)
+                self._thread.start()
+
+    def touch(self, key: str) -> None:
+        """
+        Funzione per segnare una voce registrata come usata di recente.
+
+        :param key: La chiave di cache
+        """
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is not None:
+                self._keys[key] = (entry[0], entry[1], time.monotonic())
+
+    def schedule(self, key: str, endpoint: str, params: Dict) -> None:
+        """
+        Funzione per richiedere l'aggiornamento immediato di una voce scaduta.
+
+        :param key: La chiave di cache
+        :param endpoint: L'endpoint dell'API
+        :param params: I parametri completi della richiesta
+        """
+        self.register(key, endpoint, params)
+        self.touch(key)
+        with self._lock:
+            self._urgent.add(key)
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.run_once()
+
+    def run_once(self) -> None:
+        """
+        Funzione per aggiornare le voci in scadenza ed eliminare quelle inutilizzate.
+        """
+        now = time.monotonic()
+        with self._lock:
+            items = list(self._keys.items())
+            urgent, self._urgent = self._urgent, set()
+
+        for key, (endpoint, params, last_used) in items:
+            remaining = self._cache.expires_in(key)
+            if remaining is None or now - last_used > self.idle_ttl:
+                with self._lock:
+                    self._keys.pop(key, None)
+                continue
+            if key not in urgent and remaining > self.refresh_ahead:
+                continue
+            try:
+                data = self._refresh(key, endpoint, params)
+            except Exception as e:
+                data = None
+                logger.warning(f"Aggiornamento in background di {endpoint} non riuscito: {e}")
+            if data:
+                self.refreshed += 1
+            else:
+                self.failed += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Funzione per ottenere i contatori del refresher.
+
+        :return: Il dizionario con voci registrate, aggiornamenti riusciti e falliti
+        """
+        return {"registered": len(self._keys), "refreshed": self.refreshed, "failed": self.failed}
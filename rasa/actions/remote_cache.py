@@ -0,0 +1,255 @@
+import itertools
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+Command = Sequence[Any]
+
+# Rilascio del lock solo se è ancora quello preso da questa replica: se il
+# download è durato più del TTL, il lock può essere già di un'altra replica
+RELEASE_SCRIPT = "if redis.call('get',KEYS[1])==ARGV[1] then return redis.call('del',KEYS[1]) end return 0"
+
+
+class RespError(Exception):
+    """
+    Errore restituito dal server (risposta "-ERR ...").
+    """
+
+
+def encode_command(*args: Any) -> bytes:
+    """
+    Funzione per codificare un comando nel protocollo Redis (RESP).
+
+    :param args: Il nome del comando e i suoi argomenti (byte, stringhe o numeri)
+    :return: Il comando codificato
+    """
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+class RespConnection:
+    """
+    Connessione TCP a un server che parla il protocollo Redis. I comandi
+    vengono inviati in pipeline: tutti insieme, poi si leggono le risposte
+    nello stesso ordine, con un solo round trip.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float) -> None:
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+
+    def execute(self, commands: Sequence[Command]) -> List[Any]:
+        """
+        Funzione per eseguire più comandi in pipeline.
+
+        :param commands: I comandi, ciascuno come sequenza di argomenti
+        :return: Le risposte, una per comando (gli errori come RespError, senza sollevarli)
+        """
+        self._sock.sendall(b"".join(encode_command(*command) for command in commands))
+        return [self._read_reply() for _ in commands]
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connessione chiusa dal server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            return RespError(rest.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connessione chiusa dal server")
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Risposta non valida dal server: {line[:32]!r}")
+
+    def close(self) -> None:
+        try:
+            self._reader.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class RemoteCache:
+    """
+    Cache remota condivisa tra le repliche dell'action server, su un server
+    che parla il protocollo Redis (Redis, Valkey, KeyDB, Dragonfly...).
+
+    Le chiamate sono sincrone e con un timeout breve: dopo un errore di rete
+    la cache remota viene saltata per retry_after secondi, così un server non
+    raggiungibile non rallenta ogni richiesta.
+    """
+
+    def __init__(self, url: str, prefix: str, timeout: float, pool_size: int, retry_after: float) -> None:
+        parsed = urlsplit(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self._password = parsed.password
+        self._db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retry_after = retry_after
+        self._idle: List[RespConnection] = []
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        # Valore dei lock: identifica la replica (utile nei log), l'istanza e il singolo lock, per rilasciare solo i propri
+        self._token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._claims = itertools.count()
+        self._held: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.round_trips = 0
+        self.errors = 0
+        self.claims_lost = 0
+
+    def _connect(self) -> RespConnection:
+        conn = RespConnection(self.host, self.port, self.timeout)
+        setup = []
+        if self._password:
+            setup.append(("AUTH", self._password))
+        if self._db:
+            setup.append(("SELECT", self._db))
+        for reply in conn.execute(setup) if setup else ():
+            if isinstance(reply, RespError):
+                conn.close()
+                raise reply
+        return conn
+
+    def execute(self, *commands: Command) -> Optional[List[Any]]:
+        """
+        Funzione per eseguire uno o più comandi in pipeline su una connessione del pool.
+
+        :param commands: I comandi, ciascuno come sequenza di argomenti
+        :return: Le risposte, oppure None se il server non è raggiungibile
+        """
+        if time.monotonic() < self._down_until:
+            return None
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        try:
+            if conn is None:
+                conn = self._connect()
+            replies = conn.execute(commands)
+        except (OSError, ValueError, RespError) as e:
+            if conn is not None:
+                conn.close()
+            self.errors += 1
+            self._down_until = time.monotonic() + self.retry_after
+            logger.warning(f"Cache remota {self.host}:{self.port} non disponibile per {self.retry_after:g}s: {e}")
+            return None
+        self.round_trips += 1
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+        return replies
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """
+        Funzione per leggere più voci con un solo MGET.
+
+        :param keys: Le chiavi, senza prefisso
+        :return: I valori nello stesso ordine, None per quelli assenti
+        """
+        if not keys:
+            return []
+        replies = self.execute(["MGET", *(self.prefix + key for key in keys)])
+        if replies is None or not isinstance(replies[0], list):
+            return [None] * len(keys)
+        values = replies[0]
+        found = sum(value is not None for value in values)
+        self.hits += found
+        self.misses += len(values) - found
+        return values
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """
+        Funzione per salvare una voce con scadenza.
+
+        :param key: La chiave, senza prefisso
+        :param value: Il valore serializzato
+        :param ttl: La durata di validità in secondi
+        """
+        replies = self.execute(("SET", self.prefix + key, value, "PX", max(1, int(ttl * 1000))))
+        if replies is not None and not isinstance(replies[0], RespError):
+            self.writes += 1
+
+    def claim(self, key: str, ttl: float) -> Tuple[bool, Optional[bytes]]:
+        """
+        Funzione per prenotare lo scaricamento di una voce: il lock (SET NX)
+        e la lettura della voce viaggiano nella stessa pipeline.
+
+        :param key: La chiave, senza prefisso
+        :param ttl: Dopo quanti secondi il lock scade se non viene rilasciato
+        :return: La coppia (lock ottenuto, valore già presente); se il server
+                 non è raggiungibile il lock si considera ottenuto
+        """
+        token = f"{self._token}:{next(self._claims)}"
+        replies = self.execute(
+            ("SET", f"{self.prefix}lock:{key}", token, "NX", "PX", max(1, int(ttl * 1000))),
+            ("GET", self.prefix + key),
+        )
+        if replies is None:
+            return True, None
+        claimed = replies[0] == b"OK"
+        if claimed:
+            with self._lock:
+                self._held[key] = token
+        else:
+            self.claims_lost += 1
+        value = replies[1] if isinstance(replies[1], bytes) else None
+        return claimed, value
+
+    def release(self, key: str) -> None:
+        """
+        Funzione per rilasciare il lock ottenuto con claim, se nel frattempo non
+        è scaduto ed è stato preso da un'altra replica.
+
+        :param key: La chiave, senza prefisso
+        """
+        with self._lock:
+            token = self._held.pop(key, None)
+        if token is not None:
+            self.execute(("EVAL", RELEASE_SCRIPT, 1, f"{self.prefix}lock:{key}", token))
+
+    def stats(self) -> dict:
+        """
+        Funzione per ottenere i contatori della cache remota.
+
+        :return: Il dizionario con hit, miss, scritture, round trip, errori e lock persi
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "round_trips": self.round_trips,
+            "errors": self.errors,
+            "claims_lost": self.claims_lost,
+            "available": int(time.monotonic() >= self._down_until),
+        }
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class _Call:
+    """
+    Chiamata in corso condivisa tra i thread in attesa dello stesso risultato.
+    """
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Raggruppa le chiamate identiche concorrenti provenienti da thread diversi:
+    solo il primo thread esegue la funzione, gli altri ne attendono il risultato.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Funzione per eseguire fn una sola volta per tutte le chiamate concorrenti con la stessa chiave.
+
+        :param key: La chiave che identifica la chiamata
+        :param fn: La funzione da eseguire
+        :return: Il risultato di fn, condiviso tra tutti i chiamanti
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Funzione per ottenere i contatori delle chiamate eseguite e condivise.
+
+        :return: Il dizionario con i contatori
+        """
+        return {"executed": self.executed, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    Raggruppa le chiamate identiche concorrenti provenienti da task asyncio diversi:
+    la coroutine viene eseguita in un unico task atteso da tutti i chiamanti.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Funzione per eseguire fn una sola volta per tutte le chiamate concorrenti con la stessa chiave.
+
+        :param key: La chiave che identifica la chiamata
+        :param fn: La funzione asincrona da eseguire
+        :return: Il risultato di fn, condiviso tra tutti i chiamanti
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.executed += 1
+        else:
+            self.shared += 1
+        # shield: la cancellazione di un chiamante non interrompe gli altri
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Funzione per ottenere i contatori delle chiamate eseguite e condivise.
+
+        :return: Il dizionario con i contatori
+        """
+        return {"executed": self.executed, "shared": self.shared, "in_flight": len(self._calls)}
@@ -0,0 +1,249 @@
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .constants import SNAPSHOT_PATH
+
+logger = logging.getLogger(__name__)
+
+# Formato del file: intestazione, elenco delle tabelle, poi per ogni tabella
+# l'indice ordinato per chiave (posizioni assolute nel file) e i dati.
+MAGIC = b"TMDBSNP1"
+_HEADER = struct.Struct("<8sQI4x")          # magic, versione, numero di tabelle
+_TABLE = struct.Struct("<32sQQ")            # nome, posizione dell'indice, numero di voci
+_ENTRY = struct.Struct("<QIQI")             # posizione e lunghezza di chiave e valore
+
+Items = List[Tuple[bytes, bytes]]
+
+
+class SnapshotError(Exception):
+    """
+    Eccezione per un file di snapshot non valido.
+    """
+
+
+def write_snapshot(path: str, version: int, tables: Dict[str, Items]) -> None:
+    """
+    Funzione per scrivere uno snapshot immutabile e pubblicarlo in modo atomico:
+    il file viene scritto accanto a quello finale e poi sostituito con os.replace,
+    così i lettori vedono sempre la versione precedente o quella nuova, completa.
+
+    :param path: Il percorso dello snapshot
+    :param version: La versione dello snapshot
+    :param tables: Per ogni tabella, le coppie (chiave, valore) in byte
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    names = sorted(tables)
+    sorted_tables = [sorted(tables[name]) for name in names]
+    position = _HEADER.size + _TABLE.size * len(names)
+    layout = []
+    for items in sorted_tables:
+        index_at = position
+        position += _ENTRY.size * len(items)
+        entries = []
+        for key, value in items:
+            entries.append((position, len(key), position + len(key), len(value)))
+            position += len(key) + len(value)
+        layout.append((index_at, entries))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, version, len(names)))
+        for name, items, (index_at, _) in zip(names, sorted_tables, layout):
+            f.write(_TABLE.pack(name.encode("utf-8"), index_at, len(items)))
+        for items, (_, entries) in zip(sorted_tables, layout):
+            f.write(b"".join(_ENTRY.pack(*entry) for entry in entries))
+            for key, value in items:
+                f.write(key)
+                f.write(value)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class MappedTable:
+    """
+    Tabella ordinata di uno snapshot, letta direttamente dalla memoria mappata.
+    """
+
+    def __init__(self, buffer: memoryview, index_at: int, count: int) -> None:
+        self._buffer = buffer
+        self._index_at = index_at
+        self.count = count
+
+    def _entry(self, i: int) -> Tuple[int, int, int, int]:
+        return _ENTRY.unpack_from(self._buffer, self._index_at + i * _ENTRY.size)
+
+    def get(self, key: bytes) -> Optional[memoryview]:
+        """
+        Funzione per cercare una chiave (ricerca binaria, senza copiare i dati).
+
+        :param key: La chiave
+        :return: La vista sul valore, oppure None se la chiave non c'è
+        """
+        buffer = self._buffer
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_at, key_len, value_at, value_len = self._entry(mid)
+            current = buffer[key_at:key_at + key_len]
+            if current == key:
+                return buffer[value_at:value_at + value_len]
+            if bytes(current) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def items(self) -> Iterator[Tuple[bytes, memoryview]]:
+        """
+        Funzione per scorrere le voci in ordine di chiave.
+
+        :return: Le coppie (chiave, vista sul valore)
+        """
+        buffer = self._buffer
+        for i in range(self.count):
+            key_at, key_len, value_at, value_len = self._entry(i)
+            yield bytes(buffer[key_at:key_at + key_len]), buffer[value_at:value_at + value_len]
+
+
+class Snapshot:
+    """
+    Snapshot aperto in sola lettura con mmap: le pagine del file sono
+    condivise tra tutti i processi che lo mappano, quindi la memoria non
+    cresce con il numero di worker.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        self._buffer = memoryview(self._mmap)
+        magic, self.version, count = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} non è uno snapshot valido")
+        self.tables: Dict[str, MappedTable] = {}
+        for i in range(count):
+            name, index_at, entries = _TABLE.unpack_from(self._buffer, _HEADER.size + i * _TABLE.size)
+            self.tables[name.rstrip(b"\0").decode("utf-8")] = MappedTable(self._buffer, index_at, entries)
+        self.size = len(self._mmap)
+
+    def table(self, name: str) -> Optional[MappedTable]:
+        return self.tables.get(name)
+
+
+class SharedSnapshot:
+    """
+    Snapshot condiviso tra i worker dell'action server. Un solo processo (chi
+    ottiene il lock sul file <path>.lock) lo scrive; gli altri lo mappano e
+    passano alla nuova versione appena viene pubblicata. Se lo scrittore
+    termina, il lock si libera e un lettore ne prende il posto.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.current: Optional[Snapshot] = None
+        self._lock_file = None
+        self._swap_lock = threading.Lock()
+        self.swaps = 0
+
+    @property
+    def is_writer(self) -> bool:
+        return self._lock_file is not None
+
+    def try_become_writer(self) -> bool:
+        """
+        Funzione per provare a diventare lo scrittore dello snapshot.
+
+        :return: True se questo processo è (o è appena diventato) lo scrittore
+        """
+        if self._lock_file is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(f"{self.path}.lock", "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Il file resta aperto (e il lock tenuto) per tutta la vita del processo
+        self._lock_file = lock_file
+        return True
+
+    def publish(self, version: int, tables: Dict[str, Items]) -> Snapshot:
+        """
+        Funzione per scrivere una nuova versione e passare a usarla.
+
+        :param version: La versione dello snapshot
+        :param tables: Le tabelle dello snapshot
+        :return: Lo snapshot appena pubblicato
+        """
+        write_snapshot(self.path, version, tables)
+        return self.reload()
+
+    def reload(self) -> Optional[Snapshot]:
+        """
+        Funzione per mappare la versione pubblicata, se diversa da quella in uso.
+
+        :return: Lo snapshot nuovo, oppure None se non è cambiato o non esiste
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        current = self.current
+        if current is not None and current.identity == (stat.st_ino, stat.st_mtime_ns):
+            return None
+        try:
+            snapshot = Snapshot(self.path)
+        except (OSError, ValueError, struct.error, SnapshotError) as e:
+            logger.warning(f"Lettura dello snapshot {self.path} non riuscita: {e}")
+            return None
+        with self._swap_lock:
+            # La vecchia mappatura viene rilasciata quando nessuno la usa più
+            self.current = snapshot
+            self.swaps += 1
+        return snapshot
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Funzione per ottenere lo stato dello snapshot in uso.
+
+        :return: Il dizionario con versione, dimensione, cambi di versione e ruolo
+        """
+        current = self.current
+        return {
+            "version": current.version if current else 0,
+            "bytes": current.size if current else 0,
+            "swaps": self.swaps,
+            "writer": int(self.is_writer),
+        }
+
+
+shared_snapshot = SharedSnapshot(SNAPSHOT_PATH) if SNAPSHOT_PATH else None
+
+
+def pack_ids(ids: Iterable[int]) -> bytes:
+    """
+    Funzione per impacchettare una lista di interi senza segno a 32 bit (ordine nativo).
+    """
+    ids = list(ids)
+    return struct.pack(f"={len(ids)}I", *ids)
+
+
+def unpack_ids(view: memoryview) -> memoryview:
+    """
+    Funzione per leggere una lista prodotta da pack_ids senza copiarla.
+    """
+    return view.cast("B").cast("I")
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from .constants import METRICS_ENABLED, STREAM_REPLIES, TELEGRAM_ACCESS_TOKEN, TELEGRAM_API_URL, TELEGRAM_SEND_TIMEOUT
+from .metrics import registry
+from .posters import poster_url, send_telegram_poster
+from .tmdb_async import get_async_session
+
+logger = logging.getLogger(__name__)
+
+registry.describe("telegram_stream_messages_total", "Messaggi inviati direttamente a Telegram durante l'azione")
+
+
+class ReplyStream:
+    """
+    Invio incrementale delle risposte di un'azione. Sul canale Telegram, se
+    abilitato, ogni messaggio parte subito con sendMessage invece di attendere
+    la fine dell'azione (le locandine con sendPhoto, riusando il file_id);
+    negli altri casi i messaggi passano dal dispatcher. L'ordine dei
+    messaggi è sempre rispettato.
+    """
+
+    def __init__(self, dispatcher: CollectingDispatcher, tracker: Tracker) -> None:
+        self.dispatcher = dispatcher
+        self.chat_id = tracker.sender_id
+        self.direct = (
+            STREAM_REPLIES
+            and bool(TELEGRAM_ACCESS_TOKEN)
+            and tracker.get_latest_input_channel() == "telegram"
+        )
+        self._pending: Optional[asyncio.Future] = None
+        self._failed = False
+
+    async def __aenter__(self) -> "ReplyStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def send(self, text: str) -> None:
+        """
+        Funzione per inviare un messaggio senza attendere la consegna.
+
+        :param text: Il testo del messaggio
+        """
+        if not self.direct:
+            self.dispatcher.utter_message(text=text)
+            return
+        self._enqueue(partial(self._post, text), partial(self._fallback_text, text))
+
+    async def send_photo(self, poster_path: str) -> None:
+        """
+        Funzione per inviare la locandina di un film senza attendere la consegna.
+
+        :param poster_path: Il poster_path di TMDB
+        """
+        if not self.direct:
+            self.dispatcher.utter_message(image=await poster_url(poster_path))
+            return
+        self._enqueue(partial(send_telegram_poster, self.chat_id, poster_path),
+                      partial(self._fallback_photo, poster_path))
+
+    def _enqueue(self, post: Callable[[], Awaitable[bool]], fallback: Callable[[], Awaitable[None]]) -> None:
+        self._pending = asyncio.ensure_future(self._send_after(self._pending, post, fallback))
+
+    async def close(self) -> None:
+        """
+        Funzione per attendere la consegna di tutti i messaggi inviati.
+        """
+        if self._pending is not None:
+            await self._pending
+
+    async def _send_after(self, previous: Optional[asyncio.Future], post: Callable[[], Awaitable[bool]],
+                          fallback: Callable[[], Awaitable[None]]) -> None:
+        if previous is not None:
+            await previous
+        if not self._failed and await post():
+            if METRICS_ENABLED:
+                registry.inc("telegram_stream_messages_total", (("result", "sent"),))
+            return
+        # Dopo un errore i messaggi rimanenti passano dal dispatcher, così l'ordine resta corretto
+        self._failed = True
+        if METRICS_ENABLED:
+            registry.inc("telegram_stream_messages_total", (("result", "fallback"),))
+        await fallback()
+
+    async def _fallback_text(self, text: str) -> None:
+        self.dispatcher.utter_message(text=text)
+
+    async def _fallback_photo(self, poster_path: str) -> None:
+        self.dispatcher.utter_message(image=await poster_url(poster_path))
+
+    async def _post(self, text: str) -> bool:
+        url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_ACCESS_TOKEN}/sendMessage"
+        try:
+            async with get_async_session().post(
+                    url,
+                    json={"chat_id": self.chat_id, "text": text},
+                    timeout=aiohttp.ClientTimeout(total=TELEGRAM_SEND_TIMEOUT),
+            ) as r:
+                if r.status == 200:
+                    return True
+                logger.warning(f"Invio diretto a Telegram non riuscito: HTTP {r.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Invio diretto a Telegram non riuscito: {e}")
+        return False
@@ -0,0 +1,294 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Sequence, Tuple
+
+from .constants import RENDER_CACHE_ENTRIES, RESULTS_PAGE_SIZE
+from .metrics import registry, gauge_lines
+
+
+class Field(NamedTuple):
+    # Chiave TMDB, testo se il valore manca, lunghezza massima mostrata
+    key: str
+    default: str
+    limit: Optional[int] = None
+
+
+class Template:
+    """
+    Template di un messaggio, preparato una volta all'import: il testo per
+    str.format e, per ogni segnaposto, il campo TMDB da cui leggerlo.
+    """
+
+    __slots__ = ("_format", "_fields")
+
+    def __init__(self, text: str, **fields: Field) -> None:
+        self._format = text.format
+        self._fields = tuple(fields.items())
+
+    def render(self, item: Any, **extra: Any) -> str:
+        """
+        Funzione per riempire il template con i campi di un record TMDB.
+
+        :param item: Il record (o il dizionario) TMDB
+        :param extra: Valori aggiuntivi non presi dal record (es. la posizione)
+        :return: Il testo
+        """
+        get = item.get
+        for name, field in self._fields:
+            value = get(field.key)
+            if value is None:
+                value = field.default
+            elif field.limit is not None and len(value) > field.limit:
+                value = value[:field.limit] + "..."
+            extra[name] = value
+        return self._format(**extra)
+
+
+RELEASE = Template(
+    "\n• {title}\n📅 Uscita: {release_date}\n📝 {overview}\n",
+    title=Field("title", "Titolo non disponibile"),
+    release_date=Field("release_date", "Data non disponibile"),
+    overview=Field("overview", "Trama non disponibile", 300),
+)
+RELEASE_TV = Template(
+    "\n• {title}\n📅 Uscita: {release_date}\n📝 {overview}\n",
+    title=Field("name", "Titolo non disponibile"),
+    release_date=Field("first_air_date", "Data non disponibile"),
+    overview=Field("overview", "Trama non disponibile", 300),
+)
+OVERVIEW = Template(
+    "\n• {title}\n📝 {overview}\n",
+    title=Field("title", "Titolo non disponibile"),
+    overview=Field("overview", "Trama non disponibile", 300),
+)
+OVERVIEW_TV = Template(
+    "\n• {title}\n📝 {overview}\n",
+    title=Field("name", "Titolo non disponibile"),
+    overview=Field("first_air_date", "Trama non disponibile", 300),
+)
+RANKED = Template(
+    "\n{idx}. {title}\n📅 Uscita: {release_date}\n",
+    title=Field("title", "Titolo non disponibile"),
+    release_date=Field("release_date", "Data di uscita non disponibile"),
+)
+RANKED_TV = Template(
+    "\n{idx}. {title}\n📅 Uscita: {release_date}\n",
+    title=Field("name", "Titolo non disponibile"),
+    release_date=Field("first_air_date", "Data di uscita non disponibile"),
+)
+# Il testo è già troncato all'acquisizione (records.REVIEW_MAX_CHARS)
+REVIEW = Template(
+    "\n👤 Autore: {author}\n📝 Recensione:\n{content}\n",
+    author=Field("author", "Autore sconosciuto"),
+    content=Field("content", "Recensione non disponibile"),
+)
+# La trama è già troncata all'acquisizione (records.OVERVIEW_MAX_CHARS)
+MOVIE_DETAILS = Template(
+    "🎬 {title}\n\n📅 Data di uscita: {release_date}\n\n📝 Trama:\n{overview}",
+    title=Field("title", "Titolo non disponibile"),
+    release_date=Field("release_date", "Data di uscita non disponibile"),
+    overview=Field("overview", "Nessuna trama disponibile"),
+)
+TV_DETAILS = Template(
+    "🎬 {title}\n\n📅 Data di uscita: {release_date}\n\n📝 Trama:\n{overview}",
+    title=Field("name", "Titolo non disponibile"),
+    release_date=Field("first_air_date", "Data di uscita non disponibile"),
+    overview=Field("overview", "Nessuna trama disponibile"),
+)
+FILM_FORM = Template(
+    "🎬 Dettagli del film: {titolo}\n\n📝 Trama: {trama}",
+    trama=Field("overview", "Nessuna trama trovata."),
+)
+
+# Lista del cursore -> (template di un risultato, un messaggio per risultato)
+LIST_VIEWS: Dict[str, Tuple[Template, bool]] = {
+    "recent_movies": (RELEASE, False),
+    "movies_by_genre": (OVERVIEW, False),
+    "popular_movies": (RANKED, False),
+    "recent_tv": (RELEASE_TV, False),
+    "popular_tv": (RANKED_TV, False),
+    "tv_by_genre": (OVERVIEW_TV, False),
+    "movie_reviews": (REVIEW, True),
+    "tv_reviews": (REVIEW, True),
+}
+
+# Sezioni dei provider: (chiave TMDB, intestazione)
+PROVIDER_SECTIONS = (
+    ("flatrate", "\n📺 Incluso in abbonamento:"),
+    ("rent", "\n\n📺 In noleggio:"),
+    ("buy", "\n\n📺 In vendita:"),
+)
+
+
+class RenderCache:
+    """
+    Cache LRU dei messaggi già composti. La versione dei dati è l'oggetto
+    stesso della risposta TMDB: le risposte in cache sono condivise e non
+    vengono modificate, quindi finché la cache di TMDB restituisce lo stesso
+    oggetto il testo resta valido; un aggiornamento crea un oggetto nuovo e
+    il messaggio viene ricomposto.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        # chiave -> (dati da cui è stato composto il testo, testo)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: Hashable, data: Any, render: Callable[[], Any]) -> Any:
+        """
+        Funzione per ottenere un messaggio dalla cache, componendolo se manca.
+
+        :param key: La vista e i suoi argomenti
+        :param data: La risposta TMDB da cui si compone il messaggio
+        :param render: La funzione che compone il messaggio
+        :return: Il messaggio
+        """
+        # Il riferimento ai dati tenuto nella voce impedisce che il loro id venga riusato
+        key = (id(data), key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is data:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        text = render()
+        if self.max_entries <= 0:
+            return text
+        with self._lock:
+            self._entries[key] = (data, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def clear(self) -> None:
+        """
+        Funzione per svuotare la cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Funzione per ottenere i contatori della cache.
+
+        :return: Il dizionario con voci, hit e miss
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+render_cache = RenderCache(RENDER_CACHE_ENTRIES)
+
+registry.add_collector(lambda: gauge_lines("tmdb_render_cache", render_cache.stats(), "Cache dei messaggi composti"))
+
+
+def compose_list(kind: str, items: Sequence[Any], header: str, position: int = 0) -> str:
+    """
+    Funzione per comporre il messaggio di una lista: l'intestazione e i risultati.
+
+    :param kind: Il nome della lista (chiave di LIST_VIEWS)
+    :param items: I risultati da mostrare
+    :param header: L'intestazione del messaggio
+    :param position: La posizione del primo risultato nella lista completa
+    :return: Il messaggio
+    """
+    template, _ = LIST_VIEWS[kind]
+    return header + "".join(template.render(item, idx=idx) for idx, item in enumerate(items, start=position + 1))
+
+
+def render_list(kind: str, data: Any, header: str, count: int = RESULTS_PAGE_SIZE) -> str:
+    """
+    Funzione per comporre, o leggere dalla cache, il primo messaggio di una lista.
+
+    :param kind: Il nome della lista (chiave di LIST_VIEWS)
+    :param data: La prima pagina restituita da TMDB
+    :param header: L'intestazione del messaggio
+    :param count: Quanti risultati mostrare
+    :return: Il messaggio
+    """
+    return render_cache.get_or_render(
+        ("list", kind, header, count), data,
+        lambda: compose_list(kind, data.get("results", ())[:count], header),
+    )
+
+
+def render_entries(kind: str, data: Any, count: int = RESULTS_PAGE_SIZE) -> Tuple[str, ...]:
+    """
+    Funzione per comporre, o leggere dalla cache, i primi risultati di una
+    lista inviati come messaggi separati (le recensioni).
+
+    :param kind: Il nome della lista (chiave di LIST_VIEWS)
+    :param data: La prima pagina restituita da TMDB
+    :param count: Quanti risultati mostrare
+    :return: I testi dei risultati
+    """
+    template, _ = LIST_VIEWS[kind]
+    return render_cache.get_or_render(
+        ("entries", kind, count), data,
+        lambda: tuple(
+            template.render(item, idx=idx) for idx, item in enumerate(data.get("results", ())[:count], start=1)
+        ),
+    )
+
+
+def render_details(template: Template, data: Any) -> str:
+    """
+    Funzione per comporre il messaggio con i dettagli di un film o di una serie.
+
+    :param template: MOVIE_DETAILS oppure TV_DETAILS
+    :param data: I dettagli restituiti da TMDB
+    :return: Il messaggio
+    """
+    return render_cache.get_or_render(("details", template), data, lambda: template.render(data))
+
+
+def render_film_form(data: Any, titolo: str, show_year: bool, show_genre: bool) -> str:
+    """
+    Funzione per comporre i dettagli chiesti con il form del film.
+
+    :param data: I dettagli del film restituiti da TMDB
+    :param titolo: Il titolo scritto dall'utente
+    :param show_year: Se mostrare l'anno di uscita
+    :param show_genre: Se mostrare i generi
+    :return: Il messaggio
+    """
+    def render() -> str:
+        parts = [FILM_FORM.render(data, titolo=titolo)]
+        if show_year:
+            parts.append(f"\n📅 Anno di uscita: {data.get('release_date', 'sconosciuto')}")
+        if show_genre:
+            parts.append(f"\n🎭 Genere: {', '.join(g['name'] for g in data.get('genres', ()))}")
+        return "".join(parts)
+
+    return render_cache.get_or_render(("film_form", titolo, show_year, show_genre), data, render)
+
+
+def render_providers(providers: Any, title: str) -> str:
+    """
+    Funzione per comporre il messaggio con i provider italiani di un film.
+
+    :param providers: I provider della regione IT restituiti da TMDB
+    :param title: Il titolo del film
+    :return: Il messaggio
+    """
+    def render() -> str:
+        parts = [f"🎬 🇮🇹 Dove guardare {title}:\n"]
+        for key, header in PROVIDER_SECTIONS:
+            section = providers.get(key)
+            if section:
+                parts.append(header)
+                parts.extend(f"\n• {p.get('provider_name', 'Provider sconosciuto')}" for p in section)
+        return "".join(parts)
+
+    return render_cache.get_or_render(("providers", title), providers, render)
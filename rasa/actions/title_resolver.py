@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .catalog import normalize_title
+from .constants import TITLE_CACHE_MAX_ENTRIES, TITLE_CACHE_TTL, TITLE_NEGATIVE_TTL, DISAMBIGUATION_CANDIDATES
+from .disambiguation import rank_candidates
+from .tmdb_async import search_movie_by_title, search_TV_by_title
+
+
+class TitleResolver:
+    """
+    Risolve un titolo nei primi risultati di ricerca TMDB, memorizzando
+    sia i titoli trovati sia quelli senza risultati (cache negativa).
+    """
+
+    def __init__(self, search: Callable[[str, Optional[int]], Awaitable[dict]]) -> None:
+        self._search = search
+        self._entries: "OrderedDict[str, Tuple[List[Dict[str, Any]], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            results, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return results
+
+    def _store(self, key: str, results: List[Dict[str, Any]]) -> None:
+        ttl = TITLE_CACHE_TTL if results else TITLE_NEGATIVE_TTL
+        with self._lock:
+            self._entries[key] = (results, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > TITLE_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    async def candidates(self, title: str, year: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Funzione per ottenere i primi risultati di ricerca di un titolo.
+
+        :param title: Il titolo da cercare
+        :param year: L'anno richiesto, se indicato; i risultati sono memorizzati
+                     separatamente, perché con un anno la ricerca può non
+                     fermarsi al catalogo locale
+        :return: Fino a DISAMBIGUATION_CANDIDATES risultati con un ID, i più
+                 pertinenti per primi, vuota se non trovati
+        """
+        key = normalize_title(title) if not year else f"{normalize_title(title)}|{year}"
+        results = self._lookup(key)
+        if results is not None:
+            if results:
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+            return results
+
+        self.misses += 1
+        search_data = await self._search(title, year)
+        if "results" not in search_data:
+            # Errore della richiesta: non va memorizzato come titolo inesistente
+            return []
+
+        results = [r for r in search_data["results"] if r.get("id")]
+        # Si ordina prima di tagliare, così un titolo dell'anno richiesto non resta escluso
+        results = rank_candidates(title, results, year)[:DISAMBIGUATION_CANDIDATES]
+        self._store(key, results)
+        return results
+
+    async def resolve(self, title: str, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Funzione per risolvere un titolo nel risultato di ricerca più pertinente,
+        con lo stesso ordinamento usato da disambiguation.pick_best.
+
+        :param title: Il titolo da cercare
+        :param year: L'anno richiesto, se indicato
+        :return: Il risultato migliore, oppure None
+        """
+        results = rank_candidates(title, await self.candidates(title, year), year)
+        return results[0] if results else None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Funzione per ottenere i contatori del resolver.
+
+        :return: Il dizionario con voci, hit, hit negativi e miss
+        """
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+        }
+
+
+movie_resolver = TitleResolver(search_movie_by_title)
+tv_resolver = TitleResolver(search_TV_by_title)
+
+
+async def resolve_movie(title: str, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Funzione per risolvere il titolo di un film.
+
+    :param title: Il titolo del film
+    :param year: L'anno richiesto, se indicato
+    :return: Il risultato di ricerca del film, oppure None
+    """
+    return await movie_resolver.resolve(title, year)
+
+
+async def resolve_tv(title: str, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Funzione per risolvere il titolo di una serie tv.
+
+    :param title: Il titolo della serie tv
+    :param year: L'anno richiesto, se indicato
+    :return: Il risultato di ricerca della serie, oppure None
+    """
+    return await tv_resolver.resolve(title, year)
+
+
+async def movie_candidates(title: str, year: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Funzione per ottenere i film candidati per un titolo.
+
+    :param title: Il titolo del film
+    :param year: L'anno richiesto, se indicato
+    :return: I primi risultati di ricerca
+    """
+    return await movie_resolver.candidates(title, year)
+
+
+async def tv_candidates(title: str, year: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Funzione per ottenere le serie tv candidate per un titolo.
+
+    :param title: Il titolo della serie tv
+    :param year: L'anno richiesto, se indicato
+    :return: I primi risultati di ricerca
+    """
+    return await tv_resolver.candidates(title, year)
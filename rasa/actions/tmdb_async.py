@@ -0,0 +1,402 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+import aiohttp
+
+from .constants import (
+    base_url,
+    FULL_RECORD_APPEND,
+    TMDB_ASYNC_POOL_LIMIT,
+    TMDB_POOL_MAXSIZE,
+    TMDB_KEEPALIVE_TIMEOUT,
+    REMOTE_CACHE_POOL_SIZE,
+)
+from . import json_codec
+from .catalog import catalog
+from .deadline import request_timeout, fits_budget, remaining
+from .metrics import registry, gauge_lines, record_cache_lookup, record_upstream
+from .records import project_response, payload_size
+from .singleflight import AsyncSingleFlight
+from .tmdb_cache import (
+    response_cache,
+    local_lookup,
+    shared_lookup,
+    has_blocking_tiers,
+    make_cache_key,
+    remote_claim,
+    remote_fill,
+    remote_release,
+)
+from .tmdb_utils import (
+    build_tmdb_params,
+    page_params,
+    store_response,
+    list_refresher,
+    tmdb_guard,
+    adopt_response,
+    peer_wait_delays,
+)
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_stats = {"requests": 0, "connections_opened": 0, "connections_reused": 0}
+tmdb_async_flight = AsyncSingleFlight()
+# Thread per la cache su disco e la cache remota, una per connessione del pool remoto
+_cache_executor = ThreadPoolExecutor(max_workers=max(1, REMOTE_CACHE_POOL_SIZE), thread_name_prefix="tmdb-cache")
+
+
+async def _on_connection_create_end(session, context, params) -> None:
+    _stats["connections_opened"] += 1
+
+
+async def _on_connection_reuseconn(session, context, params) -> None:
+    _stats["connections_reused"] += 1
+
+
+def get_async_session() -> aiohttp.ClientSession:
+    """
+    Funzione per ottenere la sessione aiohttp condivisa dell'event loop corrente.
+
+    :return: La sessione condivisa con il pool di connessioni
+    """
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(_on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+        connector = aiohttp.TCPConnector(
+            limit=TMDB_ASYNC_POOL_LIMIT,
+            limit_per_host=TMDB_POOL_MAXSIZE,
+            keepalive_timeout=TMDB_KEEPALIVE_TIMEOUT,
+        )
+        _session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+        _session_loop = loop
+    return _session
+
+
+async def close_async_session() -> None:
+    """
+    Funzione per chiudere la sessione aiohttp condivisa.
+    """
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
+
+
+def get_async_pool_stats() -> Dict[str, Any]:
+    """
+    Funzione per ottenere le statistiche del pool di connessioni asincrono.
+
+    :return: Il dizionario con richieste, connessioni aperte e rapporto di riuso
+    """
+    total = _stats["connections_opened"] + _stats["connections_reused"]
+    reuse_ratio = _stats["connections_reused"] / total if total else 0.0
+    return {**_stats, "reuse_ratio": round(reuse_ratio, 4), "pool_limit": TMDB_ASYNC_POOL_LIMIT}
+
+
+registry.add_collector(lambda: gauge_lines("tmdb_async_pool", get_async_pool_stats(), "Pool di connessioni asincrono"))
+
+
+async def run_blocking(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Funzione per eseguire un'operazione sui livelli di cache con I/O
+    bloccante (disco, cache remota) senza fermare l'event loop.
+
+    :param fn: La funzione sincrona da eseguire
+    :return: Il risultato di fn
+    """
+    if not has_blocking_tiers():
+        # Solo memoria: niente da attendere, si evita il passaggio al thread
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(_cache_executor, partial(fn, *args))
+
+
+async def make_tmdb_request(endpoint: str, params: Optional[Dict] = None) -> dict:
+    """
+    Funzione per effettuare una richiesta asincrona all'API di TMDB.
+
+    :param endpoint: L'endpoint dell'API a cui fare la richiesta
+    :param params: I parametri da passare alla richiesta
+    :return: Il dizionario con i dati della risposta
+    """
+    # aiohttp non accetta valori None, che requests invece scarta
+    params = {k: v for k, v in build_tmdb_params(params).items() if v is not None}
+    key = make_cache_key(endpoint, params)
+    cached = local_lookup(key)
+    if cached is None:
+        cached = await run_blocking(shared_lookup, key)
+    if cached is not None:
+        record_cache_lookup(endpoint, "hit")
+        list_refresher.touch(key)
+        return cached
+    stale = response_cache.get_stale(key)
+    if stale is not None:
+        # Si risponde con la copia scaduta mentre viene aggiornata in background
+        record_cache_lookup(endpoint, "stale")
+        list_refresher.schedule(key, endpoint, params)
+        return stale
+    if request_timeout() is None:
+        # Budget del turno esaurito: nessuna nuova richiesta
+        record_cache_lookup(endpoint, "skipped")
+        return {}
+    record_cache_lookup(endpoint, "miss")
+    # Le richieste identiche concorrenti condividono un'unica chiamata HTTP,
+    # ma ogni chiamante attende al massimo fino alla propria scadenza
+    try:
+        return await asyncio.wait_for(
+            tmdb_async_flight.do(key, _fetch_tmdb, key, endpoint, params), timeout=remaining()
+        )
+    except asyncio.TimeoutError:
+        return {}
+
+async def _fetch_tmdb(key: str, endpoint: str, params: Dict) -> dict:
+    known = response_cache.expires_in(key)
+    claimed, data = await run_blocking(remote_claim, key, known)
+    if data is not None:
+        return adopt_response(key, endpoint, params, data)
+    if not claimed:
+        for delay in peer_wait_delays():
+            await asyncio.sleep(delay)
+            data = await run_blocking(remote_fill, key, known)
+            if data is not None:
+                return adopt_response(key, endpoint, params, data)
+    try:
+        return await _fetch_upstream(key, endpoint, params)
+    finally:
+        if claimed:
+            await run_blocking(remote_release, key)
+
+async def _fetch_upstream(key: str, endpoint: str, params: Dict) -> dict:
+    url = f"{base_url}{endpoint}"
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        if request_timeout() is None:
+            return {}
+        wait = tmdb_guard.admit()
+        if wait is None:
+            return {}
+        settled = False
+        try:
+            # Da qui il tentativo occupa un token e, a circuito semiaperto, la richiesta di prova;
+            # il finally la libera anche se il task viene cancellato
+            if not fits_budget(wait):
+                return {}
+            if wait:
+                await asyncio.sleep(wait)
+            timeout = request_timeout()
+            if timeout is None:
+                return {}
+            _stats["requests"] += 1
+            sent = time.perf_counter()
+            body = None
+            try:
+                async with get_async_session().get(
+                        url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as r:
+                    status, retry_after = r.status, r.headers.get("Retry-After")
+                    if status == 200:
+                        body = await r.read()
+                        record_upstream(endpoint, status, time.perf_counter() - sent, len(body))
+                    else:
+                        record_upstream(endpoint, status, time.perf_counter() - sent)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                record_upstream(endpoint, None, time.perf_counter() - sent)
+                status, retry_after = None, None
+            if body is not None:
+                try:
+                    raw = json_codec.loads(body)
+                except ValueError:
+                    # Corpo troncato o non valido: conta come un errore di rete
+                    status = None
+                else:
+                    tmdb_guard.on_success()
+                    settled = True
+                    data = project_response(endpoint, raw)
+                    # Scrittura su disco e nella cache remota prima di liberare il lock delle altre repliche
+                    await run_blocking(store_response, key, endpoint, params, data, payload_size(data))
+                    return data
+            delay = tmdb_guard.on_failure(status, retry_after, attempt, time.monotonic() - started)
+            settled = True
+        finally:
+            if not settled:
+                tmdb_guard.on_abandon()
+        if delay is None or not fits_budget(delay):
+            return {}
+        await asyncio.sleep(delay)
+        attempt += 1
+
+async def search_movie_by_title(title: str, year: Optional[int] = None) -> dict:
+    """
+    Funzione per cercare un film per titolo.
+
+    :param title: Il titolo del film da cercare
+    :param year: L'anno richiesto, se indicato: il catalogo locale basta solo se contiene un titolo di quell'anno
+    :return: Il dizionario con i dati del film cercato
+    """
+    data = catalog.search("movie", title, year)
+    if data is None:
+        data = await make_tmdb_request("/search/movie", {"query": title})
+    return data
+
+async def get_movie_details(movie_id: int) -> dict:
+    """
+    Funzione per ottenere i dettagli di un film.
+
+    :param movie_id: L'ID del film di cui ottenere i dettagli
+    :return: Il dizionario con i dettagli del film
+    """
+    return await make_tmdb_request(f"/movie/{movie_id}")
+
+async def get_now_playing_movies(page: int = 1) -> dict:
+    """
+    Funzione per ottenere i film attualmente in programmazione.
+
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con i dati dei film attualmente in programmazione
+    """
+    return await make_tmdb_request("/movie/now_playing", page_params(page))
+
+async def discover_movies(params: Dict, page: int = 1) -> dict:
+    """
+    Funzione per cercare film con i filtri di /discover (generi, anni, piattaforme).
+
+    :param params: I parametri di /discover, vedi discover.discover_params
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con i film che rispettano i filtri
+    """
+    return await make_tmdb_request("/discover/movie", page_params(page, params))
+
+async def discover_tv(params: Dict, page: int = 1) -> dict:
+    """
+    Funzione per cercare serie tv con i filtri di /discover (generi, anni, piattaforme).
+
+    :param params: I parametri di /discover, vedi discover.discover_params
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con le serie che rispettano i filtri
+    """
+    return await make_tmdb_request("/discover/tv", page_params(page, params))
+
+async def get_movies_by_genre(genre_id: int, page: int = 1) -> dict:
+    """
+    Funzione per ottenere i film di un determinato genere.
+
+    :param genre_id: L'ID del genere di cui ottenere i film
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con i dati dei film del genere specificato
+    """
+    return await discover_movies({"with_genres": genre_id}, page)
+
+async def get_movie_reviews(movie_id: int, page: int = 1) -> dict:
+    """
+    Funzione per ottenere le recensioni di un film.
+
+    :param movie_id: L'ID del film di cui ottenere le recensioni
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con i dati delle recensioni del film
+    """
+    return await make_tmdb_request(f"/movie/{movie_id}/reviews", {"page": page})
+
+async def get_tv_by_genre(genre_id: int, page: int = 1) -> dict:
+    """
+    Funzione per ottenere le serie tv di un determinato genere.
+
+    :param genre_id: L'ID del genere di cui ottenere le serie
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con i dati delle serie del genere specificato
+    """
+    return await discover_tv({"with_genres": genre_id}, page)
+
+async def get_favourite(page: int = 1) -> dict:
+    """
+    Funzione per ottenere i dettagli dei film preferiti.
+
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con i dettagli dei film preferiti
+    """
+    return await make_tmdb_request("/movie/popular", page_params(page))
+
+async def get_favourite_tv(page: int = 1) -> dict:
+    """
+    Funzione per ottenere i dettagli delle serie tv preferite.
+
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con i dettagli delle serie tv preferite
+    """
+    return await make_tmdb_request("/tv/popular", page_params(page))
+
+async def get_TV_details(series_id: int) -> dict:
+    """
+    Funzione per ottenere i dettagli di una serie tv.
+
+    :param series_id: L'ID della serie di cui ottenere i dettagli
+    :return: Il dizionario con i dettagli della serie
+    """
+    return await make_tmdb_request(f"/tv/{series_id}")
+
+async def search_TV_by_title(title: str, year: Optional[int] = None) -> dict:
+    """
+    Funzione per cercare una serie tv per titolo.
+
+    :param title: Il titolo della serie da cercare
+    :param year: L'anno richiesto, se indicato: il catalogo locale basta solo se contiene un titolo di quell'anno
+    :return: Il dizionario con i dati della serie cercata
+    """
+    data = catalog.search("tv", title, year)
+    if data is None:
+        data = await make_tmdb_request("/search/tv", {"query": title})
+    return data
+
+async def get_movie_watch_providers(movie_id: int) -> dict:
+    """
+    Funzione per ottenere i provider su cui guardare un film.
+
+    :param movie_id: L'ID del film di cui ottenere i provider
+    :return: Il dizionario con i provider del film
+    """
+    return await make_tmdb_request(f"/movie/{movie_id}/watch/providers")
+
+async def search_TV_latest(page: int = 1) -> dict:
+    """
+    Funzione per cercare le ultime serie tv aggiunte.
+
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con i dati delle ultime serie tv aggiunte
+    """
+    return await make_tmdb_request("/tv/on_the_air", page_params(page))
+
+async def get_series_reviews(series_id: int, page: int = 1) -> dict:
+    """
+    Funzione per ottenere le recensioni di una serie tv.
+
+    :param series_id: L'ID della serie di cui ottenere le recensioni
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con i dati delle recensioni della serie
+    """
+    return await make_tmdb_request(f"/tv/{series_id}/reviews", {"page": page})
+
+async def get_movie_full(movie_id: int) -> dict:
+    """
+    Funzione per ottenere in una sola richiesta dettagli, provider e recensioni
+    di un film.
+
+    :param movie_id: L'ID del film
+    :return: Il dizionario con i dettagli del film e le chiavi "watch/providers" e "reviews"
+    """
+    return await make_tmdb_request(f"/movie/{movie_id}", {"append_to_response": FULL_RECORD_APPEND})
+
+async def get_tv_full(series_id: int) -> dict:
+    """
+    Funzione per ottenere in una sola richiesta dettagli, provider e recensioni
+    di una serie tv.
+
+    :param series_id: L'ID della serie
+    :return: Il dizionario con i dettagli della serie e le chiavi "watch/providers" e "reviews"
+    """
+    return await make_tmdb_request(f"/tv/{series_id}", {"append_to_response": FULL_RECORD_APPEND})
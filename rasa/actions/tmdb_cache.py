@@ -0,0 +1,497 @@
+import json
+import logging
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from .constants import (
+    TMDB_CACHE_ENABLED,
+    TMDB_CACHE_MAX_ENTRIES,
+    TMDB_CACHE_MAX_BYTES,
+    TMDB_CACHE_DEFAULT_TTL,
+    TMDB_DISK_CACHE_PATH,
+    TMDB_DISK_CACHE_VACUUM_INTERVAL,
+    TMDB_STALE_TTL,
+    REMOTE_CACHE_URL,
+    REMOTE_CACHE_PREFIX,
+    REMOTE_CACHE_TIMEOUT,
+    REMOTE_CACHE_POOL_SIZE,
+    REMOTE_CACHE_RETRY_AFTER,
+    REMOTE_CACHE_LOCK_TTL,
+    SNAPSHOT_DECODED_MAX_ENTRIES,
+    SNAPSHOT_DECODED_MAX_BYTES,
+)
+from . import json_codec
+from .disk_cache import DiskCache, encode_payload, decode_payload
+from .remote_cache import RemoteCache
+from .records import project_response, to_jsonable
+from .snapshot import Items, shared_snapshot
+
+logger = logging.getLogger(__name__)
+
+# TTL in secondi per famiglia di endpoint, valutati in ordine
+ENDPOINT_TTLS: List[Tuple[re.Pattern, float]] = [
+    (re.compile(r"^/(movie|tv)/popular$"), 6 * 3600),
+    (re.compile(r"^/movie/now_playing$"), 3 * 3600),
+    (re.compile(r"^/tv/on_the_air$"), 3 * 3600),
+    (re.compile(r"^/discover/"), 6 * 3600),
+    (re.compile(r"^/search/"), 3600),
+    (re.compile(r"^/(movie|tv)/\d+/reviews$"), 3 * 3600),
+    (re.compile(r"^/(movie|tv)/\d+/watch/providers$"), 6 * 3600),
+    (re.compile(r"^/(movie|tv)/\d+/(credits|images)$"), 12 * 3600),
+    (re.compile(r"^/(movie|tv)/\d+$"), 12 * 3600),
+]
+
+# Endpoint delle liste condivise tra tutti gli utenti: in caso di scadenza o di
+# errore si serve la copia precedente mentre viene aggiornata in background
+SWR_ENDPOINTS: List[re.Pattern] = [
+    re.compile(r"^/(movie|tv)/popular$"),
+    re.compile(r"^/movie/now_playing$"),
+    re.compile(r"^/tv/on_the_air$"),
+    re.compile(r"^/discover/"),
+]
+
+
+def ttl_for(endpoint: str, params: Optional[Dict] = None) -> float:
+    """
+    Funzione per ottenere il TTL associato a un endpoint.
+
+    :param endpoint: L'endpoint dell'API
+    :param params: I parametri della richiesta; con append_to_response il TTL
+                   è il minimo tra quelli delle sotto-risorse incluse
+    :return: Il TTL in secondi
+    """
+    ttl = TMDB_CACHE_DEFAULT_TTL
+    for pattern, endpoint_ttl in ENDPOINT_TTLS:
+        if pattern.search(endpoint):
+            ttl = endpoint_ttl
+            break
+    appended = (params or {}).get("append_to_response")
+    if appended:
+        ttl = min([ttl] + [ttl_for(f"{endpoint}/{part}") for part in appended.split(",")])
+    return ttl
+
+
+def stale_ttl_for(endpoint: str) -> float:
+    """
+    Funzione per ottenere per quanto tempo una risposta scaduta può ancora essere servita.
+
+    :param endpoint: L'endpoint dell'API
+    :return: I secondi oltre la scadenza, 0 per gli endpoint senza stale-while-revalidate
+    """
+    if any(pattern.search(endpoint) for pattern in SWR_ENDPOINTS):
+        return TMDB_STALE_TTL
+    return 0
+
+
+def _normalize_value(key: str, value: Any) -> str:
+    value = str(value)
+    if key == "query":
+        # TMDB ignora maiuscole e spazi multipli nelle ricerche
+        value = " ".join(value.split()).casefold()
+    return value
+
+
+def make_cache_key(endpoint: str, params: Optional[Dict] = None) -> str:
+    """
+    Funzione per costruire la chiave di cache di una richiesta.
+
+    :param endpoint: L'endpoint dell'API
+    :param params: I parametri della richiesta (la chiave API viene esclusa)
+    :return: La chiave normalizzata
+    """
+    items = sorted(
+        (k, _normalize_value(k, v))
+        for k, v in (params or {}).items()
+        if k != "api_key" and v is not None
+    )
+    return f"{endpoint}?{urlencode(items)}" if items else endpoint
+
+
+class ResponseCache:
+    """
+    Cache in memoria delle risposte TMDB con scadenza (TTL) ed eviction LRU
+    per numero di voci e dimensione in byte. Le voci con una finestra di stale
+    restano leggibili con get_stale anche dopo la scadenza.
+
+    I valori restituiti sono condivisi tra le richieste e non vanno modificati.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # chiave -> (valore, scadenza, dimensione, fine della finestra di stale)
+        self._entries: "OrderedDict[str, Tuple[Any, float, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+        # Incrementata a ogni scrittura, per sapere quando ripubblicare lo snapshot
+        self.version = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Funzione per leggere una voce non scaduta dalla cache.
+
+        :param key: La chiave della voce
+        :return: Il valore salvato, oppure None se assente o scaduto
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size, stale_until = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                if stale_until <= now:
+                    self._remove(key)
+                    self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key: str) -> Optional[Any]:
+        """
+        Funzione per leggere una voce scaduta ma ancora nella sua finestra di stale.
+
+        :param key: La chiave della voce
+        :return: Il valore salvato, oppure None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[3] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            self.stale_hits += 1
+            return entry[0]
+
+    def expires_in(self, key: str) -> Optional[float]:
+        """
+        Funzione per sapere tra quanti secondi scade una voce.
+
+        :param key: La chiave della voce
+        :return: I secondi alla scadenza (negativi se già scaduta), oppure None se assente
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[1] - time.monotonic()
+
+    def set(self, key: str, value: Any, ttl: float, size: int, stale_ttl: float = 0) -> None:
+        """
+        Funzione per salvare una voce nella cache.
+
+        :param key: La chiave della voce
+        :param value: Il valore da salvare
+        :param ttl: La durata di validità in secondi
+        :param size: La dimensione stimata del valore in byte
+        :param stale_ttl: Per quanti secondi oltre la scadenza la voce resta leggibile con get_stale
+        """
+        if ttl <= 0 or self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            expires_at = time.monotonic() + ttl
+            self._entries[key] = (value, expires_at, size, expires_at + stale_ttl)
+            self._bytes += size
+            self.version += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        size = self._entries.pop(key)[2]
+        self._bytes -= size
+
+    def clear(self) -> None:
+        """
+        Funzione per svuotare la cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def export(self) -> List[Tuple[str, Any, float]]:
+        """
+        Funzione per ottenere le voci non ancora scadute, per lo snapshot condiviso.
+
+        :return: Le terne (chiave, valore, secondi di validità residui)
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [(key, entry[0], entry[1] - now) for key, entry in self._entries.items() if entry[1] > now]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Funzione per ottenere i contatori della cache.
+
+        :return: Il dizionario con voci, byte, hit, miss ed eviction
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stale_hits": self.stale_hits,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(
+    max_entries=TMDB_CACHE_MAX_ENTRIES if TMDB_CACHE_ENABLED else 0,
+    max_bytes=TMDB_CACHE_MAX_BYTES if TMDB_CACHE_ENABLED else 0,
+)
+
+disk_cache = DiskCache(TMDB_DISK_CACHE_PATH, TMDB_DISK_CACHE_VACUUM_INTERVAL) if TMDB_DISK_CACHE_PATH else None
+
+remote_cache = RemoteCache(
+    REMOTE_CACHE_URL,
+    REMOTE_CACHE_PREFIX,
+    timeout=REMOTE_CACHE_TIMEOUT,
+    pool_size=REMOTE_CACHE_POOL_SIZE,
+    retry_after=REMOTE_CACHE_RETRY_AFTER,
+) if REMOTE_CACHE_URL else None
+
+
+# Risposte dello snapshot già decodificate da questo worker: una cache piccola e separata,
+# così le copie non occupano response_cache e non vengono ripubblicate nello snapshot
+snapshot_decoded = ResponseCache(max_entries=SNAPSHOT_DECODED_MAX_ENTRIES, max_bytes=SNAPSHOT_DECODED_MAX_BYTES)
+_decoded_from: Optional[Tuple[int, int]] = None
+
+# Scadenza (ora di sistema) davanti al JSON di ogni risposta nello snapshot
+_EXPIRES = struct.Struct("<d")
+
+
+def response_tables() -> Dict[str, Items]:
+    """
+    Funzione per serializzare le risposte in memoria nella tabella "responses" dello snapshot condiviso.
+
+    :return: La tabella con chiave di cache -> scadenza e JSON della risposta
+    """
+    now = time.time()
+    return {"responses": [
+        (key.encode("utf-8"), _EXPIRES.pack(now + ttl) + json.dumps(
+            value, separators=(",", ":"), ensure_ascii=False, default=to_jsonable).encode("utf-8"))
+        for key, value, ttl in response_cache.export()
+    ]}
+
+
+def _snapshot_lookup(key: str) -> Optional[Any]:
+    global _decoded_from
+    snapshot = shared_snapshot.current if shared_snapshot is not None else None
+    table = snapshot.table("responses") if snapshot is not None else None
+    if table is None:
+        return None
+    if snapshot.identity != _decoded_from:
+        # Un nuovo snapshot può contenere risposte più recenti di quelle già decodificate
+        snapshot_decoded.clear()
+        _decoded_from = snapshot.identity
+    value = snapshot_decoded.get(key)
+    if value is not None:
+        return value
+    view = table.get(key.encode("utf-8"))
+    if view is None:
+        return None
+    ttl = _EXPIRES.unpack_from(view)[0] - time.time()
+    if ttl <= 0:
+        return None
+    value = project_response(key.partition("?")[0], json_codec.loads(bytes(view[_EXPIRES.size:])))
+    snapshot_decoded.set(key, value, ttl, len(view) - _EXPIRES.size)
+    return value
+
+
+def _encode_remote(value: Any, ttl: float) -> bytes:
+    # Scadenza assoluta davanti al JSON compresso, così chi legge conosce la validità residua senza PTTL
+    return _EXPIRES.pack(time.time() + ttl) + encode_payload(value)
+
+
+def _decode_remote(key: str, payload: bytes) -> Optional[Tuple[Any, float, int]]:
+    try:
+        ttl = _EXPIRES.unpack_from(payload)[0] - time.time()
+        if ttl <= 0:
+            return None
+        value, size = decode_payload(payload[_EXPIRES.size:])
+    except (ValueError, struct.error, zlib.error) as e:
+        logger.warning(f"Voce della cache remota non valida per {key}: {e}")
+        return None
+    return project_response(key.partition("?")[0], value), ttl, size
+
+
+def _near_fill(key: str, payload: Optional[bytes], newer_than: Optional[float] = None) -> Optional[Any]:
+    # La copia in memoria fa da near-cache: le chiavi più richieste non tornano al server remoto
+    entry = _decode_remote(key, payload) if payload is not None else None
+    if entry is None:
+        return None
+    value, ttl, size = entry
+    if newer_than is not None and ttl <= newer_than + 1:
+        return None
+    response_cache.set(key, value, ttl, size, stale_ttl_for(key.partition("?")[0]))
+    return value
+
+
+def prefetch_remote(keys: List[str]) -> int:
+    """
+    Funzione per copiare in memoria con un solo MGET le risposte già
+    scaricate da altre repliche, ad esempio tutte le pagine di una lista.
+
+    :param keys: Le chiavi delle richieste
+    :return: Il numero di risposte trovate nella cache remota
+    """
+    if remote_cache is None:
+        return 0
+    missing = [key for key in dict.fromkeys(keys) if response_cache.expires_in(key) is None]
+    found = 0
+    for key, payload in zip(missing, remote_cache.get_many(missing)):
+        if _near_fill(key, payload) is not None:
+            found += 1
+    return found
+
+
+def remote_claim(key: str, known: Optional[float]) -> Tuple[bool, Optional[Any]]:
+    """
+    Funzione per prenotare lo scaricamento di una risposta da TMDB tra tutte
+    le repliche, così ogni chiave viene scaricata una sola volta per TTL.
+
+    :param key: La chiave della richiesta
+    :param known: La validità residua della copia in memoria (response_cache.expires_in)
+    :return: La coppia (questa replica deve scaricarla, risposta più recente
+             di known già pubblicata da un'altra replica)
+    """
+    if remote_cache is None:
+        return True, None
+    claimed, payload = remote_cache.claim(key, REMOTE_CACHE_LOCK_TTL)
+    value = _near_fill(key, payload, known)
+    if value is not None and claimed:
+        remote_cache.release(key)
+    return claimed and value is None, value
+
+
+def remote_fill(key: str, known: Optional[float]) -> Optional[Any]:
+    """
+    Funzione per leggere dalla cache remota una risposta più recente di una copia già nota.
+
+    :param key: La chiave della richiesta
+    :param known: La validità residua della copia nota al momento di remote_claim
+                  (le letture concorrenti possono averla già sostituita in memoria)
+    :return: La risposta, oppure None
+    """
+    if remote_cache is None:
+        return None
+    return _near_fill(key, remote_cache.get_many([key])[0], known)
+
+
+def remote_release(key: str) -> None:
+    """
+    Funzione per rilasciare la prenotazione ottenuta con remote_claim.
+
+    :param key: La chiave della richiesta
+    """
+    if remote_cache is not None:
+        remote_cache.release(key)
+
+
+def cache_lookup(key: str) -> Optional[Any]:
+    """
+    Funzione per cercare una risposta nella cache in memoria e, se assente,
+    nello snapshot condiviso tra i worker, nella cache persistente su disco
+    e nella cache remota condivisa tra le repliche.
+
+    :param key: La chiave della richiesta
+    :return: La risposta salvata, oppure None
+    """
+    value = local_lookup(key)
+    return value if value is not None else shared_lookup(key)
+
+
+def local_lookup(key: str) -> Optional[Any]:
+    """
+    Funzione per cercare una risposta nei livelli che non bloccano: la cache
+    in memoria e lo snapshot mappato in memoria.
+
+    :param key: La chiave della richiesta
+    :return: La risposta salvata, oppure None
+    """
+    value = response_cache.get(key)
+    return value if value is not None else _snapshot_lookup(key)
+
+
+def shared_lookup(key: str) -> Optional[Any]:
+    """
+    Funzione per cercare una risposta nella cache su disco e nella cache
+    remota. Sono letture bloccanti: dal codice asincrono vanno eseguite in un
+    thread (vedi has_blocking_tiers).
+
+    :param key: La chiave della richiesta
+    :return: La risposta salvata, oppure None
+    """
+    value = _disk_lookup(key)
+    if value is not None or remote_cache is None:
+        return value
+    return _near_fill(key, remote_cache.get_many([key])[0])
+
+
+def has_blocking_tiers() -> bool:
+    """
+    Funzione per sapere se sono attivi livelli di cache con I/O bloccante
+    (cache su disco o cache remota).
+
+    :return: True se almeno uno dei due è attivo
+    """
+    return disk_cache is not None or remote_cache is not None
+
+
+def _disk_lookup(key: str) -> Optional[Any]:
+    if disk_cache is None:
+        return None
+    try:
+        entry = disk_cache.get(key)
+    except sqlite3.Error as e:
+        logger.warning(f"Lettura dalla cache su disco non riuscita: {e}")
+        return None
+    if entry is None:
+        return None
+    value, ttl, size, stale_ttl = entry
+    # Su disco i record sono salvati come JSON: si ricostruiscono quelli compatti
+    value = project_response(key.partition("?")[0], value)
+    response_cache.set(key, value, ttl, size, stale_ttl)
+    return value
+
+
+def cache_store(key: str, value: Any, ttl: float, size: int, stale_ttl: float = 0) -> None:
+    """
+    Funzione per salvare una risposta in tutti i livelli di cache attivi.
+
+    :param key: La chiave della richiesta
+    :param value: La risposta da salvare
+    :param ttl: La durata di validità in secondi
+    :param size: La dimensione della risposta in byte
+    :param stale_ttl: Per quanti secondi oltre la scadenza la risposta può essere servita in memoria
+    """
+    response_cache.set(key, value, ttl, size, stale_ttl)
+    if ttl <= 0:
+        return
+    if remote_cache is not None:
+        remote_cache.set(key, _encode_remote(value, ttl), ttl)
+    if disk_cache is None:
+        return
+    try:
+        disk_cache.set(key, value, ttl, stale_ttl)
+    except sqlite3.Error as e:
+        logger.warning(f"Scrittura nella cache su disco non riuscita: {e}")
@@ -1,35 +1,297 @@
+import time
+from typing import Any, Iterator, List, Optional, Dict, Tuple
+
 import requests
-from typing import Optional, Dict
-from .constants import api_key, base_url
 
-def make_tmdb_request(endpoint: str, params: Optional[Dict] = None) -> dict:
+from .constants import (
+    api_key,
+    base_url,
+    FULL_RECORD_APPEND,
+    TMDB_REFRESH_AHEAD,
+    TMDB_REFRESH_INTERVAL,
+    TMDB_REFRESH_IDLE_TTL,
+    TMDB_RATE_LIMIT,
+    TMDB_RATE_BURST,
+    TMDB_MAX_RETRIES,
+    TMDB_RETRY_BASE_DELAY,
+    TMDB_RETRY_MAX_DELAY,
+    TMDB_RETRY_BUDGET,
+    TMDB_BREAKER_THRESHOLD,
+    TMDB_BREAKER_RESET,
+    REMOTE_CACHE_LOCK_WAIT,
+)
+from . import json_codec
+from .catalog import catalog
+from .deadline import request_timeout, fits_budget
+from .http_session import session_get, get_pool_stats
+from .metrics import registry, gauge_lines, record_cache_lookup, record_upstream
+from .records import project_response, payload_size
+from .rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard
+from .refresher import BackgroundRefresher
+from .singleflight import SingleFlight
+from .tmdb_cache import (
+    response_cache,
+    remote_cache,
+    cache_lookup,
+    cache_store,
+    make_cache_key,
+    ttl_for,
+    stale_ttl_for,
+    prefetch_remote,
+    remote_claim,
+    remote_fill,
+    remote_release,
+)
+
+# Intervallo tra le letture della cache remota mentre un'altra replica scarica la stessa risposta
+PEER_POLL_INTERVAL = 0.05
+
+tmdb_flight = SingleFlight()
+# Limiti condivisi da tutte le chiamate verso TMDB, sincrone e asincrone
+tmdb_guard = UpstreamGuard(
+    TokenBucket(TMDB_RATE_LIMIT, TMDB_RATE_BURST),
+    CircuitBreaker(TMDB_BREAKER_THRESHOLD, TMDB_BREAKER_RESET),
+    max_retries=TMDB_MAX_RETRIES,
+    base_delay=TMDB_RETRY_BASE_DELAY,
+    max_delay=TMDB_RETRY_MAX_DELAY,
+    retry_budget=TMDB_RETRY_BUDGET,
+)
+
+def build_tmdb_params(params: Optional[Dict] = None) -> Dict:
     """
-    Funzione per effettuare una richiesta all'API di TMDB.
+    Funzione per completare i parametri di una richiesta a TMDB.
 
-    :param endpoint: L'endpoint dell'API a cui fare la richiesta
-    :param params: I parametri da passare alla richiesta
-    :return: Il dizionario con i dati della risposta
+    :param params: I parametri specifici della richiesta
+    :return: Il dizionario dei parametri con chiave API e lingua
     """
     if params is None:
         params = {}
     params["api_key"] = api_key
     if "language" not in params:
         params["language"] = "it-IT"
-    url = f"{base_url}{endpoint}"
-    r = requests.get(url, params=params)
-    if r.status_code == 200:
-        return r.json()
-    else:
+    return params
+
+def page_params(page: int, params: Optional[Dict] = None) -> Dict:
+    """
+    Funzione per aggiungere la pagina ai parametri di una lista. La prima
+    pagina non viene indicata, così condivide la cache con le richieste senza pagina.
+
+    :param page: La pagina richiesta (da 1)
+    :param params: Gli altri parametri della richiesta
+    :return: Il dizionario dei parametri
+    """
+    params = dict(params or {})
+    if page > 1:
+        params["page"] = page
+    return params
+
+def make_tmdb_request(endpoint: str, params: Optional[Dict] = None) -> dict:
+    """
+    Funzione per effettuare una richiesta all'API di TMDB.
+
+    :param endpoint: L'endpoint dell'API a cui fare la richiesta
+    :param params: I parametri da passare alla richiesta
+    :return: Il dizionario con i dati della risposta
+    """
+    params = build_tmdb_params(params)
+    key = make_cache_key(endpoint, params)
+    cached = cache_lookup(key)
+    if cached is not None:
+        record_cache_lookup(endpoint, "hit")
+        list_refresher.touch(key)
+        return cached
+    stale = response_cache.get_stale(key)
+    if stale is not None:
+        # Si risponde con la copia scaduta mentre viene aggiornata in background
+        record_cache_lookup(endpoint, "stale")
+        list_refresher.schedule(key, endpoint, params)
+        return stale
+    if request_timeout() is None:
+        # Budget del turno esaurito: nessuna nuova richiesta
+        record_cache_lookup(endpoint, "skipped")
         return {}
+    record_cache_lookup(endpoint, "miss")
+    # Le richieste identiche concorrenti condividono un'unica chiamata HTTP
+    return tmdb_flight.do(key, _fetch_tmdb, key, endpoint, params)
+
+def peer_wait_delays() -> Iterator[float]:
+    """
+    Funzione per ottenere le attese tra una lettura e l'altra della cache
+    remota mentre un'altra replica scarica la stessa risposta, entro
+    REMOTE_CACHE_LOCK_WAIT e il budget del turno.
+
+    :return: Le attese in secondi
+    """
+    waited = 0.0
+    while waited < REMOTE_CACHE_LOCK_WAIT and fits_budget(PEER_POLL_INTERVAL):
+        yield PEER_POLL_INTERVAL
+        waited += PEER_POLL_INTERVAL
+
+def adopt_response(key: str, endpoint: str, params: Dict, data: dict) -> dict:
+    """
+    Funzione per usare una risposta scaricata da un'altra replica: è già in
+    memoria, resta solo da registrare le liste da mantenere aggiornate.
+
+    :param key: La chiave di cache
+    :param endpoint: L'endpoint dell'API
+    :param params: I parametri completi della richiesta
+    :param data: La risposta letta dalla cache remota
+    :return: La risposta
+    """
+    if stale_ttl_for(endpoint):
+        list_refresher.register(key, endpoint, params)
+    return data
+
+def _fetch_tmdb(key: str, endpoint: str, params: Dict) -> dict:
+    known = response_cache.expires_in(key)
+    claimed, data = remote_claim(key, known)
+    if data is not None:
+        return adopt_response(key, endpoint, params, data)
+    if not claimed:
+        for delay in peer_wait_delays():
+            time.sleep(delay)
+            data = remote_fill(key, known)
+            if data is not None:
+                return adopt_response(key, endpoint, params, data)
+    try:
+        return _fetch_upstream(key, endpoint, params)
+    finally:
+        if claimed:
+            remote_release(key)
+
+def _fetch_upstream(key: str, endpoint: str, params: Dict) -> dict:
+    raw = request_upstream(endpoint, params)
+    if raw is None:
+        return {}
+    # Proiezione sui soli campi usati, prima di entrare in cache
+    data = project_response(endpoint, raw)
+    store_response(key, endpoint, params, data, payload_size(data))
+    return data
+
+def request_upstream(endpoint: str, params: Dict) -> Optional[Any]:
+    """
+    Funzione per eseguire una richiesta a TMDB senza passare dalla cache, con
+    rate limiting, retry, circuit breaker, metriche e scadenza del turno.
 
-def search_movie_by_title(title: str) -> dict:
+    :param endpoint: L'endpoint dell'API
+    :param params: I parametri completi della richiesta (vedi build_tmdb_params)
+    :return: La risposta decodificata, oppure None se non è stato possibile ottenerla
+    """
+    url = f"{base_url}{endpoint}"
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        if request_timeout() is None:
+            return None
+        wait = tmdb_guard.admit()
+        if wait is None:
+            return None
+        settled = False
+        try:
+            # Da qui il tentativo occupa un token e, a circuito semiaperto, la richiesta di prova
+            if not fits_budget(wait):
+                return None
+            if wait:
+                time.sleep(wait)
+            timeout = request_timeout()
+            if timeout is None:
+                return None
+            sent = time.perf_counter()
+            try:
+                r = session_get(url, params=params, timeout=timeout)
+            except requests.RequestException:
+                record_upstream(endpoint, None, time.perf_counter() - sent)
+                status, retry_after = None, None
+            else:
+                record_upstream(endpoint, r.status_code, time.perf_counter() - sent, len(r.content))
+                status, retry_after = r.status_code, r.headers.get("Retry-After")
+                if status == 200:
+                    try:
+                        raw = json_codec.loads(r.content)
+                    except ValueError:
+                        # Corpo troncato o non valido: conta come un errore di rete
+                        status = None
+                    else:
+                        tmdb_guard.on_success()
+                        settled = True
+                        return raw
+            delay = tmdb_guard.on_failure(status, retry_after, attempt, time.monotonic() - started)
+            settled = True
+        finally:
+            if not settled:
+                tmdb_guard.on_abandon()
+        if delay is None or not fits_budget(delay):
+            return None
+        time.sleep(delay)
+        attempt += 1
+
+def store_response(key: str, endpoint: str, params: Dict, data: dict, size: int) -> None:
+    """
+    Funzione per salvare una risposta in cache e registrare le liste da
+    mantenere aggiornate in background.
+
+    :param key: La chiave di cache
+    :param endpoint: L'endpoint dell'API
+    :param params: I parametri completi della richiesta
+    :param data: La risposta decodificata e proiettata
+    :param size: La dimensione della risposta in byte
+    """
+    stale_ttl = stale_ttl_for(endpoint)
+    cache_store(key, data, ttl_for(endpoint, params), size, stale_ttl)
+    if stale_ttl:
+        list_refresher.register(key, endpoint, params)
+
+def request_key(endpoint: str, params: Optional[Dict] = None) -> str:
+    """
+    Funzione per ottenere la chiave di cache usata da make_tmdb_request per una richiesta.
+
+    :param endpoint: L'endpoint dell'API
+    :param params: I parametri specifici della richiesta
+    :return: La chiave di cache
+    """
+    return make_cache_key(endpoint, build_tmdb_params(dict(params or {})))
+
+def prefetch_requests(requests: List[Tuple[str, Optional[Dict]]]) -> int:
+    """
+    Funzione per copiare in memoria con un solo round trip le risposte che
+    altre repliche hanno già salvato nella cache remota (es. tutte le pagine
+    di una lista), prima di richiederle una per una.
+
+    :param requests: Le coppie (endpoint, parametri)
+    :return: Il numero di risposte trovate
+    """
+    return prefetch_remote([request_key(endpoint, params) for endpoint, params in requests])
+
+def _refresh_entry(key: str, endpoint: str, params: Dict) -> dict:
+    return tmdb_flight.do(key, _fetch_tmdb, key, endpoint, params)
+
+list_refresher = BackgroundRefresher(
+    _refresh_entry,
+    response_cache,
+    refresh_ahead=TMDB_REFRESH_AHEAD,
+    interval=TMDB_REFRESH_INTERVAL,
+    idle_ttl=TMDB_REFRESH_IDLE_TTL,
+)
+
+# Statistiche già raccolte dai singoli componenti, esportate come gauge
+registry.add_collector(lambda: gauge_lines("tmdb_response_cache", response_cache.stats(), "Cache in memoria"))
+registry.add_collector(lambda: gauge_lines("tmdb_upstream_guard", tmdb_guard.stats(), "Rate limiter e retry"))
+registry.add_collector(lambda: gauge_lines("tmdb_refresher", list_refresher.stats(), "Aggiornamento in background"))
+registry.add_collector(lambda: gauge_lines("tmdb_http_pool", get_pool_stats(), "Pool di connessioni sincrono"))
+if remote_cache is not None:
+    registry.add_collector(lambda: gauge_lines("tmdb_remote_cache", remote_cache.stats(), "Cache remota condivisa"))
+
+def search_movie_by_title(title: str, year: Optional[int] = None) -> dict:
     """
     Funzione per cercare un film per titolo.
 
     :param title: Il titolo del film da cercare
+    :param year: L'anno richiesto, se indicato: il catalogo locale basta solo se contiene un titolo di quell'anno
     :return: Il dizionario con i dati del film cercato
     """
-    data = make_tmdb_request("/search/movie", {"query": title})
+    data = catalog.search("movie", title, year)
+    if data is None:
+        data = make_tmdb_request("/search/movie", {"query": title})
     return data
 
 def get_movie_details(movie_id: int) -> dict:
@@ -42,63 +304,85 @@ def get_movie_details(movie_id: int) -> dict:
     data = make_tmdb_request(f"/movie/{movie_id}")
     return data
 
-def get_now_playing_movies() -> dict:
+def get_now_playing_movies(page: int = 1) -> dict:
     """
     Funzione per ottenere i film attualmente in programmazione.
 
+    :param page: La pagina dei risultati (da 1)
     :return: Il dizionario con i dati dei film attualmente in programmazione
     """
-    data = make_tmdb_request("/movie/now_playing")
+    data = make_tmdb_request("/movie/now_playing", page_params(page))
     return data
 
-def get_movies_by_genre(genre_id: int) -> dict:
+def discover_movies(params: Dict, page: int = 1) -> dict:
+    """
+    Funzione per cercare film con i filtri di /discover (generi, anni, piattaforme).
+
+    :param params: I parametri di /discover, vedi discover.discover_params
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con i film che rispettano i filtri
+    """
+    return make_tmdb_request("/discover/movie", page_params(page, params))
+
+def discover_tv(params: Dict, page: int = 1) -> dict:
+    """
+    Funzione per cercare serie tv con i filtri di /discover (generi, anni, piattaforme).
+
+    :param params: I parametri di /discover, vedi discover.discover_params
+    :param page: La pagina dei risultati (da 1)
+    :return: Il dizionario con le serie che rispettano i filtri
+    """
+    return make_tmdb_request("/discover/tv", page_params(page, params))
+
+def get_movies_by_genre(genre_id: int, page: int = 1) -> dict:
     """
     Funzione per ottenere i film di un determinato genere.
 
     :param genre_id: L'ID del genere di cui ottenere i film
+    :param page: La pagina dei risultati (da 1)
     :return: Il dizionario con i dati dei film del genere specificato
     """
-    data = make_tmdb_request("/discover/movie", {"with_genres": genre_id})
-    return data
+    return discover_movies({"with_genres": genre_id}, page)
 
-def get_movie_reviews(movie_id: int) -> dict:
+def get_movie_reviews(movie_id: int, page: int = 1) -> dict:
     """
     Funzione per ottenere le recensioni di un film.
 
     :param movie_id: L'ID del film di cui ottenere le recensioni
+    :param page: La pagina dei risultati (da 1)
     :return: Il dizionario con i dati delle recensioni del film
     """
-    data = make_tmdb_request(f"/movie/{movie_id}/reviews", {"page": 1})
+    data = make_tmdb_request(f"/movie/{movie_id}/reviews", {"page": page})
     return data
 
-def get_tv_by_genre(genre_id: int) -> dict:
+def get_tv_by_genre(genre_id: int, page: int = 1) -> dict:
     """
     Funzione per ottenere i film di un determinato genere.
 
     :param genre_id: L'ID del genere di cui ottenere i film
+    :param page: La pagina dei risultati (da 1)
     :return: Il dizionario con i dati dei film del genere specificato
     """
-    data = make_tmdb_request("/discover/tv", {"with_genres": genre_id})
-    return data
+    return discover_tv({"with_genres": genre_id}, page)
 
-def get_favourite() -> dict:
+def get_favourite(page: int = 1) -> dict:
     """
     Funzione per ottenere i dettagli dei film preferiti.
 
-    :param nessuno
+    :param page: La pagina dei risultati (da 1)
     :return: Il dizionario con i dettagli dei film preferiti
     """
-    data = make_tmdb_request(f"/movie/popular")
+    data = make_tmdb_request("/movie/popular", page_params(page))
     return data
 
-def get_favourite_tv() -> dict:
+def get_favourite_tv(page: int = 1) -> dict:
     """
     Funzione per ottenere i dettagli delle serie tv preferite.
 
-    :param nessuno
+    :param page: La pagina dei risultati (da 1)
     :return: Il dizionario con i dettagli dei film preferiti
     """
-    data = make_tmdb_request(f"/tv/popular")
+    data = make_tmdb_request("/tv/popular", page_params(page))
     return data
 
 def get_TV_details(series_id: int) -> dict:
@@ -113,14 +397,17 @@ def get_TV_details(series_id: int) -> dict:
 
 
 
-def search_TV_by_title(title: str) -> dict:
+def search_TV_by_title(title: str, year: Optional[int] = None) -> dict:
     """
     Funzione per cercare un film per titolo.
 
     :param title: Il titolo del film da cercare
+    :param year: L'anno richiesto, se indicato: il catalogo locale basta solo se contiene un titolo di quell'anno
     :return: Il dizionario con i dati del film cercato
     """
-    data = make_tmdb_request("/search/tv", {"query": title})
+    data = catalog.search("tv", title, year)
+    if data is None:
+        data = make_tmdb_request("/search/tv", {"query": title})
     return data
 
 def get_movie_watch_providers(movie_id: int) -> dict:
@@ -133,22 +420,45 @@ def get_movie_watch_providers(movie_id: int) -> dict:
     data = make_tmdb_request(f"/movie/{movie_id}/watch/providers")
     return data
 
-def search_TV_latest() -> dict:
+def search_TV_latest(page: int = 1) -> dict:
     """
     Funzione per cercare le ultime serie tv aggiungte.
 
-    :param nessuno
+    :param page: La pagina dei risultati (da 1)
     :return: Il dizionario con i dati delle ultime serie tv aggiunte
     """
-    data = make_tmdb_request("/tv/on_the_air")
+    data = make_tmdb_request("/tv/on_the_air", page_params(page))
     return data
 
-def get_series_reviews(series_id: int) -> dict:
+def get_series_reviews(series_id: int, page: int = 1) -> dict:
     """
     Funzione per ottenere le recensioni di un film.
 
     :param movie_id: L'ID del film di cui ottenere le recensioni
+    :param page: La pagina dei risultati (da 1)
     :return: Il dizionario con i dati delle recensioni del film
     """
-    data = make_tmdb_request(f"/tv/{series_id}/reviews", {"page": 1})
+    data = make_tmdb_request(f"/tv/{series_id}/reviews", {"page": page})
+    return data
+
+def get_movie_full(movie_id: int) -> dict:
+    """
+    Funzione per ottenere in una sola richiesta dettagli, provider e recensioni
+    di un film.
+
+    :param movie_id: L'ID del film
+    :return: Il dizionario con i dettagli del film e le chiavi "watch/providers" e "reviews"
+    """
+    data = make_tmdb_request(f"/movie/{movie_id}", {"append_to_response": FULL_RECORD_APPEND})
+    return data
+
+def get_tv_full(series_id: int) -> dict:
+    """
+    Funzione per ottenere in una sola richiesta dettagli, provider e recensioni
+    di una serie tv.
+
+    :param series_id: L'ID della serie
+    :return: Il dizionario con i dettagli della serie e le chiavi "watch/providers" e "reviews"
+    """
+    data = make_tmdb_request(f"/tv/{series_id}", {"append_to_response": FULL_RECORD_APPEND})
     return data
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .constants import MOVIES_GENRE_MAP, TV_GENRE_MAP, TMDB_WARMUP, TMDB_WARMUP_CONCURRENCY
+from .tmdb_cache import make_cache_key
+from .tmdb_utils import make_tmdb_request, prefetch_requests
+
+logger = logging.getLogger(__name__)
+
+_warmup_thread: Optional[threading.Thread] = None
+
+
+# Liste condivise da tutti gli utenti, con gli stessi parametri usati dalle azioni
+WARMUP_LISTS = ("/movie/popular", "/tv/popular", "/movie/now_playing", "/tv/on_the_air")
+
+
+def warmup_requests() -> List[Tuple[str, Optional[Dict]]]:
+    """
+    Funzione per elencare le richieste da eseguire all'avvio: le liste e una
+    pagina di /discover per ogni ID di genere distinto. Le stesse richieste
+    vengono lette in blocco dalla cache remota ed eseguite da warmup_jobs.
+
+    :return: La lista di coppie (endpoint, parametri)
+    """
+    requests: List[Tuple[str, Optional[Dict]]] = [(endpoint, None) for endpoint in WARMUP_LISTS]
+    # Più nomi di genere puntano allo stesso ID (es. "comico" e "commedia")
+    for kind, genre_map in (("movie", MOVIES_GENRE_MAP), ("tv", TV_GENRE_MAP)):
+        requests += [(f"/discover/{kind}", {"with_genres": g}) for g in sorted(set(genre_map.values()))]
+    return requests
+
+
+def warmup_jobs() -> List[Tuple[str, Callable[[], dict]]]:
+    """
+    Funzione per ottenere le funzioni da chiamare per le richieste di warmup_requests.
+
+    :return: La lista di coppie (descrizione, funzione da chiamare)
+    """
+    # make_tmdb_request completa i parametri ricevuti: ogni job ha la sua copia
+    return [
+        (make_cache_key(endpoint, params), partial(make_tmdb_request, endpoint, dict(params) if params else None))
+        for endpoint, params in warmup_requests()
+    ]
+
+
+def warm_up_cache(concurrency: int = TMDB_WARMUP_CONCURRENCY) -> int:
+    """
+    Funzione per riempire la cache con liste e generi prima delle richieste degli utenti.
+
+    :param concurrency: Il numero massimo di richieste contemporanee
+    :return: Il numero di richieste completate con successo
+    """
+    jobs = warmup_jobs()
+    started = time.monotonic()
+    completed = 0
+    logger.info(f"Warm-up cache: {len(jobs)} richieste, concorrenza {concurrency}")
+    # Con la cache remota, le liste già scaricate da altre repliche arrivano con un solo MGET
+    shared = prefetch_requests(warmup_requests())
+    if shared:
+        logger.info(f"Warm-up cache: {shared}/{len(jobs)} risposte già nella cache remota")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="tmdb-warmup") as pool:
+        futures = {pool.submit(fn): label for label, fn in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            label = futures[future]
+            try:
+                if future.result():
+                    completed += 1
+                else:
+                    logger.warning(f"Warm-up cache: nessun dato per {label}")
+            except Exception as e:
+                logger.warning(f"Warm-up cache: {label} non riuscita: {e}")
+            if done % 10 == 0:
+                logger.info(f"Warm-up cache: {done}/{len(jobs)} richieste eseguite")
+    logger.info(
+        f"Warm-up cache completato: {completed}/{len(jobs)} richieste in {time.monotonic() - started:.2f}s"
+    )
+    return completed
+
+
+def start_warm_up() -> None:
+    """
+    Funzione per avviare il warm-up della cache in background, se abilitato.
+    """
+    global _warmup_thread
+    if not TMDB_WARMUP or _warmup_thread is not None:
+        return
+    _warmup_thread = threading.Thread(target=warm_up_cache, name="tmdb-warmup", daemon=True)
+    _warmup_thread.start()
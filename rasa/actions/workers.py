@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from .catalog import catalog
+from .catalog_ingest import start_catalog_refresh
+from .constants import SNAPSHOT_CHECK_INTERVAL, SNAPSHOT_PUBLISH_INTERVAL
+from .metrics import registry, gauge_lines
+from .snapshot import shared_snapshot
+from .tmdb_cache import response_cache, response_tables, snapshot_decoded
+
+logger = logging.getLogger(__name__)
+
+_snapshot_thread: Optional[threading.Thread] = None
+
+if shared_snapshot is not None:
+    registry.add_collector(lambda: gauge_lines("tmdb_snapshot", shared_snapshot.stats(), "Snapshot condiviso"))
+    registry.add_collector(lambda: gauge_lines(
+        "tmdb_snapshot_decoded", snapshot_decoded.stats(), "Risposte dello snapshot decodificate dal worker"))
+
+
+def publish_snapshot() -> None:
+    """
+    Funzione per pubblicare catalogo e risposte in memoria in un nuovo snapshot condiviso.
+    """
+    started = time.monotonic()
+    catalog_version = catalog.version
+    tables = catalog.tables()
+    tables.update(response_tables())
+    snapshot = shared_snapshot.publish(time.time_ns(), tables)
+    if snapshot is not None:
+        # Anche lo scrittore legge il catalogo dallo snapshot e libera la copia in memoria
+        catalog.attach(snapshot, catalog_version)
+        logger.info(
+            f"Snapshot pubblicato: {snapshot.size} byte, {len(tables)} tabelle in {time.monotonic() - started:.2f}s"
+        )
+
+
+def _snapshot_loop() -> None:
+    published = None
+    while True:
+        if shared_snapshot.is_writer:
+            time.sleep(SNAPSHOT_PUBLISH_INTERVAL)
+            state = (catalog.version, response_cache.version)
+            if state == published:
+                continue
+            try:
+                publish_snapshot()
+                published = state
+            except OSError as e:
+                logger.warning(f"Pubblicazione dello snapshot non riuscita: {e}")
+            continue
+
+        time.sleep(SNAPSHOT_CHECK_INTERVAL)
+        if shared_snapshot.try_become_writer():
+            # Lo scrittore precedente è terminato: questo worker ne prende il posto
+            logger.info("Snapshot condiviso: questo worker diventa lo scrittore")
+            start_catalog_refresh()
+            continue
+        snapshot = shared_snapshot.reload()
+        if snapshot is not None:
+            catalog.attach(snapshot)
+            logger.debug(f"Snapshot condiviso: passato alla versione {snapshot.version}")
+
+
+def start_shared_snapshot() -> bool:
+    """
+    Funzione per avviare lo snapshot condiviso tra i worker, se configurato
+    (SNAPSHOT_PATH). Il primo processo che ottiene il lock diventa lo
+    scrittore: scarica liste e catalogo e li pubblica; gli altri mappano lo
+    snapshot e passano alle nuove versioni senza scaricare nulla.
+
+    :return: True se questo processo deve eseguire warm-up e aggiornamento del catalogo
+    """
+    global _snapshot_thread
+    if shared_snapshot is None:
+        return True
+    if _snapshot_thread is not None:
+        return shared_snapshot.is_writer
+    writer = shared_snapshot.try_become_writer()
+    # Una versione già pubblicata (es. prima di un riavvio) si usa subito
+    snapshot = shared_snapshot.reload()
+    if snapshot is not None:
+        catalog.attach(snapshot)
+    logger.info(f"Snapshot condiviso {shared_snapshot.path}: {'scrittore' if writer else 'lettore'}")
+    _snapshot_thread = threading.Thread(target=_snapshot_loop, name="tmdb-snapshot", daemon=True)
+    _snapshot_thread.start()
+    return writer
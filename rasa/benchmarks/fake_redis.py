@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from actions.remote_cache import RELEASE_SCRIPT
+
+
+class FakeRedis:
+    """
+    Server in memoria che parla il protocollo Redis (RESP) con i soli comandi
+    usati dalla cache remota dell'action server: GET, MGET, SET (NX, EX, PX),
+    DEL, PTTL, EVAL (solo lo script di rilascio dei lock), più PING, AUTH,
+    SELECT, FLUSHALL e DBSIZE. Le scadenze sono controllate alla lettura,
+    come in Redis.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        # chiave -> (valore, scadenza in secondi monotonic o None)
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands: Counter = Counter()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def call(self, args: List[bytes]) -> Any:
+        """
+        Funzione per eseguire un comando.
+
+        :param args: Il nome del comando e i suoi argomenti
+        :return: La risposta (bytes, int, list, None, oppure Exception per un errore)
+        """
+        name = args[0].upper().decode()
+        self.commands[name] += 1
+        if name == "PING":
+            return b"PONG"
+        if name in ("AUTH", "SELECT"):
+            return b"OK"
+        if name == "GET":
+            return self._get(args[1])
+        if name == "MGET":
+            return [self._get(key) for key in args[1:]]
+        if name == "SET":
+            key, value, options = args[1], args[2], [a.upper() for a in args[3:]]
+            expires_at = None
+            for unit, scale in ((b"PX", 1000), (b"EX", 1)):
+                if unit in options:
+                    expires_at = time.monotonic() + int(options[options.index(unit) + 1]) / scale
+            exists = self._get(key) is not None
+            if (b"NX" in options and exists) or (b"XX" in options and not exists):
+                return None
+            self._data[key] = (value, expires_at)
+            return b"OK"
+        if name == "DEL":
+            return sum(self._data.pop(key, None) is not None for key in args[1:])
+        if name == "EVAL":
+            if args[1].decode() != RELEASE_SCRIPT:
+                return ValueError("ERR only the lock release script is supported")
+            key, token = args[3], args[4]
+            if self._get(key) != token:
+                return 0
+            del self._data[key]
+            return 1
+        if name == "PTTL":
+            if self._get(args[1]) is None:
+                return -2
+            expires_at = self._data[args[1]][1]
+            return -1 if expires_at is None else int((expires_at - time.monotonic()) * 1000)
+        if name in ("FLUSHALL", "FLUSHDB"):
+            self._data.clear()
+            return b"OK"
+        if name == "DBSIZE":
+            return len(self._data)
+        return ValueError(f"ERR unknown command '{name}'")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await _read_command(reader)
+                if args is None:
+                    break
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(encode_reply(self.call(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Comando inline (es. "PING" da telnet)
+        return line.split()
+    args = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+def encode_reply(value: Any) -> bytes:
+    """
+    Funzione per codificare una risposta nel protocollo Redis.
+
+    :param value: La risposta
+    :return: I byte da inviare
+    """
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, Exception):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(encode_reply(item) for item in value)
+    if value in (b"OK", b"PONG"):
+        return b"+%s\r\n" % value
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+async def start_fake_redis(fake: FakeRedis, host: str = "127.0.0.1", port: int = 6390) -> asyncio.AbstractServer:
+    """
+    Funzione per avviare il server finto nell'event loop corrente.
+
+    :param fake: Il server da avviare
+    :param host: L'indirizzo di ascolto
+    :param port: La porta di ascolto
+    :return: Il server da chiudere con close() al termine
+    """
+    return await asyncio.start_server(fake.handle, host, port)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Server locale che imita Redis per la cache remota")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--latency", type=float, default=0, help="latenza di ogni comando in millisecondi")
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        server = await start_fake_redis(FakeRedis(args.latency / 1000), args.host, args.port)
+        print(f"Redis finto su redis://{args.host}:{args.port}/0 (REMOTE_CACHE_URL)")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
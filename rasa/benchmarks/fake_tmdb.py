@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import aiohttp
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+TMDB_URL = "https://api.themoviedb.org/3"
+
+# Endpoint che condividono la stessa fixture
+FIXTURE_ALIASES = {
+    "movie_now_playing": "movie_popular",
+    "discover_movie": "movie_popular",
+    "tv_on_the_air": "tv_popular",
+    "discover_tv": "tv_popular",
+}
+
+_ID_RE = re.compile(r"/\d+")
+
+
+def fixture_name(path: str) -> str:
+    """
+    Funzione per ottenere il nome della fixture di un percorso (es. /movie/550/reviews -> movie_{id}_reviews).
+
+    :param path: Il percorso della richiesta, senza il prefisso /3
+    :return: Il nome del file della fixture, senza estensione
+    """
+    return _ID_RE.sub("/{id}", path).strip("/").replace("/", "_")
+
+
+def query_id(query: str, rank: int) -> int:
+    """
+    Funzione per ottenere un ID stabile per il risultato di una ricerca.
+
+    :param query: Il testo cercato
+    :param rank: La posizione del risultato
+    :return: L'ID del risultato
+    """
+    digest = hashlib.sha1(f"{query.lower()}|{rank}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:3], "big") + 1
+
+
+class FakeTMDB:
+    """
+    Server HTTP che imita TMDB servendo fixture registrate, con latenza,
+    jitter e percentuale di risposte 429 configurabili.
+    """
+
+    def __init__(
+            self,
+            fixtures_dir: str = FIXTURES_DIR,
+            latency: float = 0.05,
+            jitter: float = 0.02,
+            rate_429: float = 0.0,
+            record: bool = False,
+            seed: Optional[int] = None,
+    ) -> None:
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.record = record
+        self.random = random.Random(seed)
+        self.requests: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self._fixtures: Dict[str, Any] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_stats", self.handle_stats)
+        app.router.add_post("/_reset", self.handle_reset)
+        app.router.add_get("/3/{path:.*}", self.handle_tmdb)
+        return app
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "requests": sum(self.requests.values()),
+            "by_endpoint": dict(self.requests),
+            "by_status": {str(k): v for k, v in self.statuses.items()},
+        })
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.requests.clear()
+        self.statuses.clear()
+        return web.json_response({"ok": True})
+
+    async def handle_tmdb(self, request: web.Request) -> web.Response:
+        path = "/" + request.match_info["path"]
+        name = fixture_name(path)
+        self.requests[name] += 1
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self.rate_429 and self.random.random() < self.rate_429:
+            return self._respond(429, {"status_code": 25, "status_message": "Request count over limit."},
+                                 headers={"Retry-After": "1"})
+
+        data = self._load(FIXTURE_ALIASES.get(name, name))
+        if data is None and self.record:
+            data = await self._record(path, dict(request.query), name)
+        if data is None:
+            return self._respond(404, {"status_code": 34, "status_message": "The resource could not be found."})
+        return self._respond(200, self._personalize(path, dict(request.query), data))
+
+    def _respond(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> web.Response:
+        self.statuses[status] += 1
+        return web.json_response(body, status=status, headers=headers)
+
+    def _load(self, name: str) -> Optional[Any]:
+        if name not in self._fixtures:
+            file_path = os.path.join(self.fixtures_dir, f"{name}.json")
+            try:
+                with open(file_path, encoding="utf-8") as f:
+                    self._fixtures[name] = json.load(f)
+            except FileNotFoundError:
+                return None
+        return self._fixtures[name]
+
+    async def _record(self, path: str, query: Dict[str, str], name: str) -> Optional[Any]:
+        # Richiesta inoltrata a TMDB e salvata come nuova fixture
+        query["api_key"] = os.getenv("TMDB_API_KEY", "")
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{TMDB_URL}{path}", params=query) as r:
+                if r.status != 200:
+                    return None
+                data = await r.json()
+        with open(os.path.join(self.fixtures_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        self._fixtures[name] = data
+        return data
+
+    @staticmethod
+    def _personalize(path: str, query: Dict[str, str], data: Any) -> Any:
+        # Risultati e ID diversi per ogni titolo o ID richiesto, così le
+        # chiavi di cache dei client variano come con TMDB
+        if path.startswith("/search/") and "query" in query:
+            title_field = "title" if path == "/search/movie" else "name"
+            results = []
+            for rank, result in enumerate(data.get("results", [])):
+                result = dict(result, id=query_id(query["query"], rank))
+                if rank == 0:
+                    result[title_field] = query["query"]
+                results.append(result)
+            return {**data, "results": results}
+        match = _ID_RE.search(path)
+        if match and isinstance(data, dict) and "id" in data:
+            return {**data, "id": int(match.group(0)[1:])}
+        return data
+
+
+async def start_fake_tmdb(fake: FakeTMDB, host: str = "127.0.0.1", port: int = 8765) -> web.AppRunner:
+    """
+    Funzione per avviare il server finto nell'event loop corrente.
+
+    :param fake: Il server da avviare
+    :param host: L'indirizzo di ascolto
+    :param port: La porta di ascolto
+    :return: Il runner da chiudere con cleanup() al termine
+    """
+    runner = web.AppRunner(fake.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Server locale che imita l'API di TMDB")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=50, help="latenza media in millisecondi")
+    parser.add_argument("--jitter", type=float, default=20, help="variazione massima della latenza in millisecondi")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="frazione di risposte 429 (0-1)")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--record", action="store_true",
+                        help="inoltra a TMDB le richieste senza fixture e le salva (richiede TMDB_API_KEY)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    fake = FakeTMDB(args.fixtures, args.latency / 1000, args.jitter / 1000, args.rate_429, args.record, args.seed)
+    print(f"TMDB finto su http://{args.host}:{args.port}/3 (TMDB_BASE_URL)")
+    web.run_app(fake.app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import gc
+import glob
+import os
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from actions.json_codec import DECODERS
+from actions.records import project_response
+
+from .fake_tmdb import FIXTURES_DIR
+
+# Fixture -> endpoint di esempio, per applicare la stessa proiezione del client
+FIXTURE_ENDPOINTS = {
+    "search_movie": "/search/movie",
+    "search_tv": "/search/tv",
+    "movie_popular": "/movie/popular",
+    "tv_popular": "/tv/popular",
+    "movie_{id}": "/movie/1",
+    "tv_{id}": "/tv/1",
+    "movie_{id}_reviews": "/movie/1/reviews",
+    "tv_{id}_reviews": "/tv/1/reviews",
+    "movie_{id}_watch_providers": "/movie/1/watch/providers",
+}
+
+
+def load_fixtures(directory: str) -> List[Tuple[str, str, bytes]]:
+    """
+    Funzione per leggere le fixture registrate.
+
+    :param directory: La cartella delle fixture
+    :return: La lista di terne (nome, endpoint, corpo della risposta)
+    """
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        name = os.path.basename(path)[:-len(".json")]
+        with open(path, "rb") as f:
+            fixtures.append((name, FIXTURE_ENDPOINTS.get(name, "/" + name), f.read()))
+    return fixtures
+
+
+def time_per_call(fn: Callable[[], object], repeat: int) -> float:
+    """
+    Funzione per misurare il tempo medio di una chiamata, in microsecondi.
+    """
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - started) / repeat * 1e6
+    finally:
+        gc.enable()
+
+
+def allocations(fn: Callable[[], object]) -> Tuple[int, int]:
+    """
+    Funzione per contare i blocchi e i byte allocati e ancora vivi dopo una chiamata.
+
+    :return: La coppia (blocchi, byte)
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    del result
+    return sum(d.count_diff for d in diff), sum(d.size_diff for d in diff)
+
+
+def run(fixtures: List[Tuple[str, str, bytes]], decoders: Dict[str, Callable], repeat: int) -> List[Dict]:
+    rows = []
+    for name, endpoint, body in fixtures:
+        for decoder_name, loads in decoders.items():
+            decode = lambda: loads(body)
+            decode_project = lambda: project_response(endpoint, loads(body))
+            blocks, size = allocations(decode)
+            projected_blocks, projected_size = allocations(decode_project)
+            rows.append({
+                "fixture": name,
+                "bytes": len(body),
+                "decoder": decoder_name,
+                "decode_us": round(time_per_call(decode, repeat), 1),
+                "decode_project_us": round(time_per_call(decode_project, repeat), 1),
+                "blocks": blocks,
+                "kept_bytes": size,
+                "projected_blocks": projected_blocks,
+                "projected_kept_bytes": projected_size,
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark della decodifica JSON delle risposte TMDB")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--repeat", type=int, default=2000, help="decodifiche per misura")
+    parser.add_argument("--decoders", default="", help="decoder da confrontare, separati da virgola (default: tutti)")
+    args = parser.parse_args()
+
+    names = args.decoders.split(",") if args.decoders else list(DECODERS)
+    decoders = {n: DECODERS[n] for n in names if n in DECODERS}
+    rows = run(load_fixtures(args.fixtures), decoders, args.repeat)
+
+    header = (f"{'fixture':<28}{'byte':>7}{'decoder':>9}{'decode µs':>11}{'+proiez. µs':>13}"
+              f"{'blocchi':>9}{'byte vivi':>11}{'blocchi pr.':>13}{'byte vivi pr.':>15}")
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['fixture']:<28}{row['bytes']:>7}{row['decoder']:>9}{row['decode_us']:>11}"
+              f"{row['decode_project_us']:>13}{row['blocks']:>9}{row['kept_bytes']:>11}"
+              f"{row['projected_blocks']:>13}{row['projected_kept_bytes']:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+
+from rasa.core.channels.channel import UserMessage
+from rasa.engine.constants import PLACEHOLDER_MESSAGE, PLACEHOLDER_TRACKER
+from rasa.engine.graph import ExecutionContext, GraphNodeHook
+from rasa.engine.runner.dask import DaskGraphRunner
+from rasa.engine.storage.local_model_storage import LocalModelStorage
+from rasa.model_training import train_nlu
+from rasa.shared.core.trackers import DialogueStateTracker
+from rasa.shared.nlu.training_data.loading import load_data
+from rasa.shared.nlu.training_data.training_data import TrainingData
+
+from .run_benchmark import percentile
+
+RASA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NLU_DATA = os.path.join(RASA_DIR, "data", "nlu.yml")
+DEFAULT_CONFIGS = "config.yml,config_fast.yml"
+
+Utterance = Tuple[str, str, Set[Tuple[str, int, int]]]
+
+
+class NodeTimer(GraphNodeHook):
+    """
+    Hook del grafo di Rasa che misura il tempo di ogni nodo (componente della
+    pipeline) a ogni messaggio analizzato.
+    """
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, List[float]] = {}
+
+    def on_before_node(self, node_name: str, execution_context: ExecutionContext, config: Dict[str, Any],
+                       received_inputs: Dict[str, Any]) -> Dict:
+        return {"started": time.perf_counter()}
+
+    def on_after_node(self, node_name: str, execution_context: ExecutionContext, config: Dict[str, Any],
+                      output: Any, input_hook_data: Dict) -> None:
+        self.timings.setdefault(node_name, []).append(time.perf_counter() - input_hook_data["started"])
+
+
+def rss_mb() -> float:
+    """
+    Funzione per leggere la memoria residente attuale del processo, in MB.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """
+    Funzione per leggere il picco di memoria residente del processo, in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss è in KB su Linux e in byte su macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def utterances(data: TrainingData) -> List[Utterance]:
+    """
+    Funzione per estrarre gli esempi da analizzare con le etichette attese.
+
+    :param data: I dati NLU
+    :return: Le terne (testo, intent, entità come (tipo, inizio, fine))
+    """
+    return [
+        (m.get("text"), m.get("intent"), {(e["entity"], e["start"], e["end"]) for e in m.get("entities") or []})
+        for m in data.intent_examples
+    ]
+
+
+def load_runner(model_path: str, storage_dir: str, timer: NodeTimer) -> Tuple[DaskGraphRunner, str]:
+    """
+    Funzione per caricare il grafo di predizione di un modello addestrato,
+    come Agent.load, ma con il NodeTimer agganciato a ogni nodo.
+
+    :param model_path: L'archivio del modello (.tar.gz)
+    :param storage_dir: La cartella in cui estrarlo
+    :param timer: L'hook che misura i nodi
+    :return: La coppia (runner, nome del nodo con il risultato dell'NLU)
+    """
+    model_storage, metadata = LocalModelStorage.from_model_archive(Path(storage_dir), Path(model_path))
+    runner = DaskGraphRunner.create(
+        graph_schema=metadata.predict_schema,
+        model_storage=model_storage,
+        execution_context=ExecutionContext(graph_schema=metadata.predict_schema, model_id=metadata.model_id),
+        hooks=[timer],
+    )
+    return runner, metadata.nlu_target
+
+
+def parse(runner: DaskGraphRunner, target: str, tracker: DialogueStateTracker, text: str) -> Tuple[str, Set]:
+    """
+    Funzione per analizzare un messaggio con il solo ramo NLU del grafo.
+
+    :return: La coppia (intent, entità come (tipo, inizio, fine))
+    """
+    results = runner.run(inputs={PLACEHOLDER_MESSAGE: [UserMessage(text)], PLACEHOLDER_TRACKER: tracker},
+                         targets=[target])
+    message = results[target][0]
+    intent = (message.get("intent") or {}).get("name")
+    return intent, {(e["entity"], e["start"], e["end"]) for e in message.get("entities") or []}
+
+
+def evaluate(runner: DaskGraphRunner, target: str, tracker: DialogueStateTracker,
+             examples: List[Utterance]) -> Dict[str, float]:
+    """
+    Funzione per misurare accuratezza degli intent e F1 delle entità.
+    """
+    correct = true_positives = predicted = expected = 0
+    for text, intent, entities in examples:
+        predicted_intent, predicted_entities = parse(runner, target, tracker, text)
+        correct += predicted_intent == intent
+        true_positives += len(entities & predicted_entities)
+        predicted += len(predicted_entities)
+        expected += len(entities)
+    precision = true_positives / predicted if predicted else 0.0
+    recall = true_positives / expected if expected else 0.0
+    return {
+        "examples": len(examples),
+        "intent_accuracy": round(correct / len(examples), 4) if examples else 0.0,
+        "entity_f1": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+    }
+
+
+def train_profile(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Funzione per addestrare il modello di un profilo escludendo una parte
+    degli esempi, salvati a parte per misurare l'accuratezza.
+
+    :return: Il modello, il file degli esempi esclusi e il tempo di addestramento
+    """
+    train, test = load_data(args.nlu).train_test_split(train_frac=1 - args.holdout, random_seed=args.seed)
+    work_dir = tempfile.mkdtemp(prefix="nlu-benchmark-")
+    train_file = os.path.join(work_dir, "train.yml")
+    test_file = os.path.join(work_dir, "test.yml")
+    for path, part in ((train_file, train), (test_file, test)):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(part.nlu_as_yaml())
+    started = time.perf_counter()
+    model_path = train_nlu(config=args.profile, nlu_data=train_file, output=work_dir,
+                           fixed_model_name=os.path.splitext(os.path.basename(args.profile))[0])
+    return {"model": model_path, "test": test_file, "train_s": round(time.perf_counter() - started, 1)}
+
+
+def measure_profile(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Funzione per misurare accuratezza, latenza per componente e memoria di un
+    modello addestrato. Va eseguita in un processo dedicato, perché la
+    memoria misurata sia solo quella del modello caricato.
+    """
+    report: Dict[str, Any] = {"config": args.profile}
+    report["model_mb"] = round(os.path.getsize(args.model) / (1024 * 1024), 2)
+    report["rss_before_load_mb"] = round(rss_mb(), 1)
+    timer = NodeTimer()
+    started = time.perf_counter()
+    runner, target = load_runner(args.model, tempfile.mkdtemp(prefix="nlu-benchmark-model-"), timer)
+    report["load_s"] = round(time.perf_counter() - started, 2)
+    report["rss_after_load_mb"] = round(rss_mb(), 1)
+
+    tracker = DialogueStateTracker.from_events("nlu-benchmark", [])
+    report.update(evaluate(runner, target, tracker, utterances(load_data(args.test or args.nlu))))
+
+    # Le prime analisi includono l'inizializzazione dei grafi di TensorFlow e non vengono misurate
+    texts = [text for text, _, _ in utterances(load_data(args.nlu))]
+    for text in texts[:args.warmup]:
+        parse(runner, target, tracker, text)
+    timer.timings.clear()
+    latencies = []
+    for _ in range(args.repeat):
+        for text in texts:
+            started = time.perf_counter()
+            parse(runner, target, tracker, text)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    report.update({
+        "messages": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "messages_per_s": round(len(latencies) / sum(latencies), 1) if latencies else 0.0,
+        "rss_after_parse_mb": round(rss_mb(), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    })
+    # Nodi nell'ordine di esecuzione, con il tempo medio e il 95° percentile per messaggio
+    report["components"] = [
+        {
+            "node": node,
+            "mean_ms": round(sum(times) / len(times) * 1000, 3),
+            "p95_ms": round(percentile(sorted(times), 95) * 1000, 3),
+        }
+        for node, times in timer.timings.items()
+    ]
+    return report
+
+
+def _run_step(step: str, config: str, args: argparse.Namespace, *extra: str) -> Dict[str, Any]:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+        out_path = out.name
+    command = [sys.executable, "-m", "benchmarks.nlu_benchmark", "--step", step, "--profile", config,
+               "--out", out_path, "--nlu", args.nlu, "--holdout", str(args.holdout), "--seed", str(args.seed),
+               "--repeat", str(args.repeat), "--warmup", str(args.warmup), *extra]
+    subprocess.run(command, cwd=RASA_DIR, check=True, env={**os.environ, "TF_CPP_MIN_LOG_LEVEL": "2"})
+    with open(out_path, encoding="utf-8") as f:
+        result = json.load(f)
+    os.unlink(out_path)
+    return result
+
+
+def run_profiles(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    Funzione per addestrare e misurare ogni profilo, ciascuna fase in un processo separato.
+
+    :return: I report dei profili
+    """
+    reports = []
+    for config in args.configs.split(","):
+        if args.model:
+            print(f"Profilo {config}: misura di {args.model}...", flush=True)
+            report = _run_step("measure", config, args, "--model", args.model)
+            # Senza esempi esclusi si valuta sugli stessi esempi dell'addestramento: l'accuratezza è ottimistica
+            report["evaluated_on"] = "training data"
+        else:
+            print(f"Profilo {config}: addestramento...", flush=True)
+            trained = _run_step("train", config, args)
+            print(f"Profilo {config}: misura...", flush=True)
+            report = _run_step("measure", config, args, "--model", trained["model"], "--test", trained["test"])
+            report["train_s"] = trained["train_s"]
+            report["evaluated_on"] = f"holdout {args.holdout:g}"
+        reports.append(report)
+    return reports
+
+
+def print_report(reports: List[Dict[str, Any]]) -> None:
+    header = (f"{'profilo':<20}{'intent acc':>11}{'entità F1':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+              f"{'msg/s':>9}{'RSS MB':>9}{'picco MB':>10}{'modello MB':>12}")
+    print(header)
+    print("-" * len(header))
+    for r in reports:
+        print(f"{r['config']:<20}{r['intent_accuracy']:>11}{r['entity_f1']:>11}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+              f"{r['p99_ms']:>9}{r['messages_per_s']:>9}{r['rss_after_load_mb']:>9}{r['peak_rss_mb']:>10}"
+              f"{r['model_mb']:>12}")
+    print("-" * len(header))
+    print(f"Accuratezza su: {reports[0]['evaluated_on']}; latenza su {reports[0]['messages']} messaggi per profilo")
+    base = reports[0]
+    for r in reports[1:]:
+        speedup = base["p50_ms"] / r["p50_ms"] if r["p50_ms"] else 0.0
+        print(f"{r['config']} rispetto a {base['config']}: p50 {speedup:.1f}x più veloce, "
+              f"accuratezza intent {r['intent_accuracy'] - base['intent_accuracy']:+.4f}, "
+              f"F1 entità {r['entity_f1'] - base['entity_f1']:+.4f}, "
+              f"RSS {r['rss_after_load_mb'] - base['rss_after_load_mb']:+.1f} MB")
+    for r in reports:
+        print(f"\n{r['config']}: tempo per componente")
+        for c in r["components"]:
+            print(f"  {c['node']:<60}{c['mean_ms']:>10} ms{c['p95_ms']:>10} ms p95")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark di latenza, memoria e accuratezza della pipeline NLU")
+    parser.add_argument("--configs", default=DEFAULT_CONFIGS, help="profili da confrontare, separati da virgola")
+    parser.add_argument("--nlu", default=NLU_DATA)
+    parser.add_argument("--holdout", type=float, default=0.2, help="frazione degli esempi esclusa dall'addestramento")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="passate su tutti gli esempi per la latenza")
+    parser.add_argument("--warmup", type=int, default=20, help="analisi iniziali escluse dalle misure")
+    parser.add_argument("--model", default=None,
+                        help="modello già addestrato da misurare (solo con un profilo; accuratezza sugli esempi di training)")
+    parser.add_argument("--json", default=None, help="salva il report anche in questo file JSON")
+    # Opzioni interne dei processi di addestramento e misura
+    parser.add_argument("--step", choices=("train", "measure"), default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--profile", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--test", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--out", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.step:
+        result = train_profile(args) if args.step == "train" else measure_profile(args)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    if args.model and "," in args.configs:
+        parser.error("--model misura un solo modello: indicare un solo profilo con --configs")
+    reports = run_profiles(args)
+    print_report(reports)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .fake_redis import FakeRedis, start_fake_redis
+from .fake_tmdb import FakeTMDB, FIXTURES_DIR, start_fake_tmdb
+
+RASA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MOVIE_TITLES = ["Dune", "Oppenheimer", "Il padrino", "Inception", "Interstellar", "Barbie",
+                "Matrix", "Gladiatore", "Titanic", "Avatar", "Joker", "Parasite"]
+TV_TITLES = ["Breaking Bad", "Stranger Things", "Dark", "Gomorra", "The Crown", "Succession",
+             "Mare fuori", "Chernobyl"]
+MOVIE_GENRES = ["azione", "commedia", "horror", "fantascienza", "dramma", "thriller"]
+TV_GENRES = ["crime", "commedia", "dramma", "fantascienza", "animazione"]
+
+# Azione -> varianti (slot, testo dell'utente) usate a rotazione
+SCENARIOS: Dict[str, List[Tuple[Dict[str, Any], str]]] = {
+    "action_movie_details": [({"titolo_film": t}, f"parlami di {t}") for t in MOVIE_TITLES],
+    "action_where_to_watch": [({"titolo_film": t}, f"dove posso vedere {t}") for t in MOVIE_TITLES],
+    "movie_reviews": [({"titolo_film": t}, f"recensioni di {t}") for t in MOVIE_TITLES],
+    "action_recent_releases": [({}, "film al cinema")],
+    "popular_movies": [({}, "film popolari")],
+    "movies_by_genre": [({"genere": g}, f"film {g}") for g in MOVIE_GENRES],
+    "action_TV_details": [({"titolo_serieTV": t}, f"parlami della serie {t}") for t in TV_TITLES],
+    "TV_reviews": [({"titolo_serieTV": t}, f"recensioni della serie {t}") for t in TV_TITLES],
+    "action_recent_releases_TV": [({}, "serie in onda")],
+    "popular_TV": [({}, "serie popolari")],
+    "TV_by_genre": [({"genere": g}, f"serie {g}") for g in TV_GENRES],
+    "action_provide_film_details": [({"titolo_film_form": t, "anno_form": None, "genere_form": None}, t)
+                                    for t in MOVIE_TITLES],
+    "action_provide_film_image": [({"titolo_film_image_form": t, "anno_image_form": None}, t)
+                                  for t in MOVIE_TITLES],
+}
+
+
+def build_action_call(action: str, slots: Dict[str, Any], text: str, sender_id: str) -> Dict[str, Any]:
+    """
+    Funzione per costruire il corpo della richiesta che Rasa invia al webhook delle azioni.
+
+    :param action: Il nome dell'azione da eseguire
+    :param slots: Gli slot del tracker
+    :param text: Il testo dell'ultimo messaggio dell'utente
+    :param sender_id: L'ID della conversazione
+    :return: Il dizionario da inviare in JSON
+    """
+    return {
+        "next_action": action,
+        "sender_id": sender_id,
+        "version": "3.5.10",
+        "domain": {},
+        "tracker": {
+            "sender_id": sender_id,
+            "slots": slots,
+            "latest_message": {"text": text, "intent": {}, "entities": []},
+            "events": [],
+            "paused": False,
+            "followup_action": None,
+            "active_loop": {},
+            "latest_action_name": "action_listen",
+        },
+    }
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    Funzione per calcolare un percentile con il metodo nearest-rank.
+
+    :param sorted_values: I valori ordinati
+    :param p: Il percentile (0-100)
+    :return: Il valore del percentile, 0 se la lista è vuota
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+async def run_phase(
+        session: aiohttp.ClientSession,
+        action_urls: List[str],
+        action: str,
+        turns: int,
+        concurrency: int,
+) -> Tuple[List[float], int, float]:
+    """
+    Funzione per eseguire più turni di una stessa azione con la concorrenza
+    indicata, distribuendoli a turno tra le repliche dell'action server.
+
+    :return: Le latenze dei turni riusciti in secondi, il numero di errori e la durata totale
+    """
+    variants = SCENARIOS[action]
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(turns):
+        queue.put_nowait(i)
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            i = queue.get_nowait()
+            slots, text = variants[i % len(variants)]
+            body = build_action_call(action, slots, text, f"bench-{action}-{i}")
+            started = time.perf_counter()
+            try:
+                async with session.post(action_urls[i % len(action_urls)], json=body) as r:
+                    await r.read()
+                    ok = r.status == 200
+            except aiohttp.ClientError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(latencies), errors, time.perf_counter() - started
+
+
+async def fake_stats(session: aiohttp.ClientSession, tmdb_url: str, reset: bool = False) -> Dict[str, Any]:
+    if reset:
+        async with session.post(f"{tmdb_url}/_reset") as r:
+            await r.read()
+        return {}
+    async with session.get(f"{tmdb_url}/_stats") as r:
+        return await r.json()
+
+
+async def wait_for_health(session: aiohttp.ClientSession, url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url) as r:
+                if r.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"L'action server non risponde su {url}")
+
+
+def start_action_server(port: int, tmdb_base_url: str, remote_cache_url: Optional[str] = None) -> subprocess.Popen:
+    """
+    Funzione per avviare l'action server puntato verso il TMDB finto.
+
+    :param port: La porta dell'action server
+    :param tmdb_base_url: L'URL base del TMDB finto
+    :param remote_cache_url: L'URL della cache remota condivisa, se usata
+    :return: Il processo avviato
+    """
+    env = {**os.environ, "TMDB_BASE_URL": tmdb_base_url}
+    if remote_cache_url:
+        env["REMOTE_CACHE_URL"] = remote_cache_url
+    env.setdefault("TMDB_API_KEY", "benchmark")
+    return subprocess.Popen(
+        [sys.executable, "-m", "rasa_sdk", "--actions", "actions", "--port", str(port)],
+        cwd=RASA_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    fake = FakeTMDB(args.fixtures, args.latency / 1000, args.jitter / 1000, args.rate_429, seed=args.seed)
+    runner = await start_fake_tmdb(fake, port=args.tmdb_port)
+    tmdb_url = f"http://127.0.0.1:{args.tmdb_port}"
+    redis_server = None
+    remote_cache_url = None
+    if args.remote_cache:
+        redis_server = await start_fake_redis(FakeRedis(), port=args.redis_port)
+        remote_cache_url = f"redis://127.0.0.1:{args.redis_port}/0"
+    processes: List[subprocess.Popen] = []
+    action_urls = [args.action_url] if args.action_url else []
+    if not action_urls:
+        for port in range(args.action_port, args.action_port + args.replicas):
+            processes.append(start_action_server(port, f"{tmdb_url}/3", remote_cache_url))
+            action_urls.append(f"http://127.0.0.1:{port}/webhook")
+
+    actions = args.actions.split(",") if args.actions else list(SCENARIOS)
+    report: Dict[str, Any] = {"turns": 0, "errors": 0, "elapsed": 0.0, "outbound": 0, "actions": {}}
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as session:
+            for action_url in action_urls:
+                await wait_for_health(session, action_url.rsplit("/", 1)[0] + "/health", timeout=60)
+            for action in actions:
+                await fake_stats(session, tmdb_url, reset=True)
+                latencies, errors, elapsed = await run_phase(
+                    session, action_urls, action, args.turns, args.concurrency
+                )
+                outbound = (await fake_stats(session, tmdb_url))["requests"]
+                report["actions"][action] = {
+                    "turns": args.turns,
+                    "errors": errors,
+                    "throughput": round(args.turns / elapsed, 2),
+                    "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                    "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                    "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                    "calls_per_turn": round(outbound / args.turns, 3),
+                }
+                report["turns"] += args.turns
+                report["errors"] += errors
+                report["elapsed"] += elapsed
+                report["outbound"] += outbound
+    finally:
+        await runner.cleanup()
+        if redis_server is not None:
+            redis_server.close()
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    report["throughput"] = round(report["turns"] / report["elapsed"], 2) if report["elapsed"] else 0.0
+    report["calls_per_turn"] = round(report["outbound"] / report["turns"], 3) if report["turns"] else 0.0
+    report["elapsed"] = round(report["elapsed"], 3)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = f"{'azione':<30}{'turni':>7}{'errori':>8}{'turni/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'chiamate/turno':>16}"
+    print(header)
+    print("-" * len(header))
+    for action, row in report["actions"].items():
+        print(f"{action:<30}{row['turns']:>7}{row['errors']:>8}{row['throughput']:>10}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['calls_per_turn']:>16}")
+    print("-" * len(header))
+    print(f"Totale: {report['turns']} turni, {report['errors']} errori, {report['throughput']} turni/s, "
+          f"{report['calls_per_turn']} chiamate a TMDB per turno")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dell'action server con un TMDB locale finto")
+    parser.add_argument("--turns", type=int, default=100, help="turni per azione")
+    parser.add_argument("--concurrency", type=int, default=10, help="richieste contemporanee al webhook")
+    parser.add_argument("--actions", default="", help="azioni da eseguire, separate da virgola (default: tutte)")
+    parser.add_argument("--latency", type=float, default=50, help="latenza media di TMDB in millisecondi")
+    parser.add_argument("--jitter", type=float, default=20, help="variazione massima della latenza in millisecondi")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="frazione di risposte 429 (0-1)")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tmdb-port", type=int, default=8765)
+    parser.add_argument("--action-port", type=int, default=5056)
+    parser.add_argument("--replicas", type=int, default=1, help="action server avviati, ciascuno con la propria cache")
+    parser.add_argument("--remote-cache", action="store_true",
+                        help="collega le repliche a un Redis finto locale come cache condivisa")
+    parser.add_argument("--redis-port", type=int, default=6390)
+    parser.add_argument("--action-url", default=None,
+                        help="webhook di un action server già avviato con TMDB_BASE_URL=http://127.0.0.1:<tmdb-port>/3")
+    parser.add_argument("--json", default=None, help="salva il report anche in questo file JSON")
+    args = parser.parse_args()
+
+    unknown = [a for a in args.actions.split(",") if a and a not in SCENARIOS]
+    if unknown:
+        parser.error(f"azioni senza scenario: {', '.join(unknown)}")
+
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+# I moduli delle azioni si importano come nei benchmark: "actions.<modulo>" dalla cartella rasa
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_redis import FakeRedis, start_fake_redis  # noqa: E402
+from benchmarks.fake_tmdb import FakeTMDB, start_fake_tmdb  # noqa: E402
+
+
+async def _cancel_tasks() -> None:
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.fixture
+def server_loop():
+    """
+    Event loop in un thread separato, per i server finti usati dai client sincroni e asincroni.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    # Le connessioni ancora aperte dei server finti vanno chiuse prima di fermare il loop
+    asyncio.run_coroutine_threadsafe(_cancel_tasks(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture
+def fake_tmdb(server_loop):
+    """
+    TMDB finto su una porta libera, senza latenza.
+
+    :return: La coppia (server, base_url da usare al posto di TMDB_BASE_URL)
+    """
+    fake = FakeTMDB(latency=0, jitter=0, seed=1)
+    runner = asyncio.run_coroutine_threadsafe(start_fake_tmdb(fake, port=0), server_loop).result()
+    port = runner.addresses[0][1]
+    yield fake, f"http://127.0.0.1:{port}/3"
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), server_loop).result()
+
+
+@pytest.fixture
+def fake_redis(server_loop):
+    """
+    Redis finto su una porta libera.
+
+    :return: La coppia (server, URL da usare come REMOTE_CACHE_URL)
+    """
+    fake = FakeRedis()
+    server = asyncio.run_coroutine_threadsafe(start_fake_redis(fake, port=0), server_loop).result()
+    port = server.sockets[0].getsockname()[1]
+    yield fake, f"redis://127.0.0.1:{port}/0"
+    server.close()
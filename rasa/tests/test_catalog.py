@@ -0,0 +1,33 @@
+import asyncio
+
+from actions.catalog import Catalog
+from actions.title_resolver import TitleResolver
+
+DUNE_2021 = {"id": 438631, "title": "Dune", "release_date": "2021-09-15", "popularity": 300}
+DUNE_1984 = {"id": 841, "title": "Dune", "release_date": "1984-12-14", "popularity": 40}
+
+
+def test_local_hits_without_the_requested_year_fall_back_to_search():
+    catalog = Catalog()
+    catalog.replace("movie", [DUNE_2021])
+    assert catalog.search("movie", "Dune")["results"][0]["id"] == 438631
+    assert catalog.search("movie", "Dune", 2021)["results"][0]["id"] == 438631
+    assert catalog.search("movie", "Dune", 1984) is None
+
+
+def test_resolver_finds_a_title_missing_from_the_catalog_by_year():
+    catalog = Catalog()
+    catalog.replace("movie", [DUNE_2021])
+    searched = []
+
+    async def search(title: str, year=None) -> dict:
+        data = catalog.search("movie", title, year)
+        if data is None:
+            searched.append(title)
+            data = {"results": [DUNE_2021, DUNE_1984]}
+        return data
+
+    resolver = TitleResolver(search)
+    assert asyncio.run(resolver.resolve("Dune"))["id"] == 438631
+    assert asyncio.run(resolver.resolve("Dune", 1984))["id"] == 841
+    assert searched == ["Dune"]
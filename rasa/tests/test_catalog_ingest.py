@@ -0,0 +1,37 @@
+import pytest
+
+from actions import catalog_ingest, tmdb_utils
+from actions.rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard
+
+
+@pytest.fixture
+def ingest(fake_tmdb, monkeypatch):
+    fake, base_url = fake_tmdb
+    monkeypatch.setattr(tmdb_utils, "base_url", base_url)
+    guard = UpstreamGuard(TokenBucket(0, 1), CircuitBreaker(5, 60), max_retries=0, base_delay=0, max_delay=0,
+                          retry_budget=0)
+    monkeypatch.setattr(tmdb_utils, "tmdb_guard", guard)
+    monkeypatch.setattr(catalog_ingest, "_ingest_bucket", TokenBucket(0, 1))
+    return fake, base_url, guard
+
+
+def test_details_go_through_the_guard(ingest):
+    fake, _, guard = ingest
+    record = catalog_ingest.fetch_details("movie", 603)
+    assert record["id"] == 603
+    assert fake.requests["movie_{id}"] == 1
+    assert guard.counters["requests"] == 1
+
+
+def test_missing_details_are_skipped(ingest):
+    _, _, guard = ingest
+    assert catalog_ingest.fetch_details("person", 1) is None
+    assert guard.breaker.state == "closed"
+
+
+def test_unavailable_export_keeps_the_lists(ingest, monkeypatch):
+    _, base_url, _ = ingest
+    monkeypatch.setattr(catalog_ingest, "EXPORT_URL", base_url + "/exports/{name}_{day:%m_%d_%Y}.json.gz")
+    assert catalog_ingest.fetch_export_ids("movie", 10) == []
+    monkeypatch.setattr(catalog_ingest, "EXPORT_URL", "http://127.0.0.1:9/{name}_{day:%m_%d_%Y}.json.gz")
+    assert catalog_ingest.fetch_export_ids("movie", 10) == []
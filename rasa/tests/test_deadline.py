@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+from actions import deadline, tmdb_async, tmdb_cache
+from actions.deadline import fits_budget, remaining, request_timeout, turn_budget, with_turn_budget
+from actions.rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard
+from actions.tmdb_cache import ResponseCache
+
+
+def test_without_a_turn_the_default_timeout_applies(monkeypatch):
+    monkeypatch.setattr(deadline, "TMDB_REQUEST_TIMEOUT", 4)
+    assert remaining() is None
+    assert request_timeout() == 4 and fits_budget(100)
+
+
+def test_timeout_shrinks_with_the_budget(monkeypatch):
+    monkeypatch.setattr(deadline, "TMDB_REQUEST_TIMEOUT", 4)
+    with turn_budget(1):
+        assert 0.9 < request_timeout() <= 1
+        assert fits_budget(0.5) and not fits_budget(1)
+    with turn_budget(deadline.MIN_REQUEST_TIME / 2):
+        assert request_timeout() is None
+    assert remaining() is None
+
+
+async def left() -> float:
+    return remaining()
+
+
+def test_decorator_gives_each_turn_its_own_deadline():
+    class Action:
+        @with_turn_budget(0.5)
+        async def run(self, delay: float) -> float:
+            await asyncio.sleep(delay)
+            # Anche i task avviati dall'azione vedono la scadenza del turno
+            return await asyncio.ensure_future(left())
+
+    async def two_turns() -> list:
+        return await asyncio.gather(Action().run(0), Action().run(0.2))
+
+    first, second = asyncio.run(two_turns())
+    assert 0.45 < first <= 0.5 and 0.25 < second <= 0.3
+    assert remaining() is None
+
+
+@pytest.fixture
+def slow_tmdb(fake_tmdb, monkeypatch):
+    fake, base_url = fake_tmdb
+    fake.latency = 0.5
+    monkeypatch.setattr(tmdb_async, "base_url", base_url)
+    memory = ResponseCache(max_entries=100, max_bytes=1 << 24)
+    for module in (tmdb_cache, tmdb_async):
+        monkeypatch.setattr(module, "response_cache", memory)
+    guard = UpstreamGuard(TokenBucket(0, 1), CircuitBreaker(100, 60), max_retries=3, base_delay=0.01,
+                          max_delay=0.01, retry_budget=10)
+    monkeypatch.setattr(tmdb_async, "tmdb_guard", guard)
+    return fake
+
+
+def test_requests_give_up_when_the_turn_budget_runs_out(slow_tmdb):
+    async def turn() -> dict:
+        try:
+            with turn_budget(0.15):
+                return await tmdb_async.make_tmdb_request("/movie/popular")
+        finally:
+            await tmdb_async.close_async_session()
+
+    started = time.monotonic()
+    assert asyncio.run(turn()) == {}
+    # Timeout e retry restano entro il budget del turno
+    assert time.monotonic() - started < 0.4
@@ -0,0 +1,79 @@
+import asyncio
+
+from actions import disambiguation
+from actions.disambiguation import extract_year, rank_candidates, pick_best
+from actions.title_resolver import TitleResolver
+
+DUNE = [
+    {"id": 1, "title": "Dune: Parte due", "release_date": "2024-02-28", "popularity": 900},
+    {"id": 2, "title": "Dune", "release_date": "2021-09-15", "popularity": 300},
+    {"id": 3, "title": "Dune", "release_date": "1984-12-14", "popularity": 40},
+]
+
+
+def test_extract_year():
+    assert extract_year("parlami di Dune del 1984") == 1984
+    assert extract_year("parlami di Dune") is None
+
+
+def test_exact_title_beats_popularity_and_year_breaks_ties():
+    assert [c["id"] for c in rank_candidates("Dune", DUNE)] == [2, 3, 1]
+    assert rank_candidates("Dune", DUNE, 1984)[0]["id"] == 3
+
+
+def test_pick_best_fetches_the_candidates_in_parallel_with_a_bound(monkeypatch):
+    monkeypatch.setattr(disambiguation, "DISAMBIGUATION_CONCURRENCY", 2)
+    in_flight, peak, fetched = [0], [0], []
+
+    async def fetch(record_id: int) -> dict:
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        fetched.append(record_id)
+        return {"id": record_id}
+
+    candidate, details = asyncio.run(pick_best("Dune", DUNE, fetch))
+    assert candidate["id"] == 2 and details == {"id": 2}
+    assert sorted(fetched) == [1, 2, 3] and peak[0] == 2
+
+
+def test_pick_best_falls_back_when_details_are_missing():
+    async def fetch(record_id: int) -> dict:
+        return {} if record_id == 2 else {"id": record_id}
+
+    assert asyncio.run(pick_best("Dune", DUNE, fetch))[0]["id"] == 3
+
+    async def nothing(record_id: int) -> dict:
+        return {}
+
+    assert asyncio.run(pick_best("Dune", DUNE, nothing)) == (None, {})
+
+
+def test_pick_best_skips_candidates_without_usable_details():
+    providers = {3: {"IT": {"flatrate": [{"provider_name": "Netflix"}]}}}
+
+    async def fetch(record_id: int) -> dict:
+        return {"id": record_id, "watch/providers": {"results": providers.get(record_id, {})}}
+
+    def has_providers(details: dict) -> bool:
+        return bool(details["watch/providers"]["results"])
+
+    candidate, details = asyncio.run(pick_best("Dune", DUNE, fetch, usable=has_providers))
+    assert candidate["id"] == 3 and details["id"] == 3
+    assert asyncio.run(pick_best("Dune", DUNE, fetch, usable=lambda d: False)) == (None, {})
+
+
+def test_resolver_agrees_with_pick_best():
+    async def search(title: str, year=None) -> dict:
+        return {"results": DUNE}
+
+    async def fetch(record_id: int) -> dict:
+        return {"id": record_id}
+
+    resolver = TitleResolver(search)
+    for year in (None, 1984):
+        resolved = asyncio.run(resolver.resolve("Dune", year))
+        picked, _ = asyncio.run(pick_best("Dune", asyncio.run(resolver.candidates("Dune", year)), fetch, year))
+        assert resolved["id"] == picked["id"]
+    assert resolver.misses == 2
@@ -0,0 +1,72 @@
+import pytest
+
+from actions.discover import compile_query, discover_params, describe, parse_years
+
+
+@pytest.mark.parametrize("text, genre, genres, any_genre", [
+    ("film horror", "horror", (27,), False),
+    ("film horror e thriller", "horror", (27, 53), False),
+    ("film thriller o horror", "horror", (27, 53), True),
+    ("film d'azione e d'avventura", "azione", (12, 28), False),
+    ("horror, thriller o commedia", "horror", (27, 35, 53), True),
+    ("film di guerra o western", None, (37, 10752), True),
+    ("film sci-fi e horror", "fantascienza", (27, 878), False),
+    # Nomi di genere fuori dalla lista coordinata con il genere dell'NLU
+    ("film horror per la famiglia", "horror", (27,), False),
+    ("film d'azione con la storia di o'neill e thriller", "azione", (28,), False),
+    ("dammi un film", "horror", (27,), False),
+])
+def test_genres_come_from_the_coordinated_list(text, genre, genres, any_genre):
+    query = compile_query("movie", text, genre)
+    assert (query.genres, query.any_genre) == (genres, any_genre)
+
+
+def test_equivalent_requests_share_the_query():
+    assert compile_query("movie", "horror e thriller", "horror") == compile_query("movie", "thriller e horror", "thriller")
+
+
+def test_tv_multiword_genre():
+    query = compile_query("tv", "serie di azione e avventura o crime", "azione e avventura")
+    assert query.genres == (80, 10759) and query.any_genre
+
+
+@pytest.mark.parametrize("text, years", [
+    ("del 2010", (2010, 2010)),
+    ("tra il 1990 e il 2000", (1990, 2000)),
+    ("2005-2001", (2001, 2005)),
+    ("anni 80", (1980, 1989)),
+    ("anni '20", (2020, 2029)),
+    ("dopo il 2015", (2015, None)),
+    ("prima del 1970", (None, 1970)),
+    ("qualcosa di bello", (None, None)),
+])
+def test_parse_years(text, years):
+    assert parse_years(text) == years
+
+
+def test_year_slot_wins_over_the_text():
+    query = compile_query("movie", "horror del 1999", "horror", year_text="2020")
+    assert (query.year_from, query.year_to) == (2020, 2020)
+
+
+def test_providers():
+    assert compile_query("movie", "horror su netflix o prime video", "horror").providers == (8, 119)
+    assert compile_query("movie", "horror su sky", "horror").providers == ()
+    assert compile_query("movie", "horror su now tv o disney+", "horror").providers == (39, 337)
+    # Parole comuni che fanno parte del nome di una piattaforma non bastano
+    assert compile_query("movie", "un horror da vedere now come infinity war, non disney", "horror").providers == ()
+
+
+def test_discover_params_and_description():
+    query = compile_query("movie", "horror o thriller dal 2000 al 2010 su netflix", "horror")
+    assert discover_params(query) == {
+        "with_genres": "27|53",
+        "primary_release_date.gte": "2000-01-01",
+        "primary_release_date.lte": "2010-12-31",
+        "with_watch_providers": "8",
+        "watch_region": "IT",
+        "with_watch_monetization_types": "flatrate",
+    }
+    assert describe(query, "horror") == "horror o thriller, dal 2000 al 2010, su Netflix"
+    single = compile_query("tv", "serie crime del 2019", "crime")
+    assert discover_params(single) == {"with_genres": "80", "first_air_date_year": 2019}
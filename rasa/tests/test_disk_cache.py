@@ -0,0 +1,22 @@
+import time
+
+from actions.disk_cache import DiskCache
+
+
+def test_round_trip_with_stale_window(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"), vacuum_interval=3600)
+    cache.set("/movie/popular", {"results": [{"id": 1}]}, ttl=60, stale_ttl=600)
+    value, ttl, size, stale_ttl = cache.get("/movie/popular")
+    assert value == {"results": [{"id": 1}]}
+    assert 59 < ttl <= 60
+    assert size > 0
+    assert stale_ttl == 600
+
+
+def test_expired_rows_are_not_returned(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"), vacuum_interval=3600)
+    cache.set("/search/movie?query=dune", {"results": []}, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("/search/movie?query=dune") is None
+    assert cache.purge_expired() == 1
+
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from actions import pagination, tmdb_async, tmdb_cache
+from actions.rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard
+from actions.tmdb_cache import ResponseCache
+
+
+@pytest.fixture
+def client(fake_tmdb, monkeypatch):
+    fake, base_url = fake_tmdb
+    monkeypatch.setattr(tmdb_async, "base_url", base_url)
+    memory = ResponseCache(max_entries=100, max_bytes=1 << 24)
+    for module in (tmdb_cache, tmdb_async):
+        monkeypatch.setattr(module, "response_cache", memory)
+    guard = UpstreamGuard(TokenBucket(0, 1), CircuitBreaker(100, 60), max_retries=0, base_delay=0, max_delay=0,
+                          retry_budget=0)
+    monkeypatch.setattr(tmdb_async, "tmdb_guard", guard)
+    return fake, memory
+
+
+def run(coro):
+    async def closing():
+        try:
+            return await coro
+        finally:
+            await tmdb_async.close_async_session()
+
+    return asyncio.run(closing())
+
+
+def test_one_request_serves_details_providers_and_reviews(client):
+    fake, _ = client
+
+    async def film_turns() -> tuple:
+        details = await tmdb_async.get_movie_full(603)
+        # Dove guardarlo e la prima pagina di recensioni arrivano dallo stesso record in cache
+        again = await tmdb_async.get_movie_full(603)
+        reviews = await pagination.PAGERS["movie_reviews"](603, 1)
+        return details, again, reviews
+
+    details, again, reviews = run(film_turns())
+    assert details["title"] and details["watch/providers"]["results"]["IT"]
+    assert again is details and reviews is details["reviews"]
+    assert sum(fake.requests.values()) == 1 and fake.requests["movie_{id}"] == 1
+
+
+def test_full_record_expires_with_its_shortest_part(client):
+    _, memory = client
+    run(tmdb_async.get_movie_full(603))
+    key = tmdb_cache.make_cache_key("/movie/603", tmdb_async.build_tmdb_params(
+        {"append_to_response": tmdb_async.FULL_RECORD_APPEND}))
+    # I dettagli durerebbero 12 ore, le recensioni incluse ne durano 3
+    assert 3 * 3600 - 5 < memory.expires_in(key) <= 3 * 3600
@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from actions.http_session import close_session, get_pool_stats, get_session, session_get
+
+
+@pytest.fixture
+def pool(fake_tmdb):
+    close_session()
+    _, base_url = fake_tmdb
+    yield base_url
+    close_session()
+
+
+def test_sequential_requests_reuse_one_connection(pool):
+    for _ in range(5):
+        with session_get(f"{pool}/movie/popular") as r:
+            assert r.status_code == 200
+    host = next(iter(get_pool_stats()["hosts"].values()))
+    assert host == {"requests": 5, "connections_opened": 1, "idle_connections": 1}
+    assert get_pool_stats()["reuse_ratio"] == 0.8
+
+
+def test_threads_share_the_session_and_the_pool(pool):
+    sessions = set()
+
+    def fetch(_) -> int:
+        sessions.add(id(get_session()))
+        with session_get(f"{pool}/tv/popular") as r:
+            return r.status_code
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert set(executor.map(fetch, range(20))) == {200}
+    assert len(sessions) == 1
+    # Al massimo una connessione per thread, riusata per le richieste successive
+    assert get_pool_stats()["connections_opened"] <= 4
+
+
+def test_close_session_drops_the_pool(pool):
+    first = get_session()
+    with session_get(f"{pool}/movie/popular"):
+        pass
+    close_session()
+    assert get_pool_stats()["hosts"] == {}
+    assert get_session() is not first
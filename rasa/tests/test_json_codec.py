@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import pytest
+
+from actions import json_codec, tmdb_async, tmdb_cache, tmdb_utils
+from actions.disk_cache import decode_payload, encode_payload
+from actions.rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard
+from actions.records import project_response, to_jsonable
+from actions.tmdb_cache import ResponseCache
+from benchmarks import json_decode
+from benchmarks.fake_tmdb import FIXTURES_DIR
+
+FIXTURES = json_decode.load_fixtures(FIXTURES_DIR)
+
+
+def projected(endpoint, value):
+    return json.dumps(project_response(endpoint, value), default=to_jsonable, sort_keys=True)
+
+
+@pytest.mark.parametrize("name, endpoint, body", FIXTURES, ids=[f[0] for f in FIXTURES])
+def test_every_decoder_projects_the_same_record(name, endpoint, body):
+    expected = projected(endpoint, json_codec.DECODERS["json"](body))
+    for loads in json_codec.DECODERS.values():
+        assert projected(endpoint, loads(body)) == expected
+        assert projected(endpoint, loads(body.decode("utf-8"))) == expected
+
+
+def test_unknown_decoders_fall_back_to_the_fastest():
+    fastest = next(iter(json_codec.DECODERS.values()))
+    assert json_codec.get_decoder("auto") is fastest
+    assert json_codec.get_decoder("simdjson") is fastest
+    assert json_codec.get_decoder("json") is json_codec.DECODERS["json"]
+
+
+def test_disk_payloads_keep_non_ascii_text():
+    value = {"title": "La vita è bella", "overview": "Città “di” Roma", "ids": [1, 2]}
+    decoded, size = decode_payload(encode_payload(value))
+    assert decoded == value
+    assert size == len('{"title":"La vita è bella","overview":"Città “di” Roma","ids":[1,2]}'.encode("utf-8"))
+
+
+def test_both_clients_decode_with_the_configured_decoder(fake_tmdb, monkeypatch):
+    _, base_url = fake_tmdb
+    decoded = []
+
+    def loads(body):
+        decoded.append(type(body))
+        return json_codec.DECODERS["json"](body)
+
+    monkeypatch.setattr(json_codec, "loads", loads)
+    for module in (tmdb_utils, tmdb_async):
+        monkeypatch.setattr(module, "base_url", base_url)
+        monkeypatch.setattr(module, "tmdb_guard", UpstreamGuard(
+            TokenBucket(0, 1), CircuitBreaker(100, 60), max_retries=0, base_delay=0, max_delay=0, retry_budget=0))
+    for module in (tmdb_cache, tmdb_utils, tmdb_async):
+        monkeypatch.setattr(module, "response_cache", ResponseCache(max_entries=100, max_bytes=1 << 24))
+
+    assert tmdb_utils.make_tmdb_request("/movie/603")["id"] == 603
+
+    async def fetch():
+        try:
+            return await tmdb_async.make_tmdb_request("/tv/1396")
+        finally:
+            await tmdb_async.close_async_session()
+
+    assert asyncio.run(fetch())["id"] == 1396
+    assert decoded == [bytes, bytes]
+
+
+def test_benchmark_reports_every_fixture_and_decoder():
+    rows = json_decode.run(FIXTURES[:2], {"json": json_codec.DECODERS["json"]}, repeat=1)
+    assert [row["fixture"] for row in rows] == [name for name, _, _ in FIXTURES[:2]]
+    assert all(row["bytes"] > 0 and row["decode_us"] >= 0 for row in rows)
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from actions import metrics, tmdb_cache, tmdb_utils
+from actions.metrics import MetricsRegistry, endpoint_label, gauge_lines, instrumented
+from actions.rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard
+from actions.tmdb_cache import ResponseCache
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    return registry
+
+
+def test_histograms_are_cumulative():
+    registry = MetricsRegistry()
+    registry.describe("latency", "Durata")
+    for value in (0.004, 0.02, 0.02, 20):
+        registry.observe("latency", value, (("action", "a"),), buckets=(0.01, 0.1))
+    assert registry.render().splitlines() == [
+        "# HELP latency Durata",
+        "# TYPE latency histogram",
+        'latency_bucket{action="a",le="0.01"} 1',
+        'latency_bucket{action="a",le="0.1"} 3',
+        'latency_bucket{action="a",le="+Inf"} 4',
+        'latency_sum{action="a"} 20.044',
+        'latency_count{action="a"} 4',
+    ]
+
+
+def test_labels_are_escaped_and_failing_collectors_are_skipped():
+    registry = MetricsRegistry()
+    registry.inc("errors_total", (("message", 'a "b"\n'),))
+    registry.add_collector(lambda: 1 / 0)
+    registry.add_collector(lambda: gauge_lines("pool", {"open": 2, "host": "tmdb", "ok": True}))
+    assert registry.render().splitlines() == [
+        "# TYPE errors_total counter",
+        'errors_total{message="a \\"b\\"\\n"} 1',
+        "# TYPE pool gauge",
+        'pool{stat="open"} 2',
+    ]
+
+
+def test_ids_are_folded_into_the_endpoint_label():
+    assert endpoint_label("/movie/603/watch/providers") == "/movie/{id}/watch/providers"
+
+
+def test_instrumented_actions_record_duration_and_errors(registry):
+    class Action:
+        def name(self) -> str:
+            return "action_test"
+
+        @instrumented
+        async def run(self, fail: bool) -> str:
+            if fail:
+                raise RuntimeError("errore")
+            return "ok"
+
+    assert asyncio.run(Action().run(False)) == "ok"
+    with pytest.raises(RuntimeError):
+        asyncio.run(Action().run(True))
+    text = registry.render()
+    assert 'tmdb_action_duration_seconds_count{action="action_test"} 2' in text
+    assert 'tmdb_action_errors_total{action="action_test"} 1' in text
+
+
+def test_tmdb_calls_are_counted_per_endpoint(registry, fake_tmdb, monkeypatch):
+    _, base_url = fake_tmdb
+    monkeypatch.setattr(tmdb_utils, "base_url", base_url)
+    memory = ResponseCache(max_entries=100, max_bytes=1 << 24)
+    for module in (tmdb_cache, tmdb_utils):
+        monkeypatch.setattr(module, "response_cache", memory)
+    monkeypatch.setattr(tmdb_utils, "tmdb_guard", UpstreamGuard(
+        TokenBucket(0, 1), CircuitBreaker(100, 60), max_retries=0, base_delay=0, max_delay=0, retry_budget=0))
+    tmdb_utils.make_tmdb_request("/movie/603")
+    tmdb_utils.make_tmdb_request("/movie/603")
+    tmdb_utils.make_tmdb_request("/person/1")
+    text = registry.render()
+    assert 'tmdb_cache_lookups_total{endpoint="/movie/{id}",result="hit"} 1' in text
+    assert 'tmdb_cache_lookups_total{endpoint="/movie/{id}",result="miss"} 1' in text
+    assert 'tmdb_upstream_responses_total{endpoint="/movie/{id}",status="200"} 1' in text
+    assert 'tmdb_upstream_responses_total{endpoint="/person/{id}",status="404"} 1' in text
+    assert 'tmdb_response_bytes_count{endpoint="/movie/{id}"} 1' in text
+
+
+def test_disabled_metrics_leave_actions_untouched(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+
+    async def run(self):
+        return None
+
+    assert instrumented(run) is run
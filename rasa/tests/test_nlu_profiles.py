@@ -0,0 +1,51 @@
+import os
+
+import pytest
+import yaml
+
+RASA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load(name):
+    with open(os.path.join(RASA_DIR, name), encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def names(config):
+    return [component["name"] for component in config["pipeline"]]
+
+
+def test_fast_profile_only_swaps_the_nlu_pipeline():
+    full, fast = load("config.yml"), load("config_fast.yml")
+    for key in ("version", "recipe", "language", "policies", "assistant_id"):
+        assert fast[key] == full[key]
+    assert fast["pipeline"][-1] == full["pipeline"][-1]
+    assert not [name for name in names(fast) if name.startswith("Spacy")]
+
+
+def test_fast_profile_tokenizes_before_featurizing():
+    pipeline = names(load("config_fast.yml"))
+    featurizers = [i for i, name in enumerate(pipeline) if name.endswith("Featurizer")]
+    assert pipeline[0] == "WhitespaceTokenizer"
+    assert max(featurizers) < pipeline.index("DIETClassifier") < pipeline.index("EntitySynonymMapper")
+
+
+def test_no_retrieval_intents_need_the_response_selector():
+    intents = [item["intent"] for item in load("data/nlu.yml")["nlu"] if "intent" in item]
+    assert intents and not [intent for intent in intents if "/" in intent]
+
+
+def test_evaluate_scores_intents_and_entities(monkeypatch):
+    nlu_benchmark = pytest.importorskip("benchmarks.nlu_benchmark", exc_type=ImportError)
+    predictions = {
+        "film horror": ("cerca_film_genere", {("genere", 5, 11)}),
+        "ciao": ("goodbye", set()),
+    }
+    monkeypatch.setattr(nlu_benchmark, "parse", lambda runner, target, tracker, text: predictions[text])
+    examples = [
+        ("film horror", "cerca_film_genere", {("genere", 5, 11), ("tipo", 0, 4)}),
+        ("ciao", "greet", set()),
+    ]
+    assert nlu_benchmark.evaluate(None, "nlu", None, examples) == {
+        "examples": 2, "intent_accuracy": 0.5, "entity_f1": 0.6667,
+    }
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from actions import pagination
+from actions.constants import RESULTS_PAGE_SIZE
+
+PAGE_LENGTH = RESULTS_PAGE_SIZE * 2 + 1
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """
+    Lista finta di due pagine; registra le pagine richieste, prefetch compresi.
+    """
+    requested = []
+
+    async def pager(arg, page):
+        requested.append(page)
+        start = (page - 1) * PAGE_LENGTH
+        return {"results": [{"id": start + i} for i in range(PAGE_LENGTH)], "total_pages": 2}
+
+    monkeypatch.setitem(pagination.PAGERS, "popular_movies", pager)
+    return requested
+
+
+def browse(cursor):
+    async def run():
+        shown, current = [], cursor
+        while current is not None:
+            items, current, position = await pagination.next_results(current)
+            assert position == RESULTS_PAGE_SIZE + len(shown)
+            shown.extend(item["id"] for item in items)
+        await asyncio.gather(*pagination._prefetches)
+        return shown
+
+    return asyncio.run(run())
+
+
+def test_browsing_continues_across_pages_without_gaps(pages):
+    first = {"results": [{"id": i} for i in range(PAGE_LENGTH)], "total_pages": 2}
+    cursor = pagination.new_cursor("popular_movies", first, RESULTS_PAGE_SIZE)
+    assert cursor["offset"] == RESULTS_PAGE_SIZE and cursor["seen"] == RESULTS_PAGE_SIZE
+
+    assert browse(cursor) == list(range(RESULTS_PAGE_SIZE, 2 * PAGE_LENGTH))
+    # La seconda pagina viene scaricata in anticipo quando la prima sta per esaurirsi
+    assert pages.index(2) < len(pages) - 1
+
+
+def test_no_cursor_when_everything_was_shown():
+    data = {"results": [{"id": 1}], "total_pages": 1}
+    assert pagination.new_cursor("popular_movies", data, 1) is None
+
+
+def test_discover_cursor_keeps_the_params(monkeypatch):
+    params = {"with_genres": "27|53", "primary_release_year": 2010}
+    calls = []
+
+    async def discover(query, page):
+        calls.append((query, page))
+        return {"results": [{"id": i} for i in range(PAGE_LENGTH)], "total_pages": 1}
+
+    monkeypatch.setattr(pagination, "discover_movies", discover)
+    first = {"results": [{"id": i} for i in range(PAGE_LENGTH)], "total_pages": 1}
+    cursor = pagination.new_cursor("movies_by_genre", first, RESULTS_PAGE_SIZE, params)
+    assert cursor["arg"] == params
+    asyncio.run(pagination.next_results(cursor))
+    assert calls == [(params, 1)]
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+from aiohttp import web
+
+from actions import posters, tmdb_async
+from actions.deadline import turn_budget
+from actions.posters import PosterCache
+
+POSTER = "/dune.jpg"
+
+
+class FakeEndpoints:
+    """
+    CDN delle immagini di TMDB e Bot API di Telegram finti.
+    """
+
+    def __init__(self) -> None:
+        self.downloads = 0
+        self.uploads = 0
+        self.by_file_id = 0
+        self.photo_reply = {"ok": True, "result": {"photo": [{"file_id": "small"}, {"file_id": "large"}]}}
+        self.file_id_status = 200
+
+    async def image(self, request: web.Request) -> web.Response:
+        self.downloads += 1
+        await asyncio.sleep(0.02)
+        return web.Response(body=b"\xff\xd8jpeg", content_type="image/jpeg")
+
+    async def send_photo(self, request: web.Request) -> web.Response:
+        if request.content_type == "application/json":
+            self.by_file_id += 1
+            return web.json_response({"ok": self.file_id_status == 200}, status=self.file_id_status)
+        self.uploads += 1
+        return web.json_response(self.photo_reply)
+
+
+@pytest.fixture
+def endpoints(server_loop, tmp_path, monkeypatch):
+    fake = FakeEndpoints()
+    app = web.Application()
+    app.router.add_get("/t/p/{size}/{file}", fake.image)
+    app.router.add_post("/bottoken/sendPhoto", fake.send_photo)
+
+    async def start() -> web.AppRunner:
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        return runner
+
+    runner = asyncio.run_coroutine_threadsafe(start(), server_loop).result()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    monkeypatch.setattr(posters, "TMDB_IMAGE_BASE_URL", url + "/t/p")
+    monkeypatch.setattr(posters, "TELEGRAM_API_URL", url)
+    monkeypatch.setattr(posters, "TELEGRAM_ACCESS_TOKEN", "token")
+    monkeypatch.setattr(posters, "poster_cache", PosterCache(str(tmp_path)))
+    yield fake
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), server_loop).result()
+
+
+def run(coro):
+    async def closing():
+        try:
+            return await coro
+        finally:
+            await tmdb_async.close_async_session()
+
+    return asyncio.run(closing())
+
+
+def test_concurrent_requests_download_a_poster_once(endpoints):
+    async def fetch_all() -> list:
+        return await asyncio.gather(*(posters.poster_cache.get(POSTER, "w342") for _ in range(5)))
+
+    paths = run(fetch_all())
+    assert len(set(paths)) == 1 and paths[0].endswith("w342/dune.jpg")
+    assert run(posters.poster_cache.get(POSTER, "w342")) == paths[0]
+    assert endpoints.downloads == 1
+
+
+def test_download_is_skipped_without_turn_budget(endpoints):
+    async def late() -> str:
+        with turn_budget(0):
+            return await posters.poster_cache.get(POSTER, "w342")
+
+    assert run(late()) is None
+    assert endpoints.downloads == 0
+
+
+def test_file_id_is_reused_after_the_first_upload(endpoints):
+    assert run(posters.send_telegram_poster("42", POSTER))
+    assert run(posters.poster_cache.get_file_id(POSTER, "w342")) == "large"
+    assert run(posters.send_telegram_poster("42", POSTER))
+    assert (endpoints.uploads, endpoints.by_file_id) == (1, 1)
+
+
+def test_reply_without_photos_is_sent_but_not_remembered(endpoints):
+    endpoints.photo_reply = {"ok": True, "result": {"photo": [{"width": 342}]}}
+    assert run(posters.send_telegram_poster("42", POSTER))
+    assert run(posters.poster_cache.get_file_id(POSTER, "w342")) is None
+    assert run(posters.send_telegram_poster("42", POSTER))
+    assert endpoints.uploads == 2
+
+
+def test_rejected_file_id_is_replaced_by_a_new_upload(endpoints):
+    run(posters.poster_cache.set_file_id(POSTER, "w342", "other-bot"))
+    endpoints.file_id_status = 400
+    assert run(posters.send_telegram_poster("42", POSTER))
+    assert (endpoints.by_file_id, endpoints.uploads) == (1, 1)
+    assert run(posters.poster_cache.get_file_id(POSTER, "w342")) == "large"
+
+
+def test_public_url_is_used_only_for_posters_on_disk(endpoints, monkeypatch):
+    monkeypatch.setattr(posters, "POSTER_PUBLIC_URL", "https://bot.example/posters")
+    assert run(posters.poster_url(POSTER, "w342")) == "https://bot.example/posters/w342/dune.jpg"
+    assert run(posters.poster_url("/../etc/passwd", "w342")) == posters.TMDB_IMAGE_BASE_URL + "/w342/../etc/passwd"
+
+
+def test_local_endpoint_serves_only_cached_posters(endpoints):
+    run(posters.poster_cache.get(POSTER, "w342"))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), posters._PosterHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{url}/w342/dune.jpg") as r:
+            assert r.read() == b"\xff\xd8jpeg"
+            assert r.headers["Content-Type"] == "image/jpeg"
+            assert "immutable" in r.headers["Cache-Control"]
+        for path in ("/w500/dune.jpg", "/w342/missing.jpg", "/w342/..%2Ffile_ids.sqlite", "/w342/"):
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(url + path)
+            assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,81 @@
+import time
+
+from actions.rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard, parse_retry_after
+
+
+def open_breaker(reset_timeout: float = 0.01) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_token_bucket_allows_the_burst_then_spaces_requests():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.09 < bucket.reserve() <= 0.1
+
+
+def test_token_bucket_without_rate_never_waits():
+    bucket = TokenBucket(rate=0, burst=1)
+    assert all(bucket.reserve() == 0 for _ in range(5))
+
+
+def test_breaker_opens_after_the_threshold():
+    breaker = open_breaker(reset_timeout=60)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.trips == 1
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = open_breaker()
+    time.sleep(0.02)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = open_breaker()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+
+
+def test_abandoned_trial_frees_the_slot():
+    guard = UpstreamGuard(TokenBucket(0, 1), open_breaker(), max_retries=0, base_delay=0, max_delay=0,
+                          retry_budget=0)
+    time.sleep(0.02)
+    assert guard.admit() == 0
+    assert guard.admit() is None
+    # Tentativo abbandonato senza esito (budget del turno esaurito): la prova successiva deve partire
+    guard.on_abandon()
+    assert guard.admit() == 0
+
+
+def test_client_errors_do_not_count_as_failures():
+    guard = UpstreamGuard(TokenBucket(0, 1), CircuitBreaker(1, 60), max_retries=3, base_delay=0.1, max_delay=1,
+                          retry_budget=5)
+    assert guard.on_failure(404, None, 0, 0) is None
+    assert guard.breaker.state == "closed"
+
+
+def test_retries_honour_retry_after_and_the_budget():
+    guard = UpstreamGuard(TokenBucket(0, 1), CircuitBreaker(100, 60), max_retries=3, base_delay=0.1, max_delay=1,
+                          retry_budget=5)
+    assert guard.on_failure(429, "2", 0, 0) == 2
+    assert guard.on_failure(503, "2", 1, 4) is None
+    assert guard.on_failure(503, None, 3, 0) is None
+    assert guard.counters["gave_up"] == 2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after("") is None
+    assert parse_retry_after("soon") is None
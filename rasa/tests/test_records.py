@@ -0,0 +1,59 @@
+import json
+import os
+
+from actions.constants import FULL_RECORD_APPEND
+from actions.records import (
+    MovieDetails,
+    MoviePage,
+    OVERVIEW_MAX_CHARS,
+    payload_size,
+    project_response,
+    to_jsonable,
+    truncate,
+)
+from benchmarks.fake_tmdb import FIXTURES_DIR
+
+
+def fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_details_keep_only_the_used_fields():
+    record = project_response("/movie/603", fixture("movie_{id}"))
+    assert isinstance(record, MovieDetails)
+    assert record["title"] and record.get("credits") is None and record.get("images") is None
+    assert set(record["watch/providers"]["results"]) <= {"IT"}
+    assert payload_size(record) < len(json.dumps(fixture("movie_{id}")))
+
+
+def test_every_appended_resource_is_projected():
+    # Le sotto-risorse richieste con append_to_response devono arrivare nel record
+    for part in FULL_RECORD_APPEND.split(","):
+        assert part in MovieDetails.FIELDS or part.replace("/", "_") in MovieDetails.FIELDS
+
+
+def test_pages_behave_like_dicts():
+    page = project_response("/movie/popular", fixture("movie_popular"))
+    assert isinstance(page, MoviePage)
+    first = page["results"][0]
+    assert first.get("title") == first["title"] and "id" in first
+    assert first.get("vote_count", "assente") == "assente"
+
+
+def test_projection_round_trips_through_json():
+    record = project_response("/movie/603", fixture("movie_{id}"))
+    again = project_response("/movie/603", json.loads(json.dumps(record, default=to_jsonable)))
+    assert again.to_dict().keys() == record.to_dict().keys()
+    assert again["overview"] == record["overview"]
+
+
+def test_unknown_endpoints_and_errors_are_unchanged():
+    assert project_response("/configuration", {"images": {}}) == {"images": {}}
+    assert project_response("/movie/603", {}) == {}
+
+
+def test_truncate_is_idempotent():
+    text = "x" * (OVERVIEW_MAX_CHARS + 50)
+    once = truncate(text, OVERVIEW_MAX_CHARS)
+    assert once.endswith("...") and truncate(once, OVERVIEW_MAX_CHARS) == once
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+from actions import tmdb_async, tmdb_cache, tmdb_utils
+from actions.rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard
+from actions.refresher import BackgroundRefresher
+from actions.tmdb_cache import ResponseCache
+
+@pytest.fixture
+def swr(fake_tmdb, monkeypatch):
+    """
+    Client verso il TMDB finto con cache, limiti e refresher nuovi; il refresher
+    si sveglia solo quando una voce scaduta viene servita come stale.
+    """
+    fake, base_url = fake_tmdb
+    monkeypatch.setattr(tmdb_utils, "base_url", base_url)
+    monkeypatch.setattr(tmdb_async, "base_url", base_url)
+    memory = ResponseCache(max_entries=100, max_bytes=1 << 24)
+    for module in (tmdb_cache, tmdb_utils, tmdb_async):
+        monkeypatch.setattr(module, "response_cache", memory)
+    guard = UpstreamGuard(TokenBucket(0, 1), CircuitBreaker(100, 60), max_retries=0, base_delay=0, max_delay=0,
+                          retry_budget=0)
+    monkeypatch.setattr(tmdb_utils, "tmdb_guard", guard)
+    monkeypatch.setattr(tmdb_async, "tmdb_guard", guard)
+    refresher = BackgroundRefresher(tmdb_utils._refresh_entry, memory, refresh_ahead=60, interval=3600,
+                                    idle_ttl=3600)
+    monkeypatch.setattr(tmdb_utils, "list_refresher", refresher)
+    monkeypatch.setattr(tmdb_async, "list_refresher", refresher)
+    return fake, memory, refresher
+
+
+def expire(memory: ResponseCache, key: str, expires_in: float = -1) -> None:
+    value, _, size, stale_until = memory._entries[key]
+    memory._entries[key] = (value, time.monotonic() + expires_in, size, max(stale_until, time.monotonic() + 600))
+
+
+def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def key_of(endpoint: str) -> str:
+    return tmdb_cache.make_cache_key(endpoint, tmdb_utils.build_tmdb_params())
+
+
+def test_stale_copy_is_served_while_upstream_fails(swr):
+    fake, memory, refresher = swr
+    fresh = tmdb_utils.make_tmdb_request("/movie/popular")
+    assert fresh["results"]
+    key = key_of("/movie/popular")
+    expire(memory, key)
+    fake.rate_429 = 1.0
+
+    assert tmdb_utils.make_tmdb_request("/movie/popular") is fresh
+    # L'aggiornamento è stato pianificato ed è fallito, la copia stale resta servibile
+    wait_for(lambda: refresher.failed == 1)
+    assert fake.statuses[429] == 1
+    assert memory.get_stale(key) is fresh
+
+    fake.rate_429 = 0.0
+
+    async def served() -> dict:
+        try:
+            return await tmdb_async.make_tmdb_request("/movie/popular")
+        finally:
+            await tmdb_async.close_async_session()
+
+    assert asyncio.run(served()) is fresh
+    wait_for(lambda: refresher.refreshed == 1)
+    assert memory.expires_in(key) > 0
+
+
+def test_entries_close_to_expiry_are_refreshed_ahead(swr):
+    fake, memory, refresher = swr
+    tmdb_utils.make_tmdb_request("/movie/popular")
+    tmdb_utils.make_tmdb_request("/tv/popular")
+    expire(memory, key_of("/movie/popular"), expires_in=30)
+
+    refresher.run_once()
+    # Solo la voce entro refresh_ahead (60 s) dalla scadenza viene scaricata di nuovo
+    assert (fake.requests["movie_popular"], fake.requests["tv_popular"]) == (2, 1)
+    assert memory.expires_in(key_of("/movie/popular")) > 60
+    assert refresher.stats() == {"registered": 2, "refreshed": 1, "failed": 0}
+
+
+def test_idle_entries_stop_being_refreshed(swr):
+    _, memory, refresher = swr
+    tmdb_utils.make_tmdb_request("/movie/popular")
+    refresher.idle_ttl = 0
+    refresher.run_once()
+    assert refresher.stats()["registered"] == 0
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+from actions import tmdb_async, tmdb_cache, tmdb_utils
+from actions.rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard
+from actions.remote_cache import RemoteCache, encode_command
+from actions.tmdb_cache import ResponseCache
+
+
+def make_cache(url: str, timeout: float = 1.0) -> RemoteCache:
+    return RemoteCache(url, "test:", timeout=timeout, pool_size=2, retry_after=60)
+
+
+def fetch(endpoint: str) -> dict:
+    """
+    Esegue una richiesta asincrona in un event loop nuovo, chiudendo la sessione aiohttp prima che il loop termini.
+    """
+    async def run() -> dict:
+        try:
+            return await tmdb_async.make_tmdb_request(endpoint)
+        finally:
+            await tmdb_async.close_async_session()
+
+    return asyncio.run(run())
+
+
+def test_encode_command():
+    assert encode_command("SET", "k", b"v", "PX", 100) == b"*5\r\n$3\r\nSET\r\n$1\r\nk\r\n$1\r\nv\r\n$2\r\nPX\r\n$3\r\n100\r\n"
+
+
+def test_set_and_get_many(fake_redis):
+    _, url = fake_redis
+    cache = make_cache(url)
+    cache.set("a", b"1", ttl=60)
+    assert cache.get_many(["a", "b"]) == [b"1", None]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert cache.round_trips == 2
+
+
+def test_claim_is_exclusive_and_returns_the_value(fake_redis):
+    _, url = fake_redis
+    first, second = make_cache(url), make_cache(url)
+    assert first.claim("a", ttl=5) == (True, None)
+    assert second.claim("a", ttl=5) == (False, None)
+    first.set("a", b"1", ttl=60)
+    first.release("a")
+    assert second.claim("a", ttl=5) == (True, b"1")
+
+
+def test_release_keeps_a_lock_taken_by_another_replica(fake_redis):
+    fake, url = fake_redis
+    slow, other = make_cache(url), make_cache(url)
+    assert slow.claim("a", ttl=0.02)[0]
+    time.sleep(0.05)
+    # Il lock di slow è scaduto ed è passato a other: il rilascio di slow non deve toccarlo
+    assert other.claim("a", ttl=5)[0]
+    slow.release("a")
+    assert make_cache(url).claim("a", ttl=5)[0] is False
+    assert fake.commands["EVAL"] == 1
+
+
+def test_unreachable_server_is_skipped():
+    cache = make_cache("redis://127.0.0.1:9/0", timeout=0.1)
+    assert cache.get_many(["a"]) == [None]
+    assert cache.claim("a", ttl=5) == (True, None)
+    assert cache.errors == 1 and cache.stats()["available"] == 0
+
+
+@pytest.fixture
+def tiers(fake_tmdb, fake_redis, monkeypatch):
+    """
+    Client asincrono con cache in memoria vuota e cache remota sul Redis finto.
+    """
+    fake, base_url = fake_tmdb
+    redis, url = fake_redis
+    remote = make_cache(url)
+    memory = ResponseCache(max_entries=100, max_bytes=1 << 24)
+    monkeypatch.setattr(tmdb_async, "base_url", base_url)
+    monkeypatch.setattr(tmdb_cache, "remote_cache", remote)
+    for module in (tmdb_cache, tmdb_utils, tmdb_async):
+        monkeypatch.setattr(module, "response_cache", memory)
+    guard = UpstreamGuard(TokenBucket(0, 1), CircuitBreaker(5, 60), max_retries=0, base_delay=0, max_delay=0,
+                          retry_budget=0)
+    monkeypatch.setattr(tmdb_async, "tmdb_guard", guard)
+    return fake, redis, memory
+
+
+def test_responses_are_shared_through_the_remote_tier(tiers):
+    fake, _, memory = tiers
+    assert fetch("/movie/popular")["results"]
+    # Un'altra replica (memoria vuota) legge la risposta dalla cache remota senza chiamare TMDB
+    memory.clear()
+    assert fetch("/movie/popular")["results"]
+    assert fake.requests["movie_popular"] == 1
+
+
+def test_remote_round_trips_do_not_block_the_event_loop(tiers):
+    _, redis, _ = tiers
+    redis.latency = 0.05
+    ticks = []
+
+    async def ticker() -> None:
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.005)
+
+    async def run() -> dict:
+        task = asyncio.ensure_future(ticker())
+        try:
+            return await tmdb_async.make_tmdb_request("/tv/popular")
+        finally:
+            task.cancel()
+            await tmdb_async.close_async_session()
+
+    started = time.monotonic()
+    assert asyncio.run(run())["results"]
+    # Lettura, lock, scrittura e rilascio costano più round trip da 50 ms, ma l'event loop resta libero
+    assert time.monotonic() - started > 0.15
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.04
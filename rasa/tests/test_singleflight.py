@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from actions.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow() -> int:
+        calls.append(1)
+        time.sleep(0.05)
+        return 42
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [42] * 5 and len(calls) == 1
+    assert flight.stats() == {"executed": 1, "shared": 4, "in_flight": 0}
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight()
+
+    def broken() -> None:
+        raise RuntimeError("TMDB non raggiungibile")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", broken)
+    assert flight.do("k", lambda: 1) == 1
+
+
+def test_async_callers_share_one_task_and_survive_a_cancellation():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow() -> int:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run() -> list:
+        first = asyncio.ensure_future(flight.do("k", slow))
+        others = [asyncio.ensure_future(flight.do("k", slow)) for _ in range(3)]
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.gather(*others)
+
+    assert asyncio.run(run()) == [42] * 3 and len(calls) == 1
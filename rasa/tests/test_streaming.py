@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions import streaming, tmdb_async
+from actions.streaming import ReplyStream
+
+
+class FakeTelegram:
+    """
+    sendMessage finto: i messaggi con "lento" rispondono in ritardo, quelli con "errore" falliscono.
+    """
+
+    def __init__(self) -> None:
+        self.received = []
+
+    async def send_message(self, request: web.Request) -> web.Response:
+        text = (await request.json())["text"]
+        if "lento" in text:
+            await asyncio.sleep(0.05)
+        if "errore" in text:
+            return web.json_response({"ok": False}, status=500)
+        self.received.append(text)
+        return web.json_response({"ok": True})
+
+
+@pytest.fixture
+def telegram(server_loop, monkeypatch):
+    fake = FakeTelegram()
+    app = web.Application()
+    app.router.add_post("/bottoken/sendMessage", fake.send_message)
+
+    async def start() -> web.AppRunner:
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        return runner
+
+    runner = asyncio.run_coroutine_threadsafe(start(), server_loop).result()
+    monkeypatch.setattr(streaming, "TELEGRAM_API_URL", f"http://127.0.0.1:{runner.addresses[0][1]}")
+    monkeypatch.setattr(streaming, "TELEGRAM_ACCESS_TOKEN", "token")
+    monkeypatch.setattr(streaming, "STREAM_REPLIES", True)
+    yield fake
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), server_loop).result()
+
+
+def make_tracker(channel: str) -> Tracker:
+    events = [{"event": "user", "text": "recensioni", "input_channel": channel}]
+    return Tracker("42", {}, {"text": "recensioni"}, events, False, None, {}, "action_listen")
+
+
+def stream(channel: str, texts: list) -> CollectingDispatcher:
+    dispatcher = CollectingDispatcher()
+
+    async def run() -> None:
+        try:
+            async with ReplyStream(dispatcher, make_tracker(channel)) as replies:
+                for text in texts:
+                    replies.send(text)
+        finally:
+            await tmdb_async.close_async_session()
+
+    asyncio.run(run())
+    return dispatcher
+
+
+def test_messages_reach_telegram_in_order(telegram):
+    dispatcher = stream("telegram", ["titolo lento", "recensione 1", "recensione 2 lento", "recensione 3"])
+    assert telegram.received == ["titolo lento", "recensione 1", "recensione 2 lento", "recensione 3"]
+    assert dispatcher.messages == []
+
+
+def test_after_a_failure_the_rest_goes_through_the_dispatcher(telegram):
+    dispatcher = stream("telegram", ["titolo", "recensione errore", "recensione 2 lento", "recensione 3"])
+    assert telegram.received == ["titolo"]
+    assert [m["text"] for m in dispatcher.messages] == ["recensione errore", "recensione 2 lento", "recensione 3"]
+
+
+def test_other_channels_use_the_dispatcher(telegram):
+    dispatcher = stream("rest", ["titolo", "recensione"])
+    assert telegram.received == []
+    assert [m["text"] for m in dispatcher.messages] == ["titolo", "recensione"]
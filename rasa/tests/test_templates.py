@@ -0,0 +1,53 @@
+import pytest
+
+from actions import templates
+from actions.templates import RenderCache, render_list
+
+
+def page(*titles: str) -> dict:
+    return {"results": [{"title": t, "vote_average": 7.5} for t in titles]}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = RenderCache(max_entries=2)
+    monkeypatch.setattr(templates, "render_cache", cache)
+    return cache
+
+
+def test_same_response_object_is_rendered_once(cache):
+    data = page("Dune", "Oppenheimer")
+    first = render_list("popular_movies", data, "Popolari:\n")
+    assert "Dune" in first
+    assert render_list("popular_movies", data, "Popolari:\n") is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_refreshed_response_is_rendered_again(cache):
+    render_list("popular_movies", page("Dune"), "Popolari:\n")
+    # Un aggiornamento della cache TMDB produce un oggetto nuovo, anche con lo stesso contenuto
+    assert "Barbie" in render_list("popular_movies", page("Barbie"), "Popolari:\n")
+    assert cache.misses == 2
+
+
+def test_rendered_text_depends_on_the_view_arguments(cache):
+    data = page("Dune", "Oppenheimer")
+    assert "Oppenheimer" not in render_list("popular_movies", data, "Popolari:\n", count=1)
+    assert "Oppenheimer" in render_list("popular_movies", data, "Popolari:\n", count=2)
+
+
+def test_least_recently_used_texts_are_evicted(cache):
+    pages = [page(str(i)) for i in range(3)]
+    calls = []
+    for data in (pages[0], pages[1], pages[0], pages[2], pages[1]):
+        cache.get_or_render("view", data, lambda: calls.append(1))
+    # La terza pagina espelle la seconda, che va ricomposta
+    assert len(calls) == 4 and cache.stats()["entries"] == 2
+
+
+def test_disabled_cache_always_renders():
+    cache = RenderCache(max_entries=0)
+    data = page("Dune")
+    assert cache.get_or_render("view", data, lambda: "a") == "a"
+    assert cache.get_or_render("view", data, lambda: "b") == "b"
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+from actions import title_resolver
+from actions.title_resolver import TitleResolver
+
+GODFATHER = {"id": 238, "title": "Il padrino", "release_date": "1972-03-14", "popularity": 120}
+
+
+class FakeSearch:
+    """
+    Ricerca TMDB finta: risultati per titolo, oppure una risposta di errore.
+    """
+
+    def __init__(self, results: dict) -> None:
+        self.results = results
+        self.calls = []
+        self.failing = False
+
+    async def __call__(self, title: str, year=None) -> dict:
+        self.calls.append(title)
+        if self.failing:
+            return {}
+        return {"results": self.results.get(title.casefold(), [])}
+
+
+def test_titles_without_results_are_cached_negatively():
+    search = FakeSearch({})
+    resolver = TitleResolver(search)
+    assert asyncio.run(resolver.resolve("Film inesistente")) is None
+    assert asyncio.run(resolver.resolve("film  INESISTENTE")) is None
+    assert search.calls == ["Film inesistente"]
+    assert resolver.stats()["negative_hits"] == 1
+
+
+def test_negative_entries_expire_sooner(monkeypatch):
+    monkeypatch.setattr(title_resolver, "TITLE_NEGATIVE_TTL", 0.01)
+    search = FakeSearch({})
+    resolver = TitleResolver(search)
+    asyncio.run(resolver.resolve("Il padrino"))
+    search.results["il padrino"] = [GODFATHER]
+    time.sleep(0.02)
+    assert asyncio.run(resolver.resolve("Il padrino"))["id"] == 238
+    assert len(search.calls) == 2
+
+
+def test_failed_searches_are_not_cached():
+    search = FakeSearch({"il padrino": [GODFATHER]})
+    resolver = TitleResolver(search)
+    search.failing = True
+    assert asyncio.run(resolver.resolve("Il padrino")) is None
+    search.failing = False
+    assert asyncio.run(resolver.resolve("Il padrino"))["id"] == 238
+    assert asyncio.run(resolver.resolve("padrino"))["id"] == 238
+    assert resolver.stats() == {"entries": 1, "hits": 1, "negative_hits": 0, "misses": 2}
+
+
+def test_least_recently_used_titles_are_evicted(monkeypatch):
+    monkeypatch.setattr(title_resolver, "TITLE_CACHE_MAX_ENTRIES", 2)
+    resolver = TitleResolver(FakeSearch({}))
+    for title in ("uno", "due", "uno", "tre"):
+        asyncio.run(resolver.candidates(title))
+    assert list(resolver._entries) == ["uno", "tre"]
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from actions import tmdb_async, tmdb_cache
+from actions.rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard
+from actions.tmdb_cache import ResponseCache
+
+
+@pytest.fixture
+def client(fake_tmdb, monkeypatch):
+    fake, base_url = fake_tmdb
+    fake.latency = 0.1
+    monkeypatch.setattr(tmdb_async, "base_url", base_url)
+    memory = ResponseCache(max_entries=100, max_bytes=1 << 24)
+    for module in (tmdb_cache, tmdb_async):
+        monkeypatch.setattr(module, "response_cache", memory)
+    guard = UpstreamGuard(TokenBucket(0, 1), CircuitBreaker(100, 60), max_retries=0, base_delay=0, max_delay=0,
+                          retry_budget=0)
+    monkeypatch.setattr(tmdb_async, "tmdb_guard", guard)
+    return fake
+
+
+def run(coro):
+    async def closing():
+        try:
+            return await coro
+        finally:
+            await tmdb_async.close_async_session()
+
+    return asyncio.run(closing())
+
+
+def test_requests_of_one_turn_run_concurrently(client):
+    endpoints = ["/movie/popular", "/tv/popular", "/movie/603", "/tv/1399", "/search/movie"]
+
+    async def turn() -> list:
+        return await asyncio.gather(*(tmdb_async.make_tmdb_request(e, {"query": "dune"}) for e in endpoints))
+
+    started = time.monotonic()
+    results = run(turn())
+    # Cinque richieste da 100 ms in parallelo, non in sequenza
+    assert time.monotonic() - started < 0.3
+    assert all(results) and sum(client.requests.values()) == 5
+
+
+def test_connections_are_reused_within_the_loop(client):
+    client.latency = 0
+    opened = tmdb_async._stats["connections_opened"]
+
+    async def sequential() -> None:
+        for page in range(1, 6):
+            await tmdb_async.make_tmdb_request("/movie/popular", {"page": page})
+
+    run(sequential())
+    assert tmdb_async._stats["connections_opened"] - opened == 1
+
+
+def test_each_event_loop_gets_its_own_session(client):
+    async def sessions() -> tuple:
+        return tmdb_async.get_async_session(), tmdb_async.get_async_session()
+
+    first, again = run(sessions())
+    second, _ = run(sessions())
+    assert first is again and second is not first
+
+
+def test_missing_resources_return_an_empty_dict(client):
+    assert run(tmdb_async.make_tmdb_request("/person/1")) == {}
@@ -0,0 +1,89 @@
+import json
+import time
+
+import pytest
+
+from actions import tmdb_cache
+from actions.disk_cache import DiskCache
+from actions.snapshot import SharedSnapshot
+from actions.tmdb_cache import ResponseCache
+
+
+def test_disk_lookup_restores_the_stale_window(tmp_path, monkeypatch):
+    disk = DiskCache(str(tmp_path / "cache.sqlite"), vacuum_interval=3600)
+    memory = ResponseCache(max_entries=10, max_bytes=1 << 20)
+    monkeypatch.setattr(tmdb_cache, "disk_cache", disk)
+    monkeypatch.setattr(tmdb_cache, "response_cache", memory)
+    disk.set("/movie/popular", {"page": 1, "results": []}, ttl=60, stale_ttl=600)
+
+    assert tmdb_cache.cache_lookup("/movie/popular") is not None
+    # La voce ricaricata in memoria resta servibile come stale dopo la scadenza
+    _, expires_at, _, stale_until = memory._entries["/movie/popular"]
+    assert stale_until - expires_at == pytest.approx(600, abs=10)
+
+
+def test_cache_key_ignores_api_key_order_and_query_case():
+    key = tmdb_cache.make_cache_key("/search/movie", {"query": "  Il   Padrino ", "page": 1, "api_key": "x"})
+    assert key == tmdb_cache.make_cache_key("/search/movie", {"page": "1", "query": "il padrino", "region": None})
+    assert key == "/search/movie?page=1&query=il+padrino"
+
+
+def test_ttl_with_appended_resources_is_the_shortest():
+    assert tmdb_cache.ttl_for("/movie/603") == 12 * 3600
+    assert tmdb_cache.ttl_for("/movie/603", {"append_to_response": "watch/providers,reviews"}) == 3 * 3600
+
+
+def test_entries_expire_and_stay_readable_as_stale():
+    cache = ResponseCache(max_entries=10, max_bytes=1 << 20)
+    cache.set("fresh", 1, ttl=0.01, size=10)
+    cache.set("lists", 2, ttl=0.01, size=10, stale_ttl=60)
+    time.sleep(0.02)
+    assert cache.get("fresh") is None and cache.get_stale("fresh") is None
+    assert cache.get("lists") is None and cache.get_stale("lists") == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entries_are_evicted_by_count_and_bytes():
+    cache = ResponseCache(max_entries=2, max_bytes=100)
+    cache.set("a", 1, ttl=60, size=10)
+    cache.set("b", 2, ttl=60, size=10)
+    cache.get("a")
+    cache.set("c", 3, ttl=60, size=10)
+    assert cache.get("b") is None and cache.get("a") == 1
+    cache.set("big", 4, ttl=60, size=95)
+    assert cache.stats()["entries"] == 1 and cache.get("big") == 4
+    cache.set("huge", 5, ttl=60, size=101)
+    assert cache.get("huge") is None and cache.stats()["evictions"] == 3
+
+
+def publish_responses(snapshot, version, responses):
+    expires = tmdb_cache._EXPIRES.pack(time.time() + 600)
+    snapshot.publish(version, {"responses": [
+        (key.encode("utf-8"), expires + json.dumps(value).encode("utf-8")) for key, value in responses.items()
+    ]})
+
+
+def test_snapshot_hits_stay_out_of_the_response_cache(tmp_path, monkeypatch):
+    snapshot = SharedSnapshot(str(tmp_path / "snapshot.bin"))
+    memory = ResponseCache(max_entries=10, max_bytes=1 << 20)
+    decoded = ResponseCache(max_entries=2, max_bytes=1 << 20)
+    monkeypatch.setattr(tmdb_cache, "shared_snapshot", snapshot)
+    monkeypatch.setattr(tmdb_cache, "response_cache", memory)
+    monkeypatch.setattr(tmdb_cache, "snapshot_decoded", decoded)
+    monkeypatch.setattr(tmdb_cache, "_decoded_from", None)
+    keys = [f"/movie/{i}" for i in range(1, 4)]
+    publish_responses(snapshot, 1, {key: {"id": i, "title": "Vecchio"} for i, key in enumerate(keys, 1)})
+
+    first = tmdb_cache.local_lookup(keys[0])
+    assert first["title"] == "Vecchio"
+    # Una sola decodifica per le letture successive della stessa voce
+    assert tmdb_cache.local_lookup(keys[0]) is first
+    for key in keys:
+        assert tmdb_cache.local_lookup(key) is not None
+    assert memory.stats()["entries"] == 0 and memory.export() == []
+    assert decoded.stats()["entries"] == 2
+
+    # Il nuovo snapshot sostituisce le copie decodificate da quello precedente
+    publish_responses(snapshot, 2, {keys[0]: {"id": 1, "title": "Nuovo"}})
+    assert tmdb_cache.local_lookup(keys[0])["title"] == "Nuovo"
+    assert tmdb_cache.local_lookup(keys[1]) is None
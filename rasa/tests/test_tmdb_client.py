@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from actions import tmdb_async, tmdb_cache, tmdb_utils
+from actions.deadline import turn_budget
+from actions.rate_limit import TokenBucket, CircuitBreaker, UpstreamGuard
+from actions.tmdb_cache import ResponseCache
+
+
+@pytest.fixture
+def client(fake_tmdb, monkeypatch):
+    """
+    Client TMDB sincrono e asincrono verso il TMDB finto, con cache e limiti nuovi per ogni test.
+    """
+    fake, base_url = fake_tmdb
+    monkeypatch.setattr(tmdb_utils, "base_url", base_url)
+    monkeypatch.setattr(tmdb_async, "base_url", base_url)
+    memory = ResponseCache(max_entries=100, max_bytes=1 << 24)
+    for module in (tmdb_cache, tmdb_utils, tmdb_async):
+        monkeypatch.setattr(module, "response_cache", memory)
+    guard = UpstreamGuard(TokenBucket(0, 1), CircuitBreaker(2, 0.01), max_retries=0, base_delay=0, max_delay=0,
+                          retry_budget=0)
+    monkeypatch.setattr(tmdb_utils, "tmdb_guard", guard)
+    monkeypatch.setattr(tmdb_async, "tmdb_guard", guard)
+    return fake, guard
+
+
+def half_open(guard: UpstreamGuard) -> None:
+    guard.breaker.record_failure()
+    guard.breaker.record_failure()
+    time.sleep(0.02)
+    assert guard.breaker.state == "half_open"
+
+
+def test_sync_request_is_cached(client):
+    fake, _ = client
+    first = tmdb_utils.make_tmdb_request("/movie/popular")
+    second = tmdb_utils.make_tmdb_request("/movie/popular")
+    assert first["results"] and second is first
+    assert fake.requests["movie_popular"] == 1
+
+
+def test_trial_out_of_budget_does_not_block_the_breaker(client):
+    _, guard = client
+    half_open(guard)
+    # Il token arriva dopo la fine del turno: il tentativo di prova viene abbandonato
+    guard.bucket = TokenBucket(rate=1, burst=0)
+    with turn_budget(0.3):
+        assert tmdb_utils.make_tmdb_request("/tv/popular") == {}
+    assert guard.breaker.state == "half_open"
+    guard.bucket = TokenBucket(0, 1)
+    assert tmdb_utils.make_tmdb_request("/tv/popular")["results"]
+    assert guard.breaker.state == "closed"
+
+
+def test_invalid_body_counts_as_a_failure(client, monkeypatch):
+    _, guard = client
+    half_open(guard)
+
+    def broken(body):
+        raise ValueError("corpo troncato")
+
+    monkeypatch.setattr(tmdb_utils.json_codec, "loads", broken)
+    assert tmdb_utils.make_tmdb_request("/movie/now_playing") == {}
+    assert guard.breaker.state == "open"
+
+
+def test_async_trial_out_of_budget_does_not_block_the_breaker(client):
+    _, guard = client
+    half_open(guard)
+    guard.bucket = TokenBucket(rate=1, burst=0)
+
+    async def run() -> dict:
+        with turn_budget(0.3):
+            try:
+                return await tmdb_async.make_tmdb_request("/movie/popular")
+            finally:
+                await tmdb_async.close_async_session()
+
+    assert asyncio.run(run()) == {}
+    guard.bucket = TokenBucket(0, 1)
+    assert asyncio.run(run())["results"]
+    assert guard.breaker.state == "closed"
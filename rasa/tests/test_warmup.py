@@ -0,0 +1,41 @@
+import asyncio
+
+from actions import tmdb_async, tmdb_utils, warmup
+from actions.constants import MOVIES_GENRE_MAP, TV_GENRE_MAP
+from actions.discover import compile_query, discover_params
+from actions.tmdb_cache import make_cache_key
+
+
+def test_jobs_and_prefetch_cover_the_same_requests(monkeypatch):
+    called = []
+    monkeypatch.setattr(warmup, "make_tmdb_request", lambda endpoint, params=None: called.append(
+        tmdb_utils.request_key(endpoint, params)) or {"results": []})
+    for _, job in warmup.warmup_jobs():
+        job()
+    assert called == [tmdb_utils.request_key(endpoint, params) for endpoint, params in warmup.warmup_requests()]
+
+
+def test_warmed_keys_are_the_ones_the_actions_use(monkeypatch):
+    used = set()
+
+    async def request(endpoint, params=None):
+        used.add(make_cache_key(endpoint, params))
+        return {}
+
+    monkeypatch.setattr(tmdb_async, "make_tmdb_request", request)
+
+    async def actions():
+        # Le stesse chiamate delle azioni: le liste e /discover per ogni nome di genere riconosciuto dall'NLU
+        await tmdb_async.get_favourite()
+        await tmdb_async.get_favourite_tv()
+        await tmdb_async.get_now_playing_movies()
+        await tmdb_async.search_TV_latest()
+        for kind, genre_map, discover in (("movie", MOVIES_GENRE_MAP, tmdb_async.discover_movies),
+                                          ("tv", TV_GENRE_MAP, tmdb_async.discover_tv)):
+            for genre in genre_map:
+                await discover(discover_params(compile_query(kind, f"consigliami qualcosa di {genre}", genre)))
+
+    asyncio.run(actions())
+    warmed = [make_cache_key(endpoint, params) for endpoint, params in warmup.warmup_requests()]
+    assert len(warmed) == len(set(warmed))
+    assert used == set(warmed)